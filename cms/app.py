@@ -1,8 +1,10 @@
-from flask import Flask, redirect, url_for, send_file
+from flask import Flask, Response, redirect, request, url_for, send_file
 from flask_login import LoginManager, login_required
 from werkzeug.middleware.proxy_fix import ProxyFix
+import click
 from config import Config
-from models import db, User
+from models import db, User, Player
+from services.asset_cache import AssetCache, guess_mime_type
 from pathlib import Path
 import os
 import sys
@@ -30,6 +32,18 @@ def create_app(config_class=Config):
     def load_user(user_id):
         return User.query.get(int(user_id))
     
+    # Catalog change events pushed to open editor pages
+    from services.change_events import change_broker
+    change_broker.init_app(app)
+    
+    # Find, ping and asset-download counts
+    from services.analytics import analytics
+    analytics.init_app(app)
+    
+    # Per-client token buckets in front of hot endpoints
+    from services.rate_limit import rate_limiter
+    rate_limiter.init_app(app)
+    
     # Register blueprints
     from routes.auth_routes import auth_bp
     from routes.item_routes import item_bp
@@ -39,6 +53,7 @@ def create_app(config_class=Config):
     from routes.content_routes import content_bp
     from routes.leaderboard_routes import leaderboard_bp
     from routes.admin_routes import admin_bp
+    from routes.public_routes import public_bp
     
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(item_bp, url_prefix='/items')
@@ -48,6 +63,7 @@ def create_app(config_class=Config):
     app.register_blueprint(content_bp, url_prefix='/content')
     app.register_blueprint(leaderboard_bp, url_prefix='/leaderboard')
     app.register_blueprint(admin_bp, url_prefix='/admin')
+    app.register_blueprint(public_bp, url_prefix='/api')
     
     # Root route
     @app.route('/')
@@ -57,13 +73,30 @@ def create_app(config_class=Config):
             return redirect(url_for('auth.dashboard'))
         return redirect(url_for('auth.login'))
     
+    # Small assets are served from memory; larger ones stream from disk
+    asset_cache = AssetCache(
+        Config.ASSETS_DIR,
+        app.config['ASSET_CACHE_MAX_BYTES'],
+        app.config['ASSET_CACHE_MAX_FILE_SIZE']
+    )
+    app.extensions['asset_cache'] = asset_cache
+    
     # Serve assets from the project's assets directory
     @app.route('/assets/<path:filename>')
     @login_required
     def serve_asset(filename):
         """Serve assets from the project's assets directory"""
-        asset_path = Config.ASSETS_DIR / filename
-        if asset_path.exists() and asset_path.is_file():
+        cached = asset_cache.get(filename)
+        if cached is not None:
+            response = Response(cached.data, mimetype=cached.mime_type)
+            response.set_etag(cached.etag)
+            response.last_modified = cached.mtime_ns / 1e9
+            response.make_conditional(request)
+        else:
+            asset_path = Config.ASSETS_DIR / filename
+            if not (asset_path.exists() and asset_path.is_file()):
+                return {'error': 'File not found'}, 404
+            
             # Ensure the file is within the assets directory (security check)
             try:
                 asset_path.resolve().relative_to(Config.ASSETS_DIR.resolve())
@@ -71,31 +104,17 @@ def create_app(config_class=Config):
                 # Path traversal attempt
                 return {'error': 'Invalid path'}, 403
             
-            # Determine MIME type based on extension
-            mime_type = None
-            if filename.lower().endswith('.glb'):
-                mime_type = 'model/gltf-binary'
-            elif filename.lower().endswith('.usdz'):
-                mime_type = 'model/usd'
-            elif filename.lower().endswith('.svg'):
-                mime_type = 'image/svg+xml; charset=utf-8'
-            elif filename.lower().endswith('.png'):
-                mime_type = 'image/png'
-            elif filename.lower().endswith('.jpg') or filename.lower().endswith('.jpeg'):
-                mime_type = 'image/jpeg'
-            
             response = send_file(
                 str(asset_path),
-                mimetype=mime_type,
+                mimetype=guess_mime_type(filename),
                 as_attachment=False
             )
-            
-            # Add CORS headers for SVG files to allow embedding
-            if filename.lower().endswith('.svg'):
-                response.headers['Access-Control-Allow-Origin'] = '*'
-            
-            return response
-        return {'error': 'File not found'}, 404
+        
+        # Add CORS headers for SVG files to allow embedding
+        if filename.lower().endswith('.svg'):
+            response.headers['Access-Control-Allow-Origin'] = '*'
+        
+        return response
     
     # Create database tables
     with app.app_context():
@@ -123,6 +142,19 @@ def create_app(config_class=Config):
                 print(f"Migration warning: {migration_error}")
                 print("If you see errors, try deleting instance/cms.db and restarting")
         
+        # Migration: rebuild ix_player_rank if it predates leaderboard order (score DESC, with hidden)
+        try:
+            from sqlalchemy import inspect
+            indexes = {ix['name']: ix for ix in inspect(db.engine).get_indexes('player')}
+            old_rank = indexes.get('ix_player_rank')
+            if old_rank is not None and 'hidden' not in (old_rank.get('column_names') or []):
+                rank_index = next(ix for ix in Player.__table__.indexes if ix.name == 'ix_player_rank')
+                rank_index.drop(bind=db.engine)
+                rank_index.create(bind=db.engine)
+                print("Migration: Rebuilt ix_player_rank in leaderboard order")
+        except Exception as migration_error:
+            print(f"Migration warning: {migration_error}")
+        
         # Create default admin user if it doesn't exist
         try:
             if not User.query.filter_by(username='admin').first():
@@ -138,6 +170,36 @@ def create_app(config_class=Config):
             print("Solution: Delete the file 'instance/cms.db' and restart the application")
             raise
     
+    # Buffered score ingestion (replays logs left by workers that died)
+    from services.score_ingest import score_buffer
+    score_buffer.init_app(app)
+    
+    # Periodic leaderboard snapshots (the thread starts with the first read)
+    from services.leaderboard_snapshots import snapshot_scheduler
+    snapshot_scheduler.init_app(app)
+    
+    # CLI: build the static site for CDN deployment
+    @app.cli.command('publish')
+    @click.option('--output', type=click.Path(file_okay=False), default=None,
+                  help='Output directory (defaults to PUBLISH_DIR)')
+    @click.option('--force', is_flag=True, help='Rebuild every output, ignoring the previous build')
+    def publish_command(output, force):
+        """Write a fingerprinted, precompressed copy of the public site"""
+        from services.publisher import Publisher
+        summary = Publisher(Path(output) if output else None).publish(force=force)
+        click.echo(f"Published {summary['files']} files to {summary['output_dir']} "
+                   f"({summary['written']} written, {summary['skipped']} unchanged, "
+                   f"{summary['removed']} removed)")
+    
+    # CLI: recompute leaderboard snapshots (for cron when LEADERBOARD_SNAPSHOT_SECONDS is 0)
+    @app.cli.command('leaderboard-snapshots')
+    def leaderboard_snapshots_command():
+        """Recompute the daily, weekly and all-time leaderboard snapshots"""
+        from services.leaderboard_snapshots import refresh_snapshots
+        summary = refresh_snapshots(app.config['LEADERBOARD_SNAPSHOT_SIZE'],
+                                    app.config['LEADERBOARD_SNAPSHOT_MAX_VENUES'])
+        click.echo(f"Computed {summary['computed']} snapshots ({summary['removed']} removed)")
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -12,6 +12,8 @@ class Config:
     DATA_DIR = BASE_DIR / 'data'
     # Assets JSON path: schema is items + gameBadges. Change here to use a different filename or path.
     ASSETS_JSON = DATA_DIR / 'assets.json'
+    # Per-page projections of the catalog (map, animals, badges), rewritten on every save
+    VIEWS_DIR = DATA_DIR / 'views'
     ASSETS_DIR = BASE_DIR / 'assets'
     
     # Asset directories (icons: shadow/found images for collectable items)
@@ -20,6 +22,13 @@ class Config:
     FOUND_DIR = ASSETS_DIR / 'icons' / 'found'
     BADGES_DIR = ASSETS_DIR / 'badges' / 'icons'
     
+    # In-memory cache for small, frequently requested assets (icons, badge art)
+    ASSET_CACHE_MAX_BYTES = int(os.environ.get('ASSET_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    ASSET_CACHE_MAX_FILE_SIZE = int(os.environ.get('ASSET_CACHE_MAX_FILE_SIZE', 512 * 1024))
+    
+    # Static publish output (see `flask publish`)
+    PUBLISH_DIR = Path(os.environ.get('PUBLISH_DIR') or BASE_DIR / 'dist')
+    
     # Backup directory
     BACKUP_DIR = BASE_DIR / 'cms' / 'backups'
     
@@ -43,4 +52,107 @@ class Config:
     MAP_CENTER_LAT = 51.442
     MAP_CENTER_LNG = -0.063
     MAP_DEFAULT_ZOOM = 17
+    # At this zoom and below the map shows marker clusters instead of individual pins
+    MAP_CLUSTER_MAX_ZOOM = 15
+    # Most pin moves accepted by one /map/api/update-locations request
+    MAP_MAX_BATCH_MOVES = 500
+    
+    # Most positions accepted by one /api/geofence batch request
+    GEOFENCE_MAX_POSITIONS = 100
+    # Geofence analysis: warn when item centres are closer than this, and
+    # flag hot spots of at least HOTSPOT_MIN_ITEMS items within HOTSPOT_RADIUS
+    GEOFENCE_MIN_SEPARATION_METERS = 5
+    GEOFENCE_HOTSPOT_RADIUS_METERS = 25
+    GEOFENCE_HOTSPOT_MIN_ITEMS = 5
+    
+    # Catalog revisions of deletions kept for ?since= delta sync; older clients get a full snapshot
+    CATALOG_HISTORY_REVISIONS = 500
+    
+    # Most field edits accepted by one /content/update request
+    CONTENT_MAX_BATCH_EDITS = 1000
+    # Rows fetched per request by the content editor grid
+    CONTENT_ROWS_PAGE_SIZE = 100
+    
+    # Spreadsheet import: rows checked per chunk, checking threads, and how
+    # long an uploaded preview can be committed (plans are kept in IMPORT_DIR)
+    IMPORT_DIR = BASE_DIR / 'cms' / 'imports'
+    IMPORT_CHUNK_ROWS = 500
+    IMPORT_WORKERS = 4
+    IMPORT_PREVIEW_TTL_SECONDS = 3600
+    
+    # Content editor find & replace: most rules per request, changes per preview page
+    FIND_REPLACE_MAX_RULES = 200
+    FIND_REPLACE_PAGE_SIZE = 50
+    
+    # Public leaderboard: how often a worker looks for other workers' score
+    # changes, how far back it re-reads to cover out-of-order commits, and
+    # the largest top-N / "around me" windows served
+    LEADERBOARD_REFRESH_SECONDS = float(os.environ.get('LEADERBOARD_REFRESH_SECONDS', 1))
+    LEADERBOARD_REFRESH_OVERLAP_SECONDS = 5
+    LEADERBOARD_MAX_TOP = 100
+    LEADERBOARD_MAX_RADIUS = 25
+    # Players per page in the admin leaderboard views (/leaderboard/users, /leaderboard/api/users)
+    LEADERBOARD_PAGE_SIZE = 50
+    LEADERBOARD_MAX_PAGE_SIZE = 500
+    # Precomputed daily/weekly/all-time top players (/api/leaderboard/snapshot):
+    # recomputed every LEADERBOARD_SNAPSHOT_SECONDS (0 = only by `flask
+    # leaderboard-snapshots`, e.g. from cron) and cached by clients for
+    # LEADERBOARD_SNAPSHOT_MAX_AGE seconds
+    LEADERBOARD_SNAPSHOT_SECONDS = float(os.environ.get('LEADERBOARD_SNAPSHOT_SECONDS', 300))
+    LEADERBOARD_SNAPSHOT_SIZE = 100
+    LEADERBOARD_SNAPSHOT_MAX_VENUES = 50
+    LEADERBOARD_SNAPSHOT_MAX_AGE = 300
+    
+    # Score ingestion (/api/scores): events are logged to SCORE_LOG_DIR, held
+    # in memory and written in one transaction once SCORE_BUFFER_MAX_EVENTS
+    # are waiting or SCORE_BUFFER_FLUSH_SECONDS have passed
+    SCORE_BUFFER_MAX_EVENTS = 500
+    SCORE_BUFFER_FLUSH_SECONDS = float(os.environ.get('SCORE_BUFFER_FLUSH_SECONDS', 2))
+    SCORE_LOG_DIR = BASE_DIR / 'cms' / 'score_logs'
+    # fsync the log on every request (turn off only where losing the last
+    # few seconds of events in a power cut is acceptable)
+    SCORE_LOG_FSYNC = os.environ.get('SCORE_LOG_FSYNC', '1') != '0'
+    SCORE_MAX_EVENTS_PER_REQUEST = 200
+    SCORE_POINTS_PER_COLLECT = 1
+    # Highest score one game can award (raise it when adding a game that scores more)
+    SCORE_MAX_POINTS = 1000
+    
+    # Find, ping and asset-download analytics: counted in memory, written every
+    # ANALYTICS_FLUSH_SECONDS, minute and hour counts and raw events kept for the given days
+    # (day counts are kept forever)
+    ANALYTICS_FLUSH_SECONDS = float(os.environ.get('ANALYTICS_FLUSH_SECONDS', 10))
+    ANALYTICS_MINUTE_RETENTION_DAYS = 2
+    ANALYTICS_HOUR_RETENTION_DAYS = 90
+    ANALYTICS_EVENT_RETENTION_DAYS = 14
+    ANALYTICS_MAX_EVENTS_PER_REQUEST = 50
+    
+    # Per-client rate limits: endpoint or blueprint -> (requests per minute, burst, client key).
+    # An endpoint's rule applies on top of its blueprint's. Client keys: 'ip', 'user' (the
+    # logged-in user, else the IP) or 'device' (the request's device_id or player_id, else
+    # the IP). Buckets are kept per worker ('memory') or in a SQLite file shared by the
+    # workers on one host ('sqlite'); metrics are at /admin/api/rate-limits.
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_SQLITE_PATH = BASE_DIR / 'cms' / 'instance' / 'rate_limits.db'
+    RATE_LIMITS = {
+        'auth.login': (20, 10, 'ip'),
+        # Visitors at a venue often share one address, so per-IP limits are generous
+        'public': (1200, 300, 'ip'),
+        'public.geofence': (120, 30, 'device'),
+        'public.ingest_scores': (120, 60, 'device'),
+        'public.progress_sync': (30, 10, 'device'),
+        'public.record_analytics': (120, 60, 'ip'),
+        'map': (600, 120, 'user'),
+        'serve_asset': (1200, 300, 'user'),
+    }
+    
+    # Player progress sync (/api/progress/sync): most badges + games accepted in one request
+    PROGRESS_MAX_ENTRIES = 1000
+    
+    # Live change events for open editor pages (/content/api/events).
+    # 'memory' reaches streams in the writing worker only; use 'database' with several workers.
+    CHANGE_EVENTS_BACKEND = os.environ.get('CHANGE_EVENTS_BACKEND', 'memory')
+    CHANGE_EVENTS_POLL_SECONDS = float(os.environ.get('CHANGE_EVENTS_POLL_SECONDS', 2))
+    # Comment lines sent on idle streams so proxies keep them open
+    CHANGE_EVENTS_KEEPALIVE_SECONDS = 15
 
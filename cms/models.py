@@ -63,3 +63,126 @@ class ChangeLog(db.Model):
     def __repr__(self):
         return f'<ChangeLog {self.action} {self.entity_type} {self.entity_id}>'
 
+
+class CatalogEntity(db.Model):
+    """Fingerprint and last-modified catalog revision of each item and game badge (for delta sync)"""
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(50), nullable=False)  # item, game_badge
+    entity_id = db.Column(db.String(100), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    revision = db.Column(db.Integer, nullable=False, index=True)
+    deleted = db.Column(db.Boolean, default=False, nullable=False)  # tombstone
+    
+    __table_args__ = (db.UniqueConstraint('entity_type', 'entity_id', name='uq_catalog_entity'),)
+    
+    def __repr__(self):
+        return f'<CatalogEntity {self.entity_type} {self.entity_id} r{self.revision}>'
+
+class CatalogState(db.Model):
+    """Catalog revision last recorded in CatalogEntity, and how far tombstones were compacted"""
+    id = db.Column(db.Integer, primary_key=True)
+    revision = db.Column(db.Integer, default=0, nullable=False)
+    compacted_revision = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<CatalogState r{self.revision} compacted<={self.compacted_revision}>'
+
+
+class Player(db.Model):
+    """Visitor on the public leaderboard, keyed by the site's localStorage userId"""
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.String(100), unique=True, nullable=False)
+    nickname = db.Column(db.String(50), nullable=False, default='')
+    score = db.Column(db.Integer, nullable=False, default=0)
+    # When the current score was reached; the earlier of two equal scores ranks higher
+    reached_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every change; other workers pick up changes newer than their watermark
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    hidden = db.Column(db.Boolean, default=False, nullable=False)  # removed from the leaderboard by an admin
+    
+    # Leaderboard order, so keyset pages are range scans of this index alone
+    __table_args__ = (db.Index('ix_player_rank', score.desc(), 'reached_at', 'id', 'hidden'),)
+    
+    def __repr__(self):
+        return f'<Player {self.player_id} {self.score}>'
+
+class ScoreEvent(db.Model):
+    """One accepted scoring event (a find or a game score); event_key makes ingestion idempotent"""
+    id = db.Column(db.Integer, primary_key=True)
+    event_key = db.Column(db.String(200), unique=True, nullable=False)
+    player_id = db.Column(db.String(100), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # collect, score
+    target = db.Column(db.String(200), nullable=False)  # item id or game path
+    points = db.Column(db.Integer, nullable=False, default=0)
+    venue = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    # A player's history, newest first; a venue's events in a period
+    __table_args__ = (
+        db.Index('ix_score_event_player', 'player_id', 'created_at'),
+        db.Index('ix_score_event_venue', 'venue', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f'<ScoreEvent {self.event_key} +{self.points}>'
+
+class LeaderboardSnapshot(db.Model):
+    """Precomputed top players for one period (daily, weekly, alltime) and venue ('' for all venues)"""
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(20), nullable=False)
+    venue = db.Column(db.String(100), nullable=False, default='')
+    window_start = db.Column(db.DateTime, nullable=True)  # None for alltime
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    players = db.Column(db.Text, nullable=False)  # JSON list of ranked entries
+    
+    __table_args__ = (db.UniqueConstraint('period', 'venue', name='uq_snapshot_period_venue'),)
+    
+    def __repr__(self):
+        return f'<LeaderboardSnapshot {self.period} {self.venue or "*"} {self.computed_at}>'
+
+class PlayerProgress(db.Model):
+    """One badge or completed game in a player's collection; rows are only ever added"""
+    id = db.Column(db.Integer, primary_key=True)  # doubles as the sync watermark
+    player_id = db.Column(db.String(100), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # badge, game
+    value = db.Column(db.String(200), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('player_id', 'kind', 'value', name='uq_progress_entry'),
+        # Rows added after a sync token
+        db.Index('ix_progress_player_id', 'player_id', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<PlayerProgress {self.player_id} {self.kind}:{self.value}>'
+
+class AnalyticsEvent(db.Model):
+    """Raw find, ping or asset-download event (pruned after ANALYTICS_EVENT_RETENTION_DAYS)"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # find, ping, asset
+    subject = db.Column(db.String(200), nullable=False)  # item id or asset path
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<AnalyticsEvent {self.kind} {self.subject}>'
+
+class AnalyticsCount(db.Model):
+    """Number of events of one kind and subject in a minute, hour or day bucket"""
+    id = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.String(10), nullable=False)  # minute, hour, day
+    kind = db.Column(db.String(20), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        # Every subject over a time range
+        db.UniqueConstraint('bucket', 'kind', 'bucket_start', 'subject', name='uq_analytics_bucket'),
+        # One subject over a time range
+        db.Index('ix_analytics_subject', 'bucket', 'kind', 'subject', 'bucket_start'),
+    )
+    
+    def __repr__(self):
+        return f'<AnalyticsCount {self.bucket} {self.kind} {self.subject} {self.bucket_start} {self.count}>'
@@ -1,8 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from models import db, User
 from services.backup_service import BackupService
+from services.catalog_diff import catalog_differ
 from services.change_logger import ChangeLogger
+from services.rate_limit import rate_limiter
 from functools import wraps
 
 admin_bp = Blueprint('admin', __name__)
@@ -44,6 +46,43 @@ def restore_backup():
     
     return redirect(url_for('admin.backups'))
 
+@admin_bp.route('/backups/diff')
+@login_required
+def backup_diff():
+    """Field-level comparison of two backups (or a backup and the current catalog)"""
+    old_ref = request.args.get('from', '')
+    new_ref = request.args.get('to', 'current')
+    try:
+        diff = catalog_differ.diff(old_ref, new_ref)
+    except LookupError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin.backups'))
+    
+    service = BackupService()
+    return render_template('admin/backup_diff.html', diff=diff, backups=service.list_backups(),
+                           old_ref=old_ref, new_ref=new_ref)
+
+@admin_bp.route('/api/diff')
+@login_required
+def api_diff():
+    """Structural diff as JSON.
+    
+    ?from=<ref>&to=<ref>, where a ref is a backup file name, a revision
+    number or 'current' (the default for "to").
+    """
+    try:
+        diff = catalog_differ.diff(request.args.get('from', ''), request.args.get('to', 'current'))
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify(diff)
+
+@admin_bp.route('/api/rate-limits')
+@admin_required
+def api_rate_limits():
+    """Rate limit counters of the worker serving this request: allowed and
+    limited requests per rule and the clients limited most often"""
+    return jsonify(rate_limiter.metrics(request.args.get('top', 20, type=int)))
+
 @admin_bp.route('/history')
 @login_required
 def history():
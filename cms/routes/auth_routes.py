@@ -1,7 +1,8 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, session, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from models import db, User
-from datetime import datetime
+from datetime import datetime, timedelta
+from services.analytics import BUCKETS, KINDS, activity
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -47,6 +48,29 @@ def logout():
 @login_required
 def dashboard():
     """Dashboard page"""
-    return render_template('dashboard.html')
+    return render_template('dashboard.html', kinds=KINDS)
+
+@auth_bp.route('/dashboard/api/activity')
+@login_required
+def dashboard_activity():
+    """Finds, pings or asset downloads over time, from the pre-aggregated counts.
+    
+    ?kind=find|ping|asset, ?bucket=minute|hour|day, ?days= back from now
+    (limited to how long that bucket is kept), optional ?subject= for one
+    item or asset.
+    """
+    kind = request.args.get('kind', 'find')
+    bucket = request.args.get('bucket', 'hour')
+    if kind not in KINDS or bucket not in BUCKETS:
+        return jsonify({'error': 'Invalid kind or bucket'}), 400
+    retention = {
+        'minute': current_app.config['ANALYTICS_MINUTE_RETENTION_DAYS'],
+        'hour': current_app.config['ANALYTICS_HOUR_RETENTION_DAYS'],
+        'day': 366,
+    }[bucket]
+    days = min(max(request.args.get('days', 1 if bucket == 'minute' else 30, type=int), 1), retention)
+    until = datetime.utcnow()
+    return jsonify(activity(kind, bucket, until - timedelta(days=days), until,
+                            subject=request.args.get('subject') or None))
 
 
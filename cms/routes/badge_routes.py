@@ -1,50 +1,96 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from services.json_handler import JSONHandler
 from services.validator import Validator
 from models import db, ChangeLog
+from services.catalog_sync import changes_since
+from services.badge_view import get_badge_view
+from services.search_index import search_catalog
 
 badge_bp = Blueprint('badge', __name__)
 
 @badge_bp.route('/')
 @login_required
 def list():
-    """List all badges"""
-    handler = JSONHandler()
-    data = handler.read()
+    """List all badges (?search= filters by relevance, ?sort=name orders by name)"""
+    view = get_badge_view()
+    search = request.args.get('search', '').strip()
+    sort = request.args.get('sort')
     
-    items = data.get('items', [])
-    game_badges = data.get('gameBadges', [])
-    
-    # Extract item badges (collectable badges linked to items)
-    item_badges = []
-    for item in items:
-        if item.get('badge'):
-            badge = item['badge'].copy()
-            badge['_type'] = 'item'
-            badge['_item_id'] = item['id']
-            badge['_item_name'] = item['name']
-            item_badges.append(badge)
-    
-    # Mark game badges
-    for badge in game_badges:
-        badge['_type'] = 'game'
-    
-    # Search filter
-    search = request.args.get('search', '').lower()
     if search:
-        item_badges = [b for b in item_badges if 
-                        search in b.get('name', '').lower() or 
-                        search in b.get('id', '').lower()]
-        game_badges = [b for b in game_badges if 
-                      search in b.get('name', '').lower() or 
-                      search in b.get('id', '').lower()]
+        # Ranked by the search index; item badges match on their item too
+        results = search_catalog(search, types=['item', 'game_badge'], limit=None)['results']
+        item_badges = [b for b in (view.get('item', r['id']) for r in results if r['type'] == 'item') if b]
+        game_badges = [b for b in (view.get('game', r['id']) for r in results if r['type'] == 'game_badge') if b]
+        if sort == 'name':
+            item_badges.sort(key=lambda b: b['_sort_key'])
+            game_badges.sort(key=lambda b: b['_sort_key'])
+    else:
+        item_badges, game_badges = view.badges('item', sort), view.badges('game', sort)
     
     return render_template('badges/list.html', 
                          item_badges=item_badges, 
                          game_badges=game_badges,
                          search=search)
 
+@badge_bp.route('/api/badges', methods=['GET'])
+@login_required
+def get_badges():
+    """Get item and game badges.
+    
+    With ?since=<revision> only the badges changed after that catalog
+    revision are returned, as upserted badges and deleted ids. Item badges
+    are keyed by their item's id.
+    """
+    if 'since' in request.args:
+        since = request.args.get('since', type=int)
+        if since is None or since < 0:
+            return jsonify({'error': 'since must be a catalog revision'}), 400
+    else:
+        since = -1  # Always a full snapshot
+    
+    items = changes_since(since, 'item')
+    game_badges = changes_since(since, 'game_badge')
+    
+    def item_badge(item):
+        badge = dict(item['badge'])
+        badge['_item_id'] = item['id']
+        return badge
+    
+    if items['full'] or game_badges['full']:
+        if not items['full']:
+            items = changes_since(-1, 'item')
+        if not game_badges['full']:
+            game_badges = changes_since(-1, 'game_badge')
+        return jsonify({
+            'revision': items['revision'],
+            'full': True,
+            'itemBadges': [item_badge(i) for i in items['entities'] if i.get('badge')],
+            'gameBadges': game_badges['entities']
+        })
+    
+    return jsonify({
+        'revision': items['revision'],
+        'full': False,
+        'itemBadges': {
+            'upserted': [item_badge(i) for i in items['upserted'] if i.get('badge')],
+            # An item that lost its badge counts as a deleted item badge
+            'deleted': items['deleted'] + [i['id'] for i in items['upserted'] if not i.get('badge')]
+        },
+        'gameBadges': {
+            'upserted': game_badges['upserted'],
+            'deleted': game_badges['deleted']
+        }
+    })
+
+@badge_bp.route('/api/search', methods=['GET'])
+@login_required
+def search():
+    """Search item and game badges (?q=&limit=&fuzzy=0|1); item badges are returned as their item"""
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+    fuzzy = request.args.get('fuzzy', '1') != '0'
+    return jsonify(search_catalog(request.args.get('q', ''), types=['item', 'game_badge'], limit=limit, fuzzy=fuzzy))
+
 @badge_bp.route('/edit-game/<badge_id>', methods=['GET', 'POST'])
 @login_required
 def edit_game(badge_id):
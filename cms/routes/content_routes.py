@@ -1,105 +1,468 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from flask_login import login_required
+import queue
+import tempfile
+from datetime import datetime
+from flask import Blueprint, Response, stream_with_context, current_app, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
 from services.json_handler import JSONHandler
+from services.catalog_sync import changes_since
+from services.change_events import change_broker, build_event, format_sse
+from services.catalog_io import (COLLECTIONS, iter_csv, write_xlsx, iter_file, read_csv_rows, read_xlsx_rows,
+                                 plan_import, apply_import, plan_summary, save_plan, load_plan, discard_plan)
+from services.catalog_rows import ITEM_FILTERS, get_catalog_rows
+from services.search_index import get_search_index
+from services.text_replace import find_replace as find_replace_text, text_diff
+from models import db, ChangeLog
 
 content_bp = Blueprint('content', __name__)
 
 @content_bp.route('/bulk-edit')
 @login_required
 def bulk_edit():
-    """Bulk content editor"""
-    handler = JSONHandler()
-    data = handler.read()
+    """Bulk content editor (rows are loaded page by page from /content/api/rows)"""
+    rows = get_catalog_rows()
+    return render_template('content/bulk_edit.html', stats=rows.stats(),
+                           page_size=current_app.config['CONTENT_ROWS_PAGE_SIZE'])
+
+@content_bp.route('/api/rows', methods=['GET'])
+@login_required
+def rows():
+    """One page of content editor rows.
+    
+    ?type=item|game_badge&offset=0&limit=100&sort=name&order=asc|desc&q=<search>
+    and, for items, has_location / has_model / has_badge = 1|0 filters.
+    """
+    row_type = request.args.get('type', 'item')
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', current_app.config['CONTENT_ROWS_PAGE_SIZE'], type=int), 1), 500)
+    
+    ids = None
+    query = request.args.get('q', '').strip()
+    if query:
+        results = get_search_index().search(query, types=[row_type], limit=None)
+        ids = {r['id'] for r in results}
     
-    return render_template('content/bulk_edit.html', data=data)
+    filters = {}
+    if row_type == 'item':
+        for name in ITEM_FILTERS:
+            if request.args.get(name) in ('0', '1'):
+                filters[name] = request.args[name] == '1'
+    
+    try:
+        page = get_catalog_rows().page(
+            row_type, offset, limit,
+            sort=request.args.get('sort', 'name'),
+            descending=request.args.get('order') == 'desc',
+            ids=ids, filters=filters
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(page)
+
+# Item fields edited through the nested badge object
+ITEM_BADGE_FIELDS = {'badge_name': 'name', 'badge_description': 'description'}
 
 @content_bp.route('/update', methods=['POST'])
 @login_required
 def update():
-    """Update content via AJAX"""
+    """Update content via AJAX.
+    
+    Body: {"edits": [{"type": "item"|"game_badge", "id", "field", "value"}, ...]}
+    (or a single edit object). Edits apply in order; if any is invalid nothing
+    is saved. Returns one result per edit.
+    """
+    payload = request.get_json(silent=True) or {}
+    edits = payload.get('edits')
+    if edits is None:
+        edits = [payload]
+    if not isinstance(edits, list) or not edits:
+        return jsonify({'error': 'Missing edits'}), 400
+    if len(edits) > current_app.config['CONTENT_MAX_BATCH_EDITS']:
+        return jsonify({'error': f"Too many edits (max {current_app.config['CONTENT_MAX_BATCH_EDITS']})"}), 400
+    
     handler = JSONHandler()
     data = handler.read()
+    entities = {
+        'item': {i['id']: i for i in data['items']},
+        'game_badge': {b['id']: b for b in data['gameBadges']}
+    }
     
-    entity_type = request.json.get('type')  # 'item' or 'badge'
-    entity_id = request.json.get('id')
-    field = request.json.get('field')
-    value = request.json.get('value')
+    results = []
+    changed = set()
+    for index, edit in enumerate(edits):
+        error = _apply_edit(entities, edit)
+        results.append({'index': index, 'success': error is None, 'error': error})
+        if error is None:
+            changed.add((edit['type'], edit['id']))
     
-    if not all([entity_type, entity_id, field, value is not None]):
-        return jsonify({'error': 'Missing required fields'}), 400
-    
-    # Find and update
-    if entity_type == 'item':
-        for item in data['items']:
-            if item['id'] == entity_id:
-                if field in item:
-                    item[field] = value
-                elif field == 'badge_description' and item.get('badge'):
-                    item['badge']['description'] = value
-                elif field == 'badge_name' and item.get('badge'):
-                    item['badge']['name'] = value
-                break
-    elif entity_type == 'game_badge':
-        for badge in data['gameBadges']:
-            if badge['id'] == entity_id:
-                if field in badge:
-                    badge[field] = value
-                break
+    if any(not r['success'] for r in results):
+        return jsonify({'error': 'Validation failed', 'results': results}), 400
     
     # Save
     try:
         handler.write(data)
-        return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    # One log entry for the whole batch
+    change = ChangeLog(
+        user_id=current_user.id,
+        action='update',
+        entity_type=next(iter(changed))[0] if len(changed) == 1 else 'content',
+        entity_id=next(iter(changed))[1] if len(changed) == 1 else None,
+        changes=f"Edited {len(edits)} field(s) of {len(changed)} entities in content editor"
+    )
+    db.session.add(change)
+    db.session.commit()
+    
+    return jsonify({'success': True, 'revision': data.get('revision', 0), 'results': results})
+
+def _apply_edit(entities, edit):
+    """Apply one field edit to the looked-up entities; return an error message or None"""
+    if not isinstance(edit, dict):
+        return 'Edit must be an object'
+    entity_type = edit.get('type')
+    entity_id = edit.get('id')
+    field = edit.get('field')
+    value = edit.get('value')
+    
+    if not all([entity_type, entity_id, field, value is not None]):
+        return 'Missing required fields'
+    if not all(isinstance(v, str) for v in (entity_type, entity_id, field)):
+        return 'type, id and field must be strings'
+    if entity_type not in entities:
+        return f'Unknown type: {entity_type}'
+    entity = entities[entity_type].get(entity_id)
+    if entity is None:
+        return 'Not found'
+    
+    target, key = entity, field
+    if entity_type == 'item' and field in ITEM_BADGE_FIELDS:
+        if not isinstance(entity.get('badge'), dict):
+            return 'Item has no badge'
+        target, key = entity['badge'], ITEM_BADGE_FIELDS[field]
+    
+    if key == 'id' or key not in target:
+        return f'Field cannot be edited: {field}'
+    current = target[key]
+    if isinstance(current, str):
+        if not isinstance(value, str):
+            return f'{field} must be text'
+        if key == 'name' and not value.strip():
+            return 'Name cannot be empty'
+    elif isinstance(current, (int, float)) and not isinstance(current, bool):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return f'{field} must be a number'
+    else:
+        return f'Field cannot be edited: {field}'
+    
+    target[key] = value
+    return None
 
 @content_bp.route('/find-replace', methods=['POST'])
 @login_required
 def find_replace():
-    """Find and replace text across all content"""
-    handler = JSONHandler()
-    data = handler.read()
-    
+    """Find and replace text across all content (single literal rule from the form)"""
     find_text = request.form.get('find', '').strip()
     replace_text = request.form.get('replace', '').strip()
     scope = request.form.get('scope', 'all')  # all, items, badges
+    mode = request.form.get('mode', 'literal')
     
     if not find_text:
         flash('Find text is required', 'error')
         return redirect(url_for('content.bulk_edit'))
     
-    changes = []
-    
-    if scope in ['all', 'items']:
-        for item in data['items']:
-            # Update description fields
-            for field in ['name', 'scientificName', 'description', 'badgeDescription']:
-                if field in item and find_text in str(item[field]):
-                    item[field] = str(item[field]).replace(find_text, replace_text)
-                    changes.append(f"Item {item['id']}: {field}")
-            
-            # Update badge fields
-            if item.get('badge'):
-                for field in ['name', 'description']:
-                    if field in item['badge'] and find_text in str(item['badge'][field]):
-                        item['badge'][field] = str(item['badge'][field]).replace(find_text, replace_text)
-                        changes.append(f"Item {item['id']} badge: {field}")
-    
-    if scope in ['all', 'badges']:
-        for badge in data['gameBadges']:
-            for field in ['name', 'description']:
-                if field in badge and find_text in str(badge[field]):
-                    badge[field] = str(badge[field]).replace(find_text, replace_text)
-                    changes.append(f"Game badge {badge['id']}: {field}")
+    rules = [{'find': find_text, 'replace': replace_text, 'mode': mode}]
+    try:
+        changes = _apply_find_replace(rules, scope)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('content.bulk_edit'))
+    except Exception as e:
+        flash(f'Error saving changes: {str(e)}', 'error')
+        return redirect(url_for('content.bulk_edit'))
     
     if changes:
-        try:
-            handler.write(data)
-            flash(f'Replaced "{find_text}" with "{replace_text}" in {len(changes)} locations', 'success')
-        except Exception as e:
-            flash(f'Error saving changes: {str(e)}', 'error')
+        flash(f'Replaced "{find_text}" with "{replace_text}" in {len(changes)} locations', 'success')
     else:
         flash('No matches found', 'info')
     
     return redirect(url_for('content.bulk_edit'))
 
+def _find_replace_request():
+    """Rules and scope from a JSON find & replace request (raises ValueError)"""
+    payload = request.get_json(silent=True) or {}
+    rules = payload.get('rules')
+    if not isinstance(rules, list) or not rules:
+        raise ValueError('At least one rule is required')
+    if len(rules) > current_app.config['FIND_REPLACE_MAX_RULES']:
+        raise ValueError(f"Too many rules (max {current_app.config['FIND_REPLACE_MAX_RULES']})")
+    return payload, rules, payload.get('scope', 'all')
+
+def _apply_find_replace(rules, scope, expected_revision=None):
+    """Apply rules to the catalog in one write with one ChangeLog entry.
+    
+    Returns the list of changed fields. Raises ValueError for bad rules and
+    LookupError when the catalog moved past expected_revision.
+    """
+    handler = JSONHandler()
+    data = handler.read()
+    if expected_revision is not None and data.get('revision', 0) != expected_revision:
+        raise LookupError('Content changed since the preview; preview again before applying')
+    
+    changes = find_replace_text(data, rules, scope, apply=True)
+    if not changes:
+        return changes
+    
+    handler.write(data)
+    
+    replacements = sum(c['count'] for c in changes)
+    entities = {(c['type'], c['id']) for c in changes}
+    change = ChangeLog(
+        user_id=current_user.id,
+        action='update',
+        entity_type='content',
+        entity_id=None,
+        changes=f"Find & replace ({len(rules)} rule(s)): {replacements} replacement(s) "
+                f"in {len(changes)} field(s) of {len(entities)} entities"
+    )
+    db.session.add(change)
+    db.session.commit()
+    return changes
+
+@content_bp.route('/api/find-replace/preview', methods=['POST'])
+@login_required
+def find_replace_preview():
+    """Dry run of find & replace rules, one page of changed fields at a time.
+    
+    Body: {"rules": [{"find", "replace", "mode": literal|ignore_case|regex}],
+    "scope": all|items|badges, "page": 1, "per_page": 50}
+    """
+    try:
+        payload, rules, scope = _find_replace_request()
+        data = JSONHandler().read_cached()
+        per_page = min(max(int(payload.get('per_page') or current_app.config['FIND_REPLACE_PAGE_SIZE']), 1), 500)
+        page = int(payload.get('page') or 1)
+        changes = find_replace_text(data, rules, scope)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    pages = max(1, -(-len(changes) // per_page))
+    page = min(max(page, 1), pages)
+    page_changes = changes[(page - 1) * per_page:page * per_page]
+    for change in page_changes:
+        change['diff'] = text_diff(change.pop('before'), change.pop('after'))
+    
+    return jsonify({
+        'revision': data.get('revision', 0),
+        'total_fields': len(changes),
+        'total_replacements': sum(c['count'] for c in changes),
+        'total_entities': len({(c['type'], c['id']) for c in changes}),
+        'page': page,
+        'pages': pages,
+        'per_page': per_page,
+        'changes': page_changes
+    })
+
+@content_bp.route('/api/find-replace', methods=['POST'])
+@login_required
+def find_replace_apply():
+    """Apply find & replace rules in one write.
+    
+    Same body as the preview plus the preview's "revision"; if the content
+    changed since then nothing is written and 409 is returned.
+    """
+    try:
+        payload, rules, scope = _find_replace_request()
+        changes = _apply_find_replace(rules, scope, payload.get('revision'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'revision': JSONHandler().read_cached().get('revision', 0),
+        'fields': len(changes),
+        'replacements': sum(c['count'] for c in changes)
+    })
+
+@content_bp.route('/export')
+@login_required
+def export():
+    """Download the catalog as a spreadsheet.
+    
+    ?format=csv&type=item|game_badge streams one collection as CSV;
+    ?format=xlsx returns both as worksheets (needs openpyxl).
+    """
+    data = JSONHandler().read_cached()
+    export_format = request.args.get('format', 'csv')
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    if export_format == 'xlsx':
+        output = tempfile.TemporaryFile()
+        try:
+            write_xlsx(data, output)
+        except RuntimeError as e:
+            output.close()
+            return jsonify({'error': str(e)}), 400
+        return Response(iter_file(output),
+                        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                        headers={'Content-Disposition': f'attachment; filename=catalog_{stamp}.xlsx'})
+    
+    entity_type = request.args.get('type', 'item')
+    if export_format != 'csv' or entity_type not in COLLECTIONS:
+        return jsonify({'error': "format must be csv or xlsx, type must be 'item' or 'game_badge'"}), 400
+    return Response(stream_with_context(iter_csv(data, entity_type)), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={COLLECTIONS[entity_type]}_{stamp}.csv'})
+
+@content_bp.route('/import')
+@login_required
+def import_page():
+    """Spreadsheet import: upload, preview the changes, then commit"""
+    return render_template('content/import.html')
+
+@content_bp.route('/api/import/preview', methods=['POST'])
+@login_required
+def import_preview():
+    """Check an uploaded CSV (with a "type" field) or XLSX file against the catalog.
+    
+    Nothing is written; the response lists the changes and row errors and
+    carries a token for /content/api/import/commit.
+    """
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'No file uploaded'}), 400
+    
+    filename = upload.filename.lower()
+    try:
+        if filename.endswith('.xlsx'):
+            rows = read_xlsx_rows(upload.stream)
+        elif filename.endswith('.csv'):
+            entity_type = request.form.get('type', 'item')
+            if entity_type not in COLLECTIONS:
+                return jsonify({'error': "type must be 'item' or 'game_badge'"}), 400
+            rows = read_csv_rows(upload.stream, entity_type)
+        else:
+            return jsonify({'error': 'Upload a .csv or .xlsx file'}), 400
+        plan = plan_import(JSONHandler().read_cached(), rows)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Could not read file: {str(e)}'}), 400
+    
+    token = save_plan(plan)
+    return jsonify(plan_summary(plan, token))
+
+@content_bp.route('/api/import/commit', methods=['POST'])
+@login_required
+def import_commit():
+    """Apply a previewed import in one write with one ChangeLog entry.
+    
+    Body: {"token": ...}. Refused (409) if the catalog changed since the
+    preview, and (400) if the preview had row errors.
+    """
+    payload = request.get_json(silent=True)
+    token = payload.get('token') if isinstance(payload, dict) else None
+    try:
+        plan = load_plan(token)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    if plan['error_count']:
+        return jsonify({'error': 'Fix the rows with errors and upload the file again'}), 400
+    
+    handler = JSONHandler()
+    data = handler.read()
+    if data.get('revision', 0) != plan['revision']:
+        return jsonify({'error': 'Content changed since the preview; upload the file again'}), 409
+    
+    if plan['changes']:
+        apply_import(data, plan)
+        try:
+            handler.write(data)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        
+        counts = plan['counts']
+        change = ChangeLog(
+            user_id=current_user.id,
+            action='update',
+            entity_type='content',
+            entity_id=None,
+            changes=f"Spreadsheet import: {counts['create']} created, {counts['update']} updated"
+        )
+        db.session.add(change)
+        db.session.commit()
+    discard_plan(token)
+    
+    return jsonify({
+        'success': True,
+        'revision': JSONHandler().read_cached().get('revision', 0),
+        'counts': plan['counts']
+    })
+
+@content_bp.route('/api/events')
+@login_required
+def events():
+    """Server-Sent Events stream of catalog changes.
+    
+    Each event carries the catalog revision as its id. A reconnecting client
+    sends Last-Event-ID (or ?since=) and first receives what it missed, or a
+    reset event when that history is no longer kept.
+    """
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        since = int(since) if since else None
+    except ValueError:
+        return jsonify({'error': 'since must be a catalog revision'}), 400
+    
+    keepalive = current_app.config['CHANGE_EVENTS_KEEPALIVE_SECONDS']
+    # Subscribe before catching up so nothing published in between is lost
+    subscriber = change_broker.subscribe()
+    catch_up = _catch_up_event(since) if since is not None else None
+    
+    def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            if catch_up:
+                yield format_sse(catch_up)
+            while True:
+                if subscriber.lagged:
+                    # Events were dropped: skip the backlog and tell the client to reload
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    subscriber.lagged = False
+                    revision = JSONHandler().read_cached().get('revision', 0)
+                    yield format_sse(build_event(revision, [], {}, reset=True))
+                try:
+                    event = subscriber.queue.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if catch_up and event['revision'] <= catch_up['revision']:
+                    continue
+                yield format_sse(event)
+        finally:
+            change_broker.unsubscribe(subscriber)
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def _catch_up_event(since):
+    """Changes after revision `since` as one event (None when there are none)"""
+    items = changes_since(since, 'item')
+    game_badges = changes_since(since, 'game_badge')
+    revision = items['revision']
+    if items['full'] or game_badges['full']:
+        return build_event(revision, [], {}, reset=True)
+    if revision == since:
+        return None
+    
+    changes = []
+    for entity_type, delta in (('item', items), ('game_badge', game_badges)):
+        for entity in delta['upserted']:
+            changes.append({'type': entity_type, 'id': str(entity.get('id')), 'action': 'upsert', 'entity': entity})
+        for entity_id in delta['deleted']:
+            changes.append({'type': entity_type, 'id': entity_id, 'action': 'delete'})
+    return {'revision': revision, 'user': None, 'reset': False, 'changes': changes}
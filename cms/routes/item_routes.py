@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 from services.json_handler import JSONHandler
 from services.validator import Validator
 from services.file_handler import FileHandler
+from services.search_index import get_search_index, search_catalog
 from models import db, ChangeLog
 from datetime import datetime
 from pathlib import Path
@@ -18,8 +19,14 @@ def list():
     data = handler.read()
     all_items = data.get('items', [])
     
-    # Sort items by name for dropdown
-    all_items = sorted(all_items, key=lambda x: x.get('name', '').lower())
+    # Sort items by name for dropdown, or by relevance when searching
+    query = request.args.get('q', '').strip()
+    if query:
+        ranked = [r['id'] for r in get_search_index().search(query, types=['item'], limit=None)]
+        items_by_id = {a.get('id'): a for a in all_items}
+        all_items = [items_by_id[item_id] for item_id in ranked if item_id in items_by_id]
+    else:
+        all_items = sorted(all_items, key=lambda x: x.get('name', '').lower())
     
     # Get selected item ID from query parameter
     selected_id = request.args.get('item_id', '')
@@ -37,7 +44,8 @@ def list():
                          all_items=all_items, 
                          items=items, 
                          selected_item=selected_item,
-                         selected_id=selected_id))
+                         selected_id=selected_id,
+                         query=query))
     
     # Add cache control headers to ensure fresh data
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
@@ -46,6 +54,14 @@ def list():
     
     return response
 
+@item_bp.route('/api/search', methods=['GET'])
+@login_required
+def search():
+    """Search items by name, scientific name, description, place and badge (?q=&limit=&fuzzy=0|1)"""
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+    fuzzy = request.args.get('fuzzy', '1') != '0'
+    return jsonify(search_catalog(request.args.get('q', ''), types=['item'], limit=limit, fuzzy=fuzzy))
+
 @item_bp.route('/edit/<item_id>', methods=['GET', 'POST'])
 @login_required
 def edit(item_id):
@@ -191,6 +207,9 @@ def edit(item_id):
                                  available_found=available_found,
                                  available_badges=available_badges)
         
+        # Geofence overlaps and crowding are warnings, not errors
+        geofence_warnings = Validator.check_geofences([item])
+        
         # Save
         try:
             handler.write(data)
@@ -207,6 +226,8 @@ def edit(item_id):
             db.session.commit()
             
             flash('Item updated successfully', 'success')
+            for warning in geofence_warnings:
+                flash(warning, 'warning')
             return redirect(url_for('item.list'))
         except Exception as e:
             flash(f'Error saving item: {str(e)}', 'error')
@@ -356,6 +377,9 @@ def create():
                                  available_found=available_found,
                                  available_badges=available_badges)
         
+        # Geofence overlaps and crowding are warnings, not errors
+        geofence_warnings = Validator.check_geofences([new_item])
+        
         # Add to data
         data['items'].append(new_item)
         
@@ -375,6 +399,8 @@ def create():
             db.session.commit()
             
             flash('Item created successfully', 'success')
+            for warning in geofence_warnings:
+                flash(warning, 'warning')
             return redirect(url_for('item.list'))
         except Exception as e:
             flash(f'Error creating item: {str(e)}', 'error')
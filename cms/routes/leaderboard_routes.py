@@ -1,44 +1,142 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from flask_login import login_required
+import hashlib
+from datetime import datetime
+
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+from models import db, ChangeLog, Player, ScoreEvent
+from services.leaderboard import leaderboard, player_page, player_summary
+from services.progress_sync import player_collection
 
 leaderboard_bp = Blueprint('leaderboard', __name__)
 
+PLAYER_FILTERS = ('visible', 'hidden', 'all')
+
+# Latest score events listed on a player's page
+RECENT_EVENTS = 50
+
+
+def _page_args():
+    """(after, before, limit, show) from the query string"""
+    limit = min(max(request.args.get('limit', current_app.config['LEADERBOARD_PAGE_SIZE'], type=int), 1),
+                current_app.config['LEADERBOARD_MAX_PAGE_SIZE'])
+    show = request.args.get('show', 'visible')
+    if show not in PLAYER_FILTERS:
+        show = 'visible'
+    return request.args.get('after') or None, request.args.get('before') or None, limit, show
+
+
+def _set_hidden(player_id, hidden):
+    player = Player.query.filter_by(player_id=player_id).first()
+    if not player:
+        flash('Player not found', 'error')
+        return redirect(url_for('leaderboard.users'))
+    if player.hidden != hidden:
+        player.hidden = hidden
+        # Other workers pick the change up from updated_at
+        player.updated_at = datetime.utcnow()
+        db.session.add(ChangeLog(
+            user_id=current_user.id,
+            action='delete' if hidden else 'restore',
+            entity_type='player',
+            entity_id=player.player_id,
+            changes=f"{'Removed' if hidden else 'Restored'} player {player.nickname or player.player_id} "
+                    f"({player.score} points) {'from' if hidden else 'to'} the leaderboard"
+        ))
+        db.session.commit()
+        leaderboard.apply(player)
+    flash(f"Player {'removed from' if hidden else 'restored to'} the leaderboard", 'success')
+    if request.form.get('next') == 'detail':
+        return redirect(url_for('leaderboard.user_detail', user_id=player.player_id))
+    return redirect(url_for('leaderboard.users'))
+
+
 @leaderboard_bp.route('/users')
 @login_required
 def users():
-    """List leaderboard users"""
-    # Note: This is a placeholder for future leaderboard backend integration
-    # Currently, leaderboard data is stored in localStorage on the client side
-    # This will need to be updated when the backend API is ready
-    
-    # For now, show a message about future integration
-    return render_template('leaderboard/users.html', 
-                         message="Leaderboard user management will be available when the backend API is integrated.")
+    """List leaderboard players, best first, a page at a time"""
+    query = request.args.get('q', '').strip()
+    if query:
+        if Player.query.filter_by(player_id=query).first():
+            return redirect(url_for('leaderboard.user_detail', user_id=query))
+        flash(f'No player with id {query}', 'error')
+
+    after, before, limit, show = _page_args()
+    try:
+        page = player_page(after, before, limit, show)
+    except ValueError:
+        flash('That page link is no longer valid; showing the top of the leaderboard', 'info')
+        page = player_page(limit=limit, show=show)
+
+    ranks = leaderboard.ranks_of([p.player_id for p in page['players']])
+    return render_template('leaderboard/users.html',
+                         players=page['players'],
+                         ranks=ranks,
+                         next_cursor=page['next'],
+                         prev_cursor=page['prev'],
+                         limit=limit,
+                         show=show,
+                         filters=PLAYER_FILTERS,
+                         total=len(leaderboard))
 
 @leaderboard_bp.route('/user/<user_id>')
 @login_required
 def user_detail(user_id):
-    """View user details"""
-    # Placeholder for future implementation
-    return render_template('leaderboard/user_detail.html', 
-                         user_id=user_id,
-                         message="User details will be available when the backend API is integrated.")
+    """A player's standing and recent score events"""
+    player = Player.query.filter_by(player_id=user_id).first()
+    if not player:
+        flash('Player not found', 'error')
+        return redirect(url_for('leaderboard.users'))
+
+    events = (ScoreEvent.query.filter_by(player_id=user_id)
+              .order_by(ScoreEvent.created_at.desc()).limit(RECENT_EVENTS).all())
+    totals = {kind: {'events': count, 'points': points or 0} for kind, count, points in
+              db.session.query(ScoreEvent.kind, db.func.count(ScoreEvent.id), db.func.sum(ScoreEvent.points))
+              .filter(ScoreEvent.player_id == user_id).group_by(ScoreEvent.kind)}
+    entry = leaderboard.rank_of(user_id)
+
+    return render_template('leaderboard/user_detail.html',
+                         player=player,
+                         rank=entry['rank'] if entry else None,
+                         around=leaderboard.around(user_id, 2) if entry else [],
+                         events=events,
+                         totals=totals,
+                         collection=player_collection(user_id),
+                         recent_limit=RECENT_EVENTS)
 
 @leaderboard_bp.route('/user/<user_id>/delete', methods=['POST'])
 @login_required
 def delete_user(user_id):
-    """Delete user"""
-    # Placeholder for future implementation
-    flash('User deletion will be available when the backend API is integrated.', 'info')
-    return redirect(url_for('leaderboard.users'))
+    """Remove a player from the leaderboard (their row and events are kept)"""
+    return _set_hidden(user_id, True)
+
+@leaderboard_bp.route('/user/<user_id>/restore', methods=['POST'])
+@login_required
+def restore_user(user_id):
+    """Put a removed player back on the leaderboard"""
+    return _set_hidden(user_id, False)
 
 @leaderboard_bp.route('/api/users', methods=['GET'])
 @login_required
 def api_users():
-    """API endpoint for user list (placeholder)"""
-    # This will connect to the leaderboard backend when ready
-    return jsonify({
-        'users': [],
-        'message': 'Leaderboard API integration pending'
-    })
+    """Players in leaderboard order: ?after= or ?before= cursor, ?limit=, ?show=visible|hidden|all.
 
+    The first page carries an ETag so polling clients get 304 while the top
+    of the board is unchanged.
+    """
+    after, before, limit, show = _page_args()
+    try:
+        page = player_page(after, before, limit, show)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    ranks = leaderboard.ranks_of([p.player_id for p in page['players']])
+    response = jsonify({
+        'users': [player_summary(p, ranks.get(p.player_id)) for p in page['players']],
+        'next': page['next'],
+        'prev': page['prev']
+    })
+    if not (after or before):
+        response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+        response.headers['Cache-Control'] = 'no-cache'
+        response.make_conditional(request)
+    return response
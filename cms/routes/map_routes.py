@@ -1,23 +1,111 @@
 from flask import Blueprint, render_template, request, jsonify
-from flask_login import login_required
+from flask_login import login_required, current_user
+from config import Config
 from services.json_handler import JSONHandler
 from services.validator import Validator
+from models import db, ChangeLog
+from services.geo import parse_bbox
+from services.spatial_index import get_spatial_index
+from services.map_clusters import get_map_clusters
+from services.catalog_sync import changes_since
+from services.geofence_analysis import get_geofence_analysis
+from services.projections import project_entity
 
 map_bp = Blueprint('map', __name__)
 
+# Fields of every item sent for the editor's item selector and table
+LIST_FIELDS = ['id', 'name', 'scientificName', 'location', 'radiusMeters']
+
 @map_bp.route('/')
 @login_required
 def index():
     """Interactive map page"""
-    return render_template('map.html')
+    return render_template('map.html', cluster_max_zoom=Config.MAP_CLUSTER_MAX_ZOOM)
 
 @map_bp.route('/api/items', methods=['GET'])
 @login_required
 def get_items():
-    """Get all collectable items for map display"""
-    handler = JSONHandler()
-    data = handler.read()
-    return jsonify(data['items'])
+    """Get collectable items for map display.
+    
+    With ?bbox=west,south,east,north (and optional zoom) only the items in
+    view are returned; without it, every item. ?fields=list returns every
+    item with only the fields the editor's item list shows. With
+    ?since=<revision> only the items changed after that catalog revision
+    are returned.
+    """
+    if 'since' in request.args:
+        since = request.args.get('since', type=int)
+        if since is None or since < 0:
+            return jsonify({'error': 'since must be a catalog revision'}), 400
+        delta = changes_since(since, 'item')
+        if delta['full']:
+            return jsonify({'revision': delta['revision'], 'full': True, 'items': delta['entities']})
+        return jsonify(delta)
+    
+    if request.args.get('fields') == 'list':
+        items = JSONHandler().read_cached()['items']
+        return jsonify([project_entity(item, LIST_FIELDS) for item in items])
+    
+    bbox = request.args.get('bbox')
+    if not bbox:
+        handler = JSONHandler()
+        return jsonify(handler.read_cached()['items'])
+    
+    try:
+        south, west, north, east = parse_bbox(bbox)
+        zoom = request.args.get('zoom', type=int)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    index = get_spatial_index()
+    return jsonify(index.query_bbox(south, west, north, east, zoom=zoom))
+
+@map_bp.route('/api/items/nearest', methods=['GET'])
+@login_required
+def nearest_items():
+    """Get the items nearest to a point (?lat=&lng=&n=&max_distance=)"""
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    n = min(request.args.get('n', 5, type=int), 100)
+    max_distance = request.args.get('max_distance', type=float)
+    
+    if lat is None or lng is None:
+        return jsonify({'error': 'Missing coordinates'}), 400
+    if not Validator.validate_coordinates(lat, lng):
+        return jsonify({'error': 'Invalid coordinates'}), 400
+    
+    index = get_spatial_index()
+    results = index.nearest(lat, lng, n, max_distance)
+    return jsonify([{'distance_m': round(distance, 2), 'item': item} for distance, item in results])
+
+@map_bp.route('/api/clusters', methods=['GET'])
+@login_required
+def get_clusters():
+    """Get marker clusters for a zoom level (?zoom=N, optional bbox=west,south,east,north)"""
+    zoom = request.args.get('zoom', type=int)
+    if zoom is None or not 0 <= zoom <= 22:
+        return jsonify({'error': 'zoom must be between 0 and 22'}), 400
+    
+    bounds = (None, None, None, None)
+    if request.args.get('bbox'):
+        try:
+            bounds = parse_bbox(request.args['bbox'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    clusters = get_map_clusters()
+    return jsonify({
+        'revision': clusters.index.revision,
+        'zoom': zoom,
+        'clusters': clusters.query(zoom, *bounds)
+    })
+
+@map_bp.route('/api/geofence-report', methods=['GET'])
+@login_required
+def geofence_report():
+    """Overlapping geofences, items closer than GEOFENCE_MIN_SEPARATION_METERS
+    and dense hot spots across the whole catalog"""
+    return jsonify(get_geofence_analysis().report())
 
 @map_bp.route('/api/update-location', methods=['POST'])
 @login_required
@@ -52,13 +140,93 @@ def update_location():
     if not found:
         return jsonify({'error': 'Item not found'}), 404
     
+    warnings = get_geofence_analysis().check_items([item])
+    
     # Save
     try:
         handler.write(data)
-        return jsonify({'success': True, 'item': item})
+        return jsonify({'success': True, 'item': item, 'warnings': warnings})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@map_bp.route('/api/update-locations', methods=['POST'])
+@login_required
+def update_locations():
+    """Apply many location moves in one write.
+    
+    Body: {"moves": [{"item_id": ..., "lat": ..., "lng": ..., "radius": ...}, ...]}
+    (radius optional). Every move is validated first; if any fails nothing is
+    saved. A later move for the same item replaces an earlier one.
+    """
+    payload = request.get_json(silent=True) or {}
+    moves = payload.get('moves')
+    if not isinstance(moves, list) or not moves:
+        return jsonify({'error': 'Missing moves'}), 400
+    if len(moves) > Config.MAP_MAX_BATCH_MOVES:
+        return jsonify({'error': f'Too many moves (max {Config.MAP_MAX_BATCH_MOVES})'}), 400
+    
+    handler = JSONHandler()
+    data = handler.read()
+    items_by_id = {i['id']: i for i in data['items']}
+    
+    errors = []
+    latest = {}
+    for index, move in enumerate(moves):
+        if not isinstance(move, dict):
+            errors.append({'index': index, 'error': 'Move must be an object'})
+            continue
+        item_id = move.get('item_id')
+        lat = move.get('lat')
+        lng = move.get('lng')
+        radius = move.get('radius')
+        
+        if not item_id or lat is None or lng is None:
+            errors.append({'index': index, 'item_id': item_id, 'error': 'Missing required fields'})
+        elif not isinstance(item_id, str):
+            errors.append({'index': index, 'error': 'item_id must be a string'})
+        elif item_id not in items_by_id:
+            errors.append({'index': index, 'item_id': item_id, 'error': 'Item not found'})
+        elif not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)) \
+                or not Validator.validate_coordinates(lat, lng):
+            errors.append({'index': index, 'item_id': item_id, 'error': 'Invalid coordinates'})
+        elif radius is not None and (not isinstance(radius, (int, float)) or radius <= 0):
+            errors.append({'index': index, 'item_id': item_id, 'error': 'Invalid radius'})
+        else:
+            latest[item_id] = move
+    
+    if errors:
+        return jsonify({'error': 'Validation failed', 'errors': errors}), 400
+    
+    updated = []
+    for item_id, move in latest.items():
+        item = items_by_id[item_id]
+        item['location'] = {'lat': move['lat'], 'lng': move['lng']}
+        if move.get('radius') is not None:
+            item['radiusMeters'] = move['radius']
+        updated.append(item)
+    
+    # Checked against the grid of the catalog before this write
+    warnings = get_geofence_analysis().check_items(updated)
+    
+    try:
+        handler.write(data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    # One log entry for the whole batch
+    names = ', '.join(item.get('name', item['id']) for item in updated)
+    change = ChangeLog(
+        user_id=current_user.id,
+        action='update',
+        entity_type='item',
+        entity_id=updated[0]['id'] if len(updated) == 1 else None,
+        changes=f"Moved {len(updated)} item(s) on map: {names}"
+    )
+    db.session.add(change)
+    db.session.commit()
+    
+    return jsonify({'success': True, 'items': updated, 'warnings': warnings})
+
 @map_bp.route('/api/create-item', methods=['POST'])
 @login_required
 def create_item():
@@ -123,9 +291,11 @@ def create_item():
     
     data['items'].append(new_item)
     
+    warnings = get_geofence_analysis().check_items([new_item])
+    
     try:
         handler.write(data)
-        return jsonify({'success': True, 'item': new_item})
+        return jsonify({'success': True, 'item': new_item, 'warnings': warnings})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -0,0 +1,284 @@
+import hashlib
+from flask import Blueprint, current_app, request, jsonify
+from config import Config
+from services.analytics import analytics, normalize_asset_path
+from services.badge_view import get_badge_view
+from services.geo import parse_bbox
+from services.geofence import get_geofence_index, ping_cooldowns
+from services.leaderboard import leaderboard, public_entry
+from services.leaderboard_snapshots import PERIODS, snapshot_body, snapshot_scheduler
+from services.map_clusters import get_map_clusters
+from services.progress_sync import sync_progress
+from services.projections import VIEW_FIELDS, project_entity
+from services.score_ingest import parse_event, score_buffer
+from services.spatial_index import get_spatial_index
+from services.validator import Validator
+
+public_bp = Blueprint('public', __name__)
+
+# Visitor-facing endpoints: no login, same item fields as the public map view
+MAP_FIELDS = VIEW_FIELDS['map']['items']
+
+@public_bp.after_request
+def add_cors_headers(response):
+    """Allow the static site (possibly on a CDN origin) to call these endpoints"""
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+    response.headers['Access-Control-Expose-Headers'] = 'Retry-After'
+    return response
+
+@public_bp.route('/items', methods=['GET'])
+def items_in_view():
+    """Items inside ?bbox=west,south,east,north (optional zoom)"""
+    bbox = request.args.get('bbox')
+    if not bbox:
+        return jsonify({'error': 'bbox is required'}), 400
+
+    try:
+        south, west, north, east = parse_bbox(bbox)
+        zoom = request.args.get('zoom', type=int)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    index = get_spatial_index()
+    items = index.query_bbox(south, west, north, east, zoom=zoom)
+    return jsonify({
+        'revision': index.revision,
+        'items': [project_entity(item, MAP_FIELDS) for item in items]
+    })
+
+@public_bp.route('/clusters', methods=['GET'])
+def clusters():
+    """Marker clusters for ?zoom=N (optional bbox=west,south,east,north)"""
+    zoom = request.args.get('zoom', type=int)
+    if zoom is None or not 0 <= zoom <= 22:
+        return jsonify({'error': 'zoom must be between 0 and 22'}), 400
+
+    bounds = (None, None, None, None)
+    if request.args.get('bbox'):
+        try:
+            bounds = parse_bbox(request.args['bbox'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    map_clusters = get_map_clusters()
+    return jsonify({
+        'revision': map_clusters.index.revision,
+        'zoom': zoom,
+        'clusters': map_clusters.query(zoom, *bounds)
+    })
+
+@public_bp.route('/items/nearest', methods=['GET'])
+def nearest_items():
+    """Items nearest to ?lat=&lng= (optional n, max_distance in meters)"""
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    n = min(request.args.get('n', 5, type=int), 50)
+    max_distance = request.args.get('max_distance', type=float)
+
+    if lat is None or lng is None:
+        return jsonify({'error': 'Missing coordinates'}), 400
+    if not Validator.validate_coordinates(lat, lng):
+        return jsonify({'error': 'Invalid coordinates'}), 400
+
+    index = get_spatial_index()
+    results = index.nearest(lat, lng, n, max_distance)
+    return jsonify({
+        'revision': index.revision,
+        'items': [
+            {'distance_m': round(distance, 2), 'item': project_entity(item, MAP_FIELDS)}
+            for distance, item in results
+        ]
+    })
+
+@public_bp.route('/geofence', methods=['GET', 'POST'])
+def geofence():
+    """Items whose geofence contains a position.
+    
+    GET ?lat=&lng=&device_id= for one position, or POST
+    {"device_id": ..., "positions": [{"lat": ..., "lng": ...}, ...]} for a batch.
+    With a device_id each hit reports whether it should ping now, honouring
+    the item's ping.cooldownMinutes.
+    """
+    if request.method == 'POST':
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        raw_positions = payload.get('positions')
+        if raw_positions is None and 'lat' in payload:
+            raw_positions = [payload]
+        device_id = payload.get('device_id')
+    else:
+        raw_positions = [{'lat': request.args.get('lat', type=float),
+                          'lng': request.args.get('lng', type=float)}]
+        device_id = request.args.get('device_id')
+    
+    if not isinstance(raw_positions, list) or not raw_positions:
+        return jsonify({'error': 'Missing positions'}), 400
+    if len(raw_positions) > current_app.config['GEOFENCE_MAX_POSITIONS']:
+        return jsonify({'error': 'Too many positions'}), 400
+    
+    positions = []
+    for position in raw_positions:
+        lat = position.get('lat') if isinstance(position, dict) else None
+        lng = position.get('lng') if isinstance(position, dict) else None
+        if (not isinstance(lat, (int, float)) or not isinstance(lng, (int, float))
+                or isinstance(lat, bool) or isinstance(lng, bool)):
+            return jsonify({'error': 'Missing coordinates'}), 400
+        if not Validator.validate_coordinates(lat, lng):
+            return jsonify({'error': 'Invalid coordinates'}), 400
+        positions.append((float(lat), float(lng)))
+    
+    index = get_geofence_index()
+    results = []
+    for (lat, lng), hits in zip(positions, index.containing(positions)):
+        matches = []
+        for distance, item in hits:
+            match = {
+                'id': item['id'],
+                'name': item.get('name', ''),
+                'distance_m': round(distance, 2),
+                'radiusMeters': item['radiusMeters']
+            }
+            if device_id:
+                remaining = ping_cooldowns.check(str(device_id), item)
+                match['ping'] = remaining == 0
+                if match['ping']:
+                    analytics.record('ping', item['id'])
+                match['cooldown_remaining_s'] = round(remaining)
+            matches.append(match)
+        results.append({'lat': lat, 'lng': lng, 'items': matches})
+    
+    return jsonify({'revision': index.revision, 'results': results})
+
+@public_bp.route('/leaderboard/top', methods=['GET'])
+def leaderboard_top():
+    """The best ?n= players (default 10).
+    
+    Carries an ETag of the page, so clients polling the board get 304 Not
+    Modified until it changes.
+    """
+    n = min(max(request.args.get('n', 10, type=int), 1), current_app.config['LEADERBOARD_MAX_TOP'])
+    players = [public_entry(entry) for entry in leaderboard.top(n)]
+    response = jsonify({'total': len(leaderboard), 'players': players})
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@public_bp.route('/leaderboard/snapshot/<period>', methods=['GET'])
+def leaderboard_snapshot(period):
+    """Precomputed top players for daily, weekly or alltime (?venue= for one venue).
+    
+    Snapshots are refreshed in the background and may be a few minutes old,
+    so they can be cached by browsers and CDNs; use
+    /leaderboard/players/<id> for a player's live position.
+    """
+    if period not in PERIODS:
+        return jsonify({'error': f"period must be one of {', '.join(PERIODS)}"}), 400
+    snapshot = snapshot_scheduler.get(period, request.args.get('venue', '').strip())
+    if snapshot is None:
+        return jsonify({'error': 'No snapshot for this venue'}), 404
+    response = jsonify(snapshot_body(snapshot))
+    response.set_etag(f"{snapshot.id}-{snapshot.computed_at.strftime('%Y%m%d%H%M%S%f')}")
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['LEADERBOARD_SNAPSHOT_MAX_AGE']
+    return response.make_conditional(request)
+
+@public_bp.route('/leaderboard/players/<player_id>', methods=['GET'])
+def leaderboard_player(player_id):
+    """A player's rank and the players around them (?radius=, default 2);
+    the player's own row is marked 'you'"""
+    radius = min(max(request.args.get('radius', 2, type=int), 0), current_app.config['LEADERBOARD_MAX_RADIUS'])
+    entry = leaderboard.rank_of(player_id)
+    if entry is None:
+        return jsonify({'error': 'Player not found'}), 404
+    return jsonify({
+        'total': len(leaderboard),
+        'player': public_entry(entry, player_id),
+        'around': [public_entry(e, player_id) for e in leaderboard.around(player_id, radius)]
+    })
+
+@public_bp.route('/scores', methods=['POST'])
+def ingest_scores():
+    """Record finds and game scores: {"events": [...]} or a single event.
+    
+    Events are {"player_id", "kind": "collect", "target": <item id>} or
+    {"player_id", "kind": "score", "target": <game path>, "points"},
+    optionally with "nickname" and "venue". Targets not in the current
+    catalog are rejected. Events are written in batches
+    within SCORE_BUFFER_FLUSH_SECONDS. A find is counted once per item, and
+    a game counts the player's best score; "duplicates" counts the repeats
+    caught before the write.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    raw_events = payload.get('events')
+    if raw_events is None:
+        raw_events = [payload]
+    if not isinstance(raw_events, list) or not raw_events:
+        return jsonify({'error': 'Missing events'}), 400
+    if len(raw_events) > current_app.config['SCORE_MAX_EVENTS_PER_REQUEST']:
+        return jsonify({'error': 'Too many events'}), 400
+    
+    events, rejected = [], []
+    view = get_badge_view()
+    for index, raw in enumerate(raw_events):
+        try:
+            events.append(parse_event(raw, view))
+        except ValueError as e:
+            rejected.append({'index': index, 'error': str(e)})
+    if not events:
+        return jsonify({'error': 'No valid events', 'rejected': rejected}), 400
+    
+    accepted, duplicates = score_buffer.add(events)
+    return jsonify({'accepted': accepted, 'duplicates': duplicates, 'rejected': rejected}), 202
+
+@public_bp.route('/progress/sync', methods=['POST'])
+def progress_sync():
+    """Merge a player's collected badges and completed games across devices.
+    
+    Body: {"player_id", "token", "add": {"badges": [...], "games": [...]}}
+    where add holds only what was gained since the sync that returned token
+    (everything on the first sync, with no token). Returns {"token", "add",
+    "full"}: the entries the client is missing and the token for next time.
+    Entries are never removed, so devices can sync in any order.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    try:
+        result = sync_progress(payload.get('player_id'), payload.get('token'), payload.get('add'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+@public_bp.route('/analytics', methods=['POST'])
+def record_analytics():
+    """Asset downloads reported by the site: {"events": [{"kind": "asset", "path"}]} or one event.
+    
+    Sent with navigator.sendBeacon, so the body may arrive as text/plain.
+    Paths must name a file under assets/. Finds and pings are counted by
+    the server itself and are not accepted here.
+    """
+    payload = request.get_json(force=True, silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    raw_events = payload.get('events', [payload])
+    if not isinstance(raw_events, list) or len(raw_events) > current_app.config['ANALYTICS_MAX_EVENTS_PER_REQUEST']:
+        return jsonify({'error': 'Invalid events'}), 400
+    
+    recorded = 0
+    assets_root = Config.ASSETS_DIR.resolve()
+    for raw in raw_events:
+        if not isinstance(raw, dict) or raw.get('kind') != 'asset':
+            continue
+        path = normalize_asset_path(raw.get('path'))
+        if path is None:
+            continue
+        asset = (Config.ASSETS_DIR / path[len('assets/'):]).resolve()
+        if assets_root not in asset.parents or not asset.is_file():
+            continue
+        analytics.record('asset', path)
+        recorded += 1
+    return jsonify({'recorded': recorded}), 202
@@ -0,0 +1,222 @@
+import atexit
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import unquote
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, AnalyticsCount, AnalyticsEvent
+
+KINDS = ('find', 'ping', 'asset')
+
+# Bucket -> its length
+BUCKETS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+# Bucket keys per lookup while flushing
+QUERY_CHUNK = 300
+
+
+def bucket_start(at: datetime, bucket: str) -> datetime:
+    """Start of the bucket holding a moment"""
+    if bucket == 'minute':
+        return at.replace(second=0, microsecond=0)
+    if bucket == 'hour':
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def normalize_asset_path(path: Any) -> Optional[str]:
+    """'assets/...' path of a URL or relative reference to an asset, or None"""
+    if not isinstance(path, str):
+        return None
+    path = unquote(path.split('?', 1)[0].split('#', 1)[0])
+    marker = path.find('assets/')
+    if marker < 0:
+        return None
+    path = path[marker:]
+    if len(path) > 200 or '..' in path.split('/'):
+        return None
+    return path
+
+
+class Analytics:
+    """Counts find, ping and asset-download events into minute, hour and day buckets.
+
+    Events are counted in memory and written every ANALYTICS_FLUSH_SECONDS:
+    the raw events in one bulk insert and one add per (bucket, kind,
+    subject) to the AnalyticsCount rows, so a burst of a thousand finds of
+    one animal costs three row updates. Dashboards read only the counts.
+    Counts still in memory are lost if the process is killed or a flush
+    fails; this is usage data, so it is not worth a write-ahead log.
+    """
+
+    def __init__(self):
+        self.flush_seconds = 10.0
+        self.retention_days = {'minute': 2, 'hour': 90, 'day': None}
+        self.event_retention_days = 14
+        self._app = None
+        self._events = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._last_prune = 0.0
+
+    def init_app(self, app) -> None:
+        """Read ANALYTICS_* settings; the flush thread starts with the first event"""
+        self._app = app
+        self.flush_seconds = app.config['ANALYTICS_FLUSH_SECONDS']
+        self.retention_days = {
+            'minute': app.config['ANALYTICS_MINUTE_RETENTION_DAYS'],
+            'hour': app.config['ANALYTICS_HOUR_RETENTION_DAYS'],
+            'day': None,
+        }
+        self.event_retention_days = app.config['ANALYTICS_EVENT_RETENTION_DAYS']
+        atexit.register(self._flush_at_exit)
+
+    def record(self, kind: str, subject: str, at: Optional[datetime] = None) -> None:
+        """Count one event (cheap; nothing is written until the next flush)"""
+        with self._lock:
+            self._events.append((kind, subject, at or datetime.utcnow()))
+            if self._thread is None and self._app is not None:
+                self._thread = threading.Thread(target=self._flush_loop, name='analytics-flusher', daemon=True)
+                self._thread.start()
+
+    def flush(self) -> int:
+        """Write counted events now (needs an app context); returns how many"""
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events:
+                return 0
+            for attempt in range(2):
+                try:
+                    self._write(events)
+                    db.session.commit()
+                    break
+                except IntegrityError:
+                    # Another worker created some of the same bucket rows first
+                    db.session.rollback()
+                    if attempt:
+                        raise
+                except Exception:
+                    db.session.rollback()
+                    raise
+            if time.monotonic() - self._last_prune > 3600:
+                self._last_prune = time.monotonic()
+                self.prune()
+            return len(events)
+
+    def _write(self, events: List[Tuple[str, str, datetime]]) -> None:
+        db.session.bulk_insert_mappings(AnalyticsEvent, [
+            {'kind': kind, 'subject': subject, 'created_at': at} for kind, subject, at in events
+        ])
+
+        counts = Counter()
+        for kind, subject, at in events:
+            for bucket in BUCKETS:
+                counts[(bucket, kind, bucket_start(at, bucket), subject)] += 1
+
+        keys = sorted(counts)
+        existing = {}
+        for start in range(0, len(keys), QUERY_CHUNK):
+            chunk = keys[start:start + QUERY_CHUNK]
+            rows = AnalyticsCount.query.filter(
+                AnalyticsCount.bucket.in_({k[0] for k in chunk}),
+                AnalyticsCount.kind.in_({k[1] for k in chunk}),
+                AnalyticsCount.bucket_start.in_({k[2] for k in chunk}),
+                AnalyticsCount.subject.in_({k[3] for k in chunk}))
+            for row in rows:
+                existing[(row.bucket, row.kind, row.bucket_start, row.subject)] = row
+
+        new_rows = []
+        for key, count in counts.items():
+            row = existing.get(key)
+            if row is None:
+                new_rows.append({'bucket': key[0], 'kind': key[1], 'bucket_start': key[2],
+                                 'subject': key[3], 'count': count})
+            else:
+                # Added in SQL so other workers' flushes are not lost
+                row.count = AnalyticsCount.count + count
+        db.session.bulk_insert_mappings(AnalyticsCount, new_rows)
+
+    def prune(self) -> None:
+        """Drop raw events and fine-grained buckets past their retention"""
+        now = datetime.utcnow()
+        AnalyticsEvent.query.filter(
+            AnalyticsEvent.created_at < now - timedelta(days=self.event_retention_days)
+        ).delete(synchronize_session=False)
+        for bucket, days in self.retention_days.items():
+            if days:
+                AnalyticsCount.query.filter(
+                    AnalyticsCount.bucket == bucket,
+                    AnalyticsCount.bucket_start < now - timedelta(days=days)
+                ).delete(synchronize_session=False)
+        db.session.commit()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                with self._app.app_context():
+                    self.flush()
+            except Exception as e:
+                print(f"Warning: analytics flush failed: {e}")
+
+    def _flush_at_exit(self) -> None:
+        if self._app is None or not self._events:
+            return
+        try:
+            with self._app.app_context():
+                self.flush()
+        except Exception as e:
+            print(f"Warning: analytics flush at exit failed: {e}")
+
+
+def activity(kind: str, bucket: str, since: datetime, until: datetime,
+             subject: Optional[str] = None, top: int = 20) -> Dict[str, Any]:
+    """Counts per bucket between since and until (every bucket, zeros
+    included) and the busiest subjects in that range, read from the
+    pre-aggregated counts only"""
+    first = bucket_start(since, bucket)
+    query = db.session.query(AnalyticsCount.bucket_start, db.func.sum(AnalyticsCount.count)).filter(
+        AnalyticsCount.bucket == bucket,
+        AnalyticsCount.kind == kind,
+        AnalyticsCount.bucket_start >= first,
+        AnalyticsCount.bucket_start <= until)
+    if subject:
+        query = query.filter(AnalyticsCount.subject == subject)
+    counts = dict(query.group_by(AnalyticsCount.bucket_start))
+
+    series = []
+    step, current = BUCKETS[bucket], first
+    while current <= until:
+        series.append({'start': current.isoformat(), 'count': counts.get(current, 0)})
+        current += step
+
+    total = db.func.sum(AnalyticsCount.count)
+    subjects = (db.session.query(AnalyticsCount.subject, total)
+                .filter(AnalyticsCount.bucket == bucket,
+                        AnalyticsCount.kind == kind,
+                        AnalyticsCount.bucket_start >= first,
+                        AnalyticsCount.bucket_start <= until)
+                .group_by(AnalyticsCount.subject)
+                .order_by(total.desc(), AnalyticsCount.subject)
+                .limit(top))
+    return {
+        'kind': kind,
+        'bucket': bucket,
+        'subject': subject,
+        'total': sum(point['count'] for point in series),
+        'series': series,
+        'top': [{'subject': name, 'count': count} for name, count in subjects]
+    }
+
+
+analytics = Analytics()
@@ -0,0 +1,140 @@
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# MIME types for the 3D and image formats the app serves (anything else goes by
+# the standard mimetypes table)
+MIME_TYPES = {
+    '.glb': 'model/gltf-binary',
+    '.usdz': 'model/usd',
+    '.svg': 'image/svg+xml; charset=utf-8',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+}
+
+
+def guess_mime_type(filename: str) -> str:
+    """Return the MIME type for an asset filename"""
+    mime_type = MIME_TYPES.get(os.path.splitext(filename)[1].lower())
+    return mime_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+class CachedAsset:
+    """An asset held in memory with its precomputed response metadata"""
+
+    __slots__ = ('path', 'mtime_ns', 'size', 'data', 'etag', 'mime_type')
+
+    def __init__(self, path: Path, mtime_ns: int, data: bytes, mime_type: str):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = len(data)
+        self.data = data
+        self.etag = hashlib.sha1(data).hexdigest()
+        self.mime_type = mime_type
+
+
+class AssetCache:
+    """Byte-bounded LRU cache for small, frequently requested asset files.
+
+    Entries are keyed by the requested filename and remember the resolved path
+    and mtime, so a hit costs a single stat() instead of resolve/open/read.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, max_file_size: int):
+        self.root = Path(root).resolve()
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, filename: str) -> Optional[CachedAsset]:
+        """Return the cached asset for filename, loading it if small enough.
+
+        Returns None when the file is missing, outside the root, or too large
+        to cache - callers fall back to streaming it from disk.
+        """
+        with self._lock:
+            entry = self._entries.get(filename)
+
+        if entry is not None:
+            try:
+                stat = os.stat(entry.path)
+            except OSError:
+                self._evict(filename)
+                return None
+            if stat.st_mtime_ns == entry.mtime_ns and stat.st_size == entry.size:
+                with self._lock:
+                    self.hits += 1
+                    if filename in self._entries:
+                        self._entries.move_to_end(filename)
+                return entry
+            self._evict(filename)
+
+        with self._lock:
+            self.misses += 1
+        return self._load(filename)
+
+    def _load(self, filename: str) -> Optional[CachedAsset]:
+        """Resolve, validate and read a file into the cache"""
+        path = (self.root / filename).resolve()
+        try:
+            path.relative_to(self.root)
+        except ValueError:
+            return None
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path) or stat.st_size > self.max_file_size:
+            return None
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        entry = CachedAsset(path, stat.st_mtime_ns, data, guess_mime_type(filename))
+
+        with self._lock:
+            old = self._entries.pop(filename, None)
+            if old is not None:
+                self.current_bytes -= old.size
+            self._entries[filename] = entry
+            self.current_bytes += entry.size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size
+        return entry
+
+    def _evict(self, filename: str) -> None:
+        """Drop a stale entry"""
+        with self._lock:
+            entry = self._entries.pop(filename, None)
+            if entry is not None:
+                self.current_bytes -= entry.size
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache usage and hit/miss counters"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'max_file_size': self.max_file_size,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
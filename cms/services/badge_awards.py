@@ -0,0 +1,46 @@
+from typing import Dict, Any, List, Tuple
+
+from models import db, PlayerProgress
+from services.badge_view import BadgeView, get_badge_view
+
+# (player, badge) pairs per IN (...) lookup
+QUERY_CHUNK = 500
+
+
+def badges_for_event(view: BadgeView, event: Dict[str, Any]) -> Tuple[str, ...]:
+    """Badge ids a score event earns: a find earns its item's badge, any
+    score in a game earns the game badges linked to that game's path"""
+    if event['kind'] == 'collect':
+        badge = view.get('item', event['target'])
+        return (badge['id'],) if badge is not None and badge.get('id') else ()
+    return tuple(badge['id'] for badge in view.for_game(event['target']))
+
+
+def award_badges(events: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """Add the badges earned by a batch of score events to the players'
+    progress, in the caller's transaction (not committed).
+
+    Lookups go through the badge view's per-revision tables, so each event
+    costs a dictionary lookup. Badges a player already holds are skipped.
+    Returns the new (player_id, badge_id) pairs.
+    """
+    view = get_badge_view()
+    earned = {(event['player_id'], badge_id) for event in events for badge_id in badges_for_event(view, event)}
+    if not earned:
+        return []
+
+    held = set()
+    pairs = sorted(earned)
+    for start in range(0, len(pairs), QUERY_CHUNK):
+        chunk = pairs[start:start + QUERY_CHUNK]
+        rows = db.session.query(PlayerProgress.player_id, PlayerProgress.value).filter(
+            PlayerProgress.kind == 'badge',
+            PlayerProgress.player_id.in_({player_id for player_id, _ in chunk}),
+            PlayerProgress.value.in_({badge_id for _, badge_id in chunk}))
+        held.update(rows)
+
+    awards = [pair for pair in pairs if pair not in held]
+    db.session.bulk_insert_mappings(PlayerProgress, [
+        {'player_id': player_id, 'kind': 'badge', 'value': badge_id} for player_id, badge_id in awards
+    ])
+    return awards
@@ -0,0 +1,94 @@
+import re
+import threading
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Tuple
+
+from services.json_handler import JSONHandler
+
+
+def normalize_game_path(path) -> str:
+    """Comparable form of a game path: '../../games/x/index.html' and '/games/x/' are both 'games/x'"""
+    path = re.split(r'[?#]', str(path or ''), maxsplit=1)[0].strip()
+    path = re.sub(r'^(?:\.{1,2}/|/)+', '', path)
+    path = re.sub(r'(?:^|/)index\.html?$', '', path)
+    return path.rstrip('/')
+
+
+def _entry(badge: Dict[str, Any], extra: Dict[str, Any]) -> MappingProxyType:
+    entry = dict(badge)
+    entry.update(extra)
+    entry['_sort_key'] = (str(entry.get('name') or '').casefold(), str(entry.get('id') or ''))
+    return MappingProxyType(entry)
+
+
+class BadgeView:
+    """Read-only badge listing for one catalog revision.
+
+    Item badges carry _type, _item_id and _item_name; game badges carry
+    _type. Entries are immutable mappings shared by every reader, built once
+    per revision together with name order, the game path lookup used to
+    award badges and the item ids and game paths that score events may
+    target. Searching goes through the catalog search index.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.source = data
+        self.revision = data.get('revision', 0)
+        self.item_badges = tuple(
+            _entry(item['badge'], {'_type': 'item', '_item_id': item.get('id'), '_item_name': item.get('name')})
+            for item in data.get('items', []) if isinstance(item.get('badge'), dict)
+        )
+        self.game_badges = tuple(_entry(badge, {'_type': 'game'}) for badge in data.get('gameBadges', []))
+        # Catalog positions in name order
+        self._name_order = {
+            kind: tuple(sorted(range(len(badges)), key=lambda pos: badges[pos]['_sort_key']))
+            for kind, badges in (('item', self.item_badges), ('game', self.game_badges))
+        }
+        self._by_name = {kind: tuple(self.badges(kind)[pos] for pos in order)
+                         for kind, order in self._name_order.items()}
+        self._by_id = {
+            'item': MappingProxyType({b['_item_id']: b for b in self.item_badges}),
+            'game': MappingProxyType({b['id']: b for b in self.game_badges}),
+        }
+        # Game path -> game badges earned by completing that game
+        by_game_path = {}
+        for badge in self.game_badges:
+            path = normalize_game_path(badge.get('gamePath'))
+            if path and badge.get('id'):
+                by_game_path.setdefault(path, []).append(badge)
+        self._by_game_path = MappingProxyType({path: tuple(badges) for path, badges in by_game_path.items()})
+        # Targets a score event may name
+        self.item_ids = frozenset(str(item['id']) for item in data.get('items', []) if item.get('id'))
+        self.game_paths = frozenset(filter(None, (normalize_game_path(b.get('gamePath')) for b in self.game_badges)))
+
+    def badges(self, kind: str, sort: Optional[str] = None) -> Tuple[MappingProxyType, ...]:
+        """Badges of one kind ('item' or 'game') in catalog order, or by name"""
+        if sort == 'name':
+            return self._by_name[kind]
+        return self.item_badges if kind == 'item' else self.game_badges
+
+    def get(self, kind: str, badge_id: str) -> Optional[MappingProxyType]:
+        """An item badge by its item's id, or a game badge by id"""
+        return self._by_id[kind].get(badge_id)
+
+    def for_game(self, game_path: str) -> Tuple[MappingProxyType, ...]:
+        """Game badges for a game path, in any of its spellings"""
+        return self._by_game_path.get(normalize_game_path(game_path), ())
+
+    def is_game(self, game_path: str) -> bool:
+        """Whether a game path (in any spelling) is linked from the catalog"""
+        return normalize_game_path(game_path) in self.game_paths
+
+
+_view = None
+_view_lock = threading.Lock()
+
+
+def get_badge_view() -> BadgeView:
+    """Badge view for the current catalog, rebuilt only when the catalog changes"""
+    global _view
+    data = JSONHandler().read_cached()
+    with _view_lock:
+        if _view is None or _view.source is not data:
+            _view = BadgeView(data)
+        return _view
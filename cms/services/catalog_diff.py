@@ -0,0 +1,212 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import Config
+from services.catalog_io import COLLECTIONS, cell_text, flatten
+from services.catalog_sync import entity_fingerprint
+from services.json_handler import JSONHandler
+
+# Parsed snapshots and computed diffs kept in memory (least recently used dropped first)
+SNAPSHOT_CACHE_SIZE = 16
+DIFF_CACHE_SIZE = 64
+
+CURRENT = 'current'
+
+
+class Snapshot:
+    """One version of the catalog with a fingerprint per entity"""
+
+    def __init__(self, ref: str, data: Dict[str, Any], label: str):
+        self.ref = ref
+        self.label = label
+        self.revision = data.get('revision', 0)
+        self.entities = {}
+        self.fingerprints = {}
+        for entity_type, collection in COLLECTIONS.items():
+            for entity in data.get(collection, []):
+                key = (entity_type, entity.get('id'))
+                self.entities[key] = entity
+                self.fingerprints[key] = entity_fingerprint(entity)
+        # Anything else in the document (revision excluded)
+        self.document = {k: v for k, v in data.items() if k not in COLLECTIONS.values() and k != 'revision'}
+
+    def describe(self) -> Dict[str, Any]:
+        return {'ref': self.ref, 'label': self.label, 'revision': self.revision}
+
+
+def field_changes(before: Dict[str, Any], after: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Changed dotted fields between two versions of an entity"""
+    flat_before = flatten(before)
+    flat_after = flatten(after)
+    changes = []
+    for field in dict.fromkeys(list(flat_before) + list(flat_after)):
+        if field not in flat_after:
+            op = 'removed'
+        elif field not in flat_before:
+            op = 'added'
+        elif flat_before[field] != flat_after[field]:
+            op = 'changed'
+        else:
+            continue
+        changes.append({
+            'field': field,
+            'op': op,
+            'before': cell_text(flat_before.get(field)),
+            'after': cell_text(flat_after.get(field))
+        })
+    return changes
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> Dict[str, Any]:
+    """Entity- and field-level differences from old to new.
+
+    Entities are aligned by (type, id); those with equal fingerprints are
+    skipped, so only entities that really changed are compared field by field.
+    """
+    start = time.perf_counter()
+    entities = []
+    summary = {t: {'added': 0, 'removed': 0, 'changed': 0} for t in COLLECTIONS}
+
+    for key, fingerprint in new.fingerprints.items():
+        old_fingerprint = old.fingerprints.get(key)
+        if old_fingerprint == fingerprint:
+            continue
+        entity = new.entities[key]
+        if old_fingerprint is None:
+            action, fields = 'added', field_changes({}, entity)
+        else:
+            action, fields = 'changed', field_changes(old.entities[key], entity)
+        summary[key[0]][action] += 1
+        entities.append({'type': key[0], 'id': key[1], 'name': entity.get('name', ''),
+                         'action': action, 'fields': fields})
+
+    for key in old.fingerprints:
+        if key not in new.fingerprints:
+            entity = old.entities[key]
+            summary[key[0]]['removed'] += 1
+            entities.append({'type': key[0], 'id': key[1], 'name': entity.get('name', ''),
+                             'action': 'removed', 'fields': field_changes(entity, {})})
+
+    return {
+        'from': old.describe(),
+        'to': new.describe(),
+        'summary': summary,
+        'document': field_changes(old.document, new.document),
+        'entities': entities,
+        'took_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+
+
+class CatalogDiffer:
+    """Resolves backups, revisions and the live catalog to snapshots and diffs them.
+
+    Backups never change once written, so parsed snapshots and diff results
+    are cached by file identity; the live catalog is cached by the identity
+    of the shared read_cached() document.
+    """
+
+    def __init__(self):
+        self._snapshots = OrderedDict()   # (path, mtime_ns, size) | ('current', id) -> Snapshot
+        self._diffs = OrderedDict()       # (snapshot key, snapshot key) -> diff
+        self._revisions = {}              # (path, mtime_ns, size) -> revision
+        self._current = None              # (source document, key)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key, value, size: int):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+
+    def _backup_key(self, name: str) -> Tuple[str, int, int]:
+        path = Config.BACKUP_DIR / name
+        if not name.startswith('assets_') or path.parent != Config.BACKUP_DIR:
+            raise LookupError(f'Backup {name} not found')
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            raise LookupError(f'Backup {name} not found')
+        return str(path), stat.st_mtime_ns, stat.st_size
+
+    def _load(self, ref: str) -> Tuple[Any, Snapshot]:
+        """(cache key, snapshot) for 'current' or a backup file name"""
+        if ref == CURRENT:
+            data = JSONHandler().read_cached()
+            with self._lock:
+                if self._current and self._current[0] is data:
+                    key = self._current[1]
+                    if key in self._snapshots:
+                        self._snapshots.move_to_end(key)
+                        return key, self._snapshots[key]
+            snapshot = Snapshot(CURRENT, data, 'Current catalog')
+            key = (CURRENT, snapshot.revision, id(data))
+            with self._lock:
+                self._current = (data, key)
+                self._remember(self._snapshots, key, snapshot, SNAPSHOT_CACHE_SIZE)
+            return key, snapshot
+
+        key = self._backup_key(ref)
+        with self._lock:
+            if key in self._snapshots:
+                self._snapshots.move_to_end(key)
+                return key, self._snapshots[key]
+        try:
+            with open(key[0], 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise LookupError(f'Backup {ref} cannot be read: {e}')
+        if not isinstance(data, dict):
+            raise LookupError(f'Backup {ref} is not a catalog')
+        snapshot = Snapshot(ref, data, f'Backup {ref}')
+        with self._lock:
+            self._revisions[key] = snapshot.revision
+            self._remember(self._snapshots, key, snapshot, SNAPSHOT_CACHE_SIZE)
+        return key, snapshot
+
+    def resolve(self, ref: Optional[str]) -> str:
+        """A backup name or 'current' for a reference that may also be a revision number"""
+        ref = (ref or '').strip()
+        if not ref:
+            raise LookupError('Choose two versions to compare')
+        if not ref.isdigit():
+            return ref
+        revision = int(ref)
+        if JSONHandler().read_cached().get('revision', 0) == revision:
+            return CURRENT
+        # Each backup holds the catalog as it was before a write
+        for backup in JSONHandler().get_backups():
+            key = self._backup_key(backup['name'])
+            known = self._revisions.get(key)
+            if known is None:
+                try:
+                    known = self._load(backup['name'])[1].revision
+                except LookupError:
+                    continue  # Unreadable backup; another may hold the revision
+            if known == revision:
+                return backup['name']
+        raise LookupError(f'No backup holds revision {revision}')
+
+    def diff(self, old_ref: str, new_ref: str) -> Dict[str, Any]:
+        """Diff between two references (backup name, revision number or 'current').
+
+        Raises LookupError for unknown references.
+        """
+        old_key, old = self._load(self.resolve(old_ref))
+        new_key, new = self._load(self.resolve(new_ref))
+        pair = (old_key, new_key)
+        with self._lock:
+            cached = self._diffs.get(pair)
+            if cached is not None:
+                self._diffs.move_to_end(pair)
+                return cached
+        result = diff_snapshots(old, new)
+        with self._lock:
+            self._remember(self._diffs, pair, result, DIFF_CACHE_SIZE)
+        return result
+
+
+catalog_differ = CatalogDiffer()
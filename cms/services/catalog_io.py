@@ -0,0 +1,429 @@
+import codecs
+import copy
+import csv
+import io
+import json
+import os
+import re
+import secrets
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple
+
+from config import Config
+from services.validator import Validator
+
+# XLSX support is optional; without openpyxl only CSV is available
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+COLLECTIONS = {'item': 'items', 'game_badge': 'gameBadges'}
+SHEET_NAMES = {'item': 'Items', 'game_badge': 'Game Badges'}
+
+# Rows written per chunk of a streamed CSV export
+EXPORT_CHUNK_ROWS = 500
+
+# Import changes listed in the preview response (the rest are only counted)
+PREVIEW_CHANGES = 200
+# Row errors kept in an import plan (the rest are only counted)
+MAX_REPORTED_ERRORS = 200
+
+TOKEN_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# Text cells starting with these are run as formulas by spreadsheet apps, so
+# exports prefix them with FORMULA_ESCAPE (and imports remove it again)
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+FORMULA_ESCAPE = "'"
+
+
+def flatten(entity: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+    """Nested fields as dotted columns, e.g. {'location.lat': 51.5}; lists stay whole"""
+    flat = {}
+    for key, value in entity.items():
+        column = f'{prefix}{key}'
+        if isinstance(value, dict) and value:
+            flat.update(flatten(value, f'{column}.'))
+        else:
+            flat[column] = value
+    return flat
+
+
+def _kind(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, (int, float)):
+        return 'number'
+    if isinstance(value, str):
+        return 'str'
+    return 'json'
+
+
+def catalog_columns(entities: List[Dict[str, Any]]) -> Tuple[List[str], Dict[str, str]]:
+    """Columns used by any entity (id first, then in order of appearance) and the
+    kind of value each holds (str, number, bool or json)"""
+    columns = {'id': 'str'}
+    for entity in entities:
+        for column, value in flatten(entity).items():
+            kind = _kind(value)
+            if column not in columns or columns[column] is None:
+                columns[column] = kind
+    return list(columns), {c: k or 'str' for c, k in columns.items()}
+
+
+def cell_text(value: Any) -> str:
+    """A field value as spreadsheet text"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float, str)):
+        return str(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+def escape_formula(text: str) -> str:
+    """Text that a spreadsheet shows as-is rather than evaluating; text
+    already starting with the escape is escaped too so import can undo it"""
+    if text.startswith(FORMULA_PREFIXES + (FORMULA_ESCAPE,)):
+        return FORMULA_ESCAPE + text
+    return text
+
+
+def unescape_formula(value: Any) -> Any:
+    """A cell as exported before escape_formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_ESCAPE):
+        return value[len(FORMULA_ESCAPE):]
+    return value
+
+
+def parse_cell(value: Any, kind: str) -> Any:
+    """A spreadsheet cell as a field value of the given kind (raises ValueError)"""
+    if kind == 'str':
+        return value if isinstance(value, str) else cell_text(value)
+    if kind == 'number':
+        if isinstance(value, bool):
+            raise ValueError('expected a number')
+        if isinstance(value, (int, float)):
+            return value
+        text = str(value).strip()
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+    if kind == 'bool':
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text not in ('true', 'false', '1', '0'):
+            raise ValueError('expected true or false')
+        return text in ('true', '1')
+    try:
+        return json.loads(value)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f'invalid JSON: {e}')
+
+
+# ---- Export ----
+
+def iter_csv(data: Dict[str, Any], entity_type: str) -> Iterator[str]:
+    """Stream one collection as CSV text, a chunk of rows at a time"""
+    entities = data.get(COLLECTIONS[entity_type], [])
+    columns, _ = catalog_columns(entities)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for start in range(0, len(entities), EXPORT_CHUNK_ROWS):
+        for entity in entities[start:start + EXPORT_CHUNK_ROWS]:
+            flat = flatten(entity)
+            writer.writerow([escape_formula(value) if isinstance(value, str) else cell_text(value)
+                             for value in (flat.get(column) for column in columns)])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_xlsx(data: Dict[str, Any], fileobj) -> None:
+    """Write items and game badges as two worksheets (requires openpyxl)"""
+    if openpyxl is None:
+        raise RuntimeError('XLSX export requires openpyxl (pip install openpyxl)')
+    workbook = openpyxl.Workbook(write_only=True)
+    for entity_type, collection in COLLECTIONS.items():
+        sheet = workbook.create_sheet(SHEET_NAMES[entity_type])
+        entities = data.get(collection, [])
+        columns, _ = catalog_columns(entities)
+        sheet.append(columns)
+        for entity in entities:
+            flat = flatten(entity)
+            row = []
+            for column in columns:
+                value = flat.get(column)
+                if isinstance(value, str):
+                    value = escape_formula(value)
+                row.append(value if isinstance(value, (int, float, str)) or value is None else cell_text(value))
+            sheet.append(row)
+    workbook.save(fileobj)
+
+
+def iter_file(fileobj, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Stream a file from the start and close it when done"""
+    try:
+        fileobj.seek(0)
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+# ---- Import ----
+
+def read_csv_rows(stream, entity_type: str) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+    """(entity_type, line, row) for every row of an uploaded CSV, read incrementally"""
+    reader = csv.reader(codecs.iterdecode(stream, 'utf-8-sig'))
+    header = next(reader, None)
+    if not header:
+        return
+    header = [h.strip() for h in header]
+    for row in reader:
+        if any(cell.strip() for cell in row):
+            yield entity_type, reader.line_num, dict(zip(header, map(unescape_formula, row)))
+
+
+def read_xlsx_rows(stream) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+    """(entity_type, line, row) for every row of the Items / Game Badges sheets"""
+    if openpyxl is None:
+        raise RuntimeError('XLSX import requires openpyxl (pip install openpyxl)')
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    sheet_types = {name: entity_type for entity_type, name in SHEET_NAMES.items()}
+    try:
+        for sheet in workbook.worksheets:
+            entity_type = sheet_types.get(sheet.title)
+            if entity_type is None:
+                continue
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header:
+                continue
+            header = [str(h).strip() if h is not None else '' for h in header]
+            for line, row in enumerate(rows, 2):
+                if any(cell not in (None, '') for cell in row):
+                    yield entity_type, line, dict(zip(header, map(unescape_formula, row)))
+    finally:
+        workbook.close()
+
+
+def _set_path(entity: Dict[str, Any], column: str, value: Any) -> None:
+    parts = column.split('.')
+    target = entity
+    for part in parts[:-1]:
+        if part not in target:
+            target[part] = {}
+        target = target[part]
+        if not isinstance(target, dict):
+            raise ValueError(f"'{column}': '{part}' is not an object")
+    target[parts[-1]] = value
+
+
+def _row_id(row: Dict[str, Any]) -> str:
+    value = row.get('id')
+    return cell_text(value).strip() if value is not None else ''
+
+
+def check_row(entity_type: str, line: int, row: Dict[str, Any], existing: Optional[Dict[str, Any]],
+              kinds: Dict[str, str]) -> Dict[str, Any]:
+    """Apply one spreadsheet row to a copy of its entity and validate the result.
+
+    Empty cells leave a field as it is, except that text fields are cleared
+    (on new entities, set to ''). Columns missing from the sheet are not touched.
+    """
+    entity_id = _row_id(row)
+    result = {'type': entity_type, 'id': entity_id, 'line': line, 'action': 'unchanged', 'errors': []}
+    if not entity_id:
+        result['errors'].append('Missing id')
+        return result
+
+    entity = copy.deepcopy(existing) if existing else {'id': entity_id}
+    before = flatten(existing) if existing else {}
+    for column, value in row.items():
+        if not column or column == 'id':
+            continue
+        kind = kinds.get(column, 'str')
+        if value is None or (isinstance(value, str) and value.strip() == ''):
+            if kind == 'str' and (column in before or not existing):
+                value = ''
+            else:
+                continue
+        try:
+            _set_path(entity, column, parse_cell(value, kind))
+        except ValueError as e:
+            result['errors'].append(f"'{column}': {e}")
+    if result['errors']:
+        return result
+
+    after = flatten(entity)
+    if existing and after == before:
+        return result
+
+    validate = Validator.validate_item if entity_type == 'item' else Validator.validate_badge
+    result['errors'] = validate(entity)
+    result['action'] = 'update' if existing else 'create'
+    result['fields'] = [
+        {'field': column, 'before': cell_text(before.get(column)), 'after': cell_text(after.get(column))}
+        for column in dict.fromkeys(list(before) + list(after))
+        if before.get(column) != after.get(column)
+    ]
+    result['entity'] = entity
+    return result
+
+
+def _check_chunk(chunk, lookups, kinds):
+    return [check_row(entity_type, line, row, lookups[entity_type].get(_row_id(row)), kinds[entity_type])
+            for entity_type, line, row in chunk]
+
+
+def _chunks(rows: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def plan_import(data: Dict[str, Any], rows: Iterable[Tuple[str, int, Dict[str, Any]]],
+                chunk_rows: Optional[int] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Check uploaded rows against the catalog without changing it.
+
+    Rows are read and checked in chunks on a small thread pool, with only a
+    few chunks in flight, so memory follows the number of changed rows rather
+    than the size of the file. Returns a plan for apply_import().
+    """
+    chunk_rows = chunk_rows or Config.IMPORT_CHUNK_ROWS
+    workers = workers or Config.IMPORT_WORKERS
+    lookups = {t: {e.get('id'): e for e in data.get(c, [])} for t, c in COLLECTIONS.items()}
+    kinds = {t: catalog_columns(data.get(c, []))[1] for t, c in COLLECTIONS.items()}
+
+    plan = {
+        'revision': data.get('revision', 0),
+        'rows': 0,
+        'counts': {'create': 0, 'update': 0, 'unchanged': 0},
+        'error_count': 0,
+        'errors': [],
+        'changes': []
+    }
+    seen = set()
+
+    def collect(results):
+        for result in results:
+            plan['rows'] += 1
+            key = (result['type'], result['id'])
+            if result['id'] and key in seen:
+                result['errors'] = [f"Duplicate id '{result['id']}' (already in an earlier row)"]
+            seen.add(key)
+            if result['errors']:
+                plan['error_count'] += 1
+                if len(plan['errors']) < MAX_REPORTED_ERRORS:
+                    plan['errors'].append({k: result[k] for k in ('type', 'id', 'line', 'errors')})
+                continue
+            plan['counts'][result['action']] += 1
+            if result['action'] != 'unchanged':
+                plan['changes'].append(result)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunks(rows, chunk_rows):
+            pending.append(pool.submit(_check_chunk, chunk, lookups, kinds))
+            if len(pending) >= workers * 2:
+                collect(pending.popleft().result())
+        while pending:
+            collect(pending.popleft().result())
+    return plan
+
+
+def apply_import(data: Dict[str, Any], plan: Dict[str, Any]) -> None:
+    """Apply a plan's changes to a catalog dict in place"""
+    for entity_type, collection in COLLECTIONS.items():
+        entities = data.setdefault(collection, [])
+        positions = {e.get('id'): i for i, e in enumerate(entities)}
+        for change in plan['changes']:
+            if change['type'] != entity_type:
+                continue
+            position = positions.get(change['id'])
+            if position is None:
+                positions[change['id']] = len(entities)
+                entities.append(change['entity'])
+            else:
+                entities[position] = change['entity']
+
+
+def plan_summary(plan: Dict[str, Any], token: str) -> Dict[str, Any]:
+    """Preview response body: counts, row errors and the first changes"""
+    return {
+        'token': token,
+        'revision': plan['revision'],
+        'rows': plan['rows'],
+        'counts': plan['counts'],
+        'error_count': plan['error_count'],
+        'errors': plan['errors'],
+        'changes': [{k: c[k] for k in ('type', 'id', 'line', 'action', 'fields')}
+                    for c in plan['changes'][:PREVIEW_CHANGES]],
+        'more_changes': max(len(plan['changes']) - PREVIEW_CHANGES, 0)
+    }
+
+
+# ---- Stored plans (preview, then commit) ----
+
+def _plan_path(token: str):
+    if not isinstance(token, str) or not TOKEN_PATTERN.fullmatch(token):
+        raise LookupError('Unknown import')
+    return Config.IMPORT_DIR / f'{token}.json'
+
+
+def save_plan(plan: Dict[str, Any]) -> str:
+    """Store a plan until it is committed; returns its token"""
+    Config.IMPORT_DIR.mkdir(parents=True, exist_ok=True)
+    cutoff = time.time() - Config.IMPORT_PREVIEW_TTL_SECONDS
+    for old in Config.IMPORT_DIR.glob('*.json'):
+        try:
+            if old.stat().st_mtime < cutoff:
+                old.unlink()
+        except OSError:
+            pass
+
+    token = secrets.token_hex(16)
+    fd, tmp_path = tempfile.mkstemp(dir=Config.IMPORT_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, ensure_ascii=False)
+    os.replace(tmp_path, _plan_path(token))
+    return token
+
+
+def load_plan(token: str) -> Dict[str, Any]:
+    """A stored plan (raises LookupError when unknown or expired)"""
+    path = _plan_path(token)
+    try:
+        if path.stat().st_mtime < time.time() - Config.IMPORT_PREVIEW_TTL_SECONDS:
+            raise LookupError('Import preview expired; upload the file again')
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise LookupError('Unknown import')
+
+
+def discard_plan(token: str) -> None:
+    try:
+        _plan_path(token).unlink()
+    except (LookupError, FileNotFoundError):
+        pass
@@ -0,0 +1,125 @@
+import threading
+from typing import Dict, Any, List, Optional
+
+from services.geo import location_of
+from services.json_handler import JSONHandler
+
+# Sortable columns per row type
+SORT_COLUMNS = {
+    'item': ('id', 'name', 'scientificName', 'badge_name'),
+    'game_badge': ('id', 'name'),
+}
+
+# Boolean filters on item rows
+ITEM_FILTERS = ('has_location', 'has_model', 'has_badge')
+
+
+def item_row(item: Dict[str, Any]) -> Dict[str, Any]:
+    """The editable columns of an item, flattened for the content editor grid"""
+    badge = item.get('badge') if isinstance(item.get('badge'), dict) else None
+    model = item.get('model') if isinstance(item.get('model'), dict) else {}
+    return {
+        'type': 'item',
+        'id': item.get('id'),
+        'name': item.get('name', ''),
+        'scientificName': item.get('scientificName', ''),
+        'description': item.get('description', ''),
+        'badge_name': badge.get('name', '') if badge else None,
+        'badge_description': badge.get('description', '') if badge else None,
+        'has_location': location_of(item) is not None,
+        'has_model': bool(model.get('url')),
+        'has_badge': badge is not None,
+    }
+
+
+def game_badge_row(badge: Dict[str, Any]) -> Dict[str, Any]:
+    """The editable columns of a game badge"""
+    return {
+        'type': 'game_badge',
+        'id': badge.get('id'),
+        'name': badge.get('name', ''),
+        'description': badge.get('description', ''),
+    }
+
+
+class CatalogRows:
+    """Flattened rows of one catalog revision with sort orders built on first use"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.source = data
+        self.revision = data.get('revision', 0)
+        self.rows = {
+            'item': [item_row(i) for i in data.get('items', [])],
+            'game_badge': [game_badge_row(b) for b in data.get('gameBadges', [])],
+        }
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, int]:
+        items = self.rows['item']
+        return {
+            'items': len(items),
+            'game_badges': len(self.rows['game_badge']),
+            'items_with_location': sum(1 for r in items if r['has_location']),
+            'items_with_model': sum(1 for r in items if r['has_model']),
+        }
+
+    def _order(self, row_type: str, column: str) -> List[int]:
+        """Row positions sorted by a column (case-insensitive, id as tie-break)"""
+        key = (row_type, column)
+        with self._lock:
+            order = self._orders.get(key)
+            if order is None:
+                rows = self.rows[row_type]
+                order = sorted(range(len(rows)), key=lambda pos: (
+                    str(rows[pos].get(column) or '').lower(), str(rows[pos]['id'])))
+                self._orders[key] = order
+            return order
+
+    def page(self, row_type: str, offset: int = 0, limit: int = 50, sort: str = 'name',
+             descending: bool = False, ids: Optional[set] = None,
+             filters: Optional[Dict[str, bool]] = None) -> Dict[str, Any]:
+        """One slice of rows after filtering (ids: restrict to these ids) and sorting"""
+        if row_type not in self.rows:
+            raise ValueError("type must be 'item' or 'game_badge'")
+        if sort not in SORT_COLUMNS[row_type]:
+            raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS[row_type])}")
+
+        rows = self.rows[row_type]
+        order = self._order(row_type, sort)
+        if descending:
+            order = order[::-1]
+        if ids is not None or filters:
+            order = [pos for pos in order if self._matches(rows[pos], ids, filters)]
+
+        return {
+            'revision': self.revision,
+            'type': row_type,
+            'total': len(order),
+            'offset': offset,
+            'limit': limit,
+            'rows': [rows[pos] for pos in order[offset:offset + limit]]
+        }
+
+    @staticmethod
+    def _matches(row: Dict[str, Any], ids: Optional[set], filters: Optional[Dict[str, bool]]) -> bool:
+        if ids is not None and row['id'] not in ids:
+            return False
+        for name, wanted in (filters or {}).items():
+            if row.get(name) != wanted:
+                return False
+        return True
+
+
+_rows = None
+_rows_lock = threading.Lock()
+
+
+def get_catalog_rows() -> CatalogRows:
+    """Editor rows for the current catalog, rebuilt only when the catalog changes"""
+    global _rows
+    data = JSONHandler().read_cached()
+    with _rows_lock:
+        if _rows is None or _rows.source is not data:
+            _rows = CatalogRows(data)
+        return _rows
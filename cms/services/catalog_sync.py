@@ -0,0 +1,147 @@
+import hashlib
+import json
+from typing import Dict, Any, List, Optional
+
+from flask import has_request_context
+
+from config import Config
+from models import db, CatalogEntity, CatalogState
+from services.change_events import change_broker
+from services.json_handler import JSONHandler, FileLock
+
+# Entity type (as used in ChangeLog) -> catalog collection
+ENTITY_COLLECTIONS = {
+    'item': 'items',
+    'game_badge': 'gameBadges',
+}
+
+
+def entity_fingerprint(entity: Dict[str, Any]) -> str:
+    """Stable content hash of an entity (key order does not matter)"""
+    canonical = json.dumps(entity, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def _get_state() -> CatalogState:
+    """The single CatalogState row, created on first use (revision -1: nothing recorded yet)"""
+    state = CatalogState.query.get(1)
+    if state is None:
+        state = CatalogState(id=1, revision=-1, compacted_revision=0)
+        db.session.add(state)
+    return state
+
+
+def reconcile_catalog(data: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Record per-entity revisions for the catalog on disk.
+
+    Compares each entity's fingerprint with the stored one and stamps changed,
+    new and removed entities with the catalog revision. Always works from the
+    current file, so concurrent writers cannot record an older revision over a
+    newer one. Returns the changes recorded ({type, id, action}).
+    """
+    handler = JSONHandler()
+    with FileLock(str(Config.DATA_DIR / '.catalog_sync.lock')):
+        if data is None:
+            data = handler.read_cached()
+        revision = int(data.get('revision', 0))
+        state = _get_state()
+        if state.revision == revision:
+            return []
+
+        rows = {(row.entity_type, row.entity_id): row for row in CatalogEntity.query.all()}
+
+        # No history yet, or the file went backwards (e.g. replaced by hand):
+        # nothing before this revision can be answered as a delta
+        reset = revision < state.revision
+        if not rows or reset:
+            CatalogEntity.query.delete()
+            rows = {}
+            state.compacted_revision = revision
+
+        changes = []
+        seen = set()
+        for entity_type, collection in ENTITY_COLLECTIONS.items():
+            for entity in data.get(collection, []):
+                entity_id = str(entity.get('id'))
+                key = (entity_type, entity_id)
+                seen.add(key)
+                fingerprint = entity_fingerprint(entity)
+                row = rows.get(key)
+                if row is None:
+                    db.session.add(CatalogEntity(entity_type=entity_type, entity_id=entity_id,
+                                                 fingerprint=fingerprint, revision=revision))
+                elif row.fingerprint != fingerprint or row.deleted:
+                    row.fingerprint = fingerprint
+                    row.revision = revision
+                    row.deleted = False
+                else:
+                    continue
+                changes.append({'type': entity_type, 'id': entity_id, 'action': 'upsert'})
+
+        for key, row in rows.items():
+            if key not in seen and not row.deleted:
+                row.deleted = True
+                row.revision = revision
+                changes.append({'type': row.entity_type, 'id': row.entity_id, 'action': 'delete'})
+
+        state.revision = revision
+        _compact(state)
+        db.session.commit()
+
+        change_broker.record_changes(revision, changes, data, _current_username(), reset=reset)
+        return changes
+
+
+def _current_username() -> Optional[str]:
+    """Username of the logged-in editor, when reconciling inside a request"""
+    if not has_request_context():
+        return None
+    from flask_login import current_user
+    return current_user.username if current_user.is_authenticated else None
+
+
+def _compact(state: CatalogState) -> None:
+    """Drop tombstones older than the retained history window"""
+    floor = state.revision - Config.CATALOG_HISTORY_REVISIONS
+    if floor <= state.compacted_revision:
+        return
+    CatalogEntity.query.filter(CatalogEntity.deleted.is_(True),
+                               CatalogEntity.revision <= floor).delete()
+    state.compacted_revision = floor
+
+
+def changes_since(since: int, entity_type: str) -> Dict[str, Any]:
+    """Entities of one type changed after revision `since`.
+
+    Returns {'revision', 'full': False, 'upserted': [...], 'deleted': [ids]},
+    or {'revision', 'full': True, 'entities': [...]} when the history needed
+    for `since` has been compacted (or `since` is from a different history).
+    """
+    data = JSONHandler().read_cached()
+    revision = int(data.get('revision', 0))
+    state = _get_state()
+    if state.revision != revision:
+        reconcile_catalog()
+        data = JSONHandler().read_cached()
+        revision = int(data.get('revision', 0))
+        state = _get_state()
+
+    entities = data.get(ENTITY_COLLECTIONS[entity_type], [])
+    if since < state.compacted_revision or since > revision:
+        return {'revision': revision, 'full': True, 'entities': entities}
+
+    rows = CatalogEntity.query.filter(
+        CatalogEntity.entity_type == entity_type,
+        CatalogEntity.revision > since,
+        CatalogEntity.revision <= revision
+    ).all()
+
+    by_id = {str(e.get('id')): e for e in entities}
+    upserted = []
+    deleted = []
+    for row in rows:
+        if row.deleted or row.entity_id not in by_id:
+            deleted.append(row.entity_id)
+        else:
+            upserted.append(by_id[row.entity_id])
+    return {'revision': revision, 'full': False, 'upserted': upserted, 'deleted': deleted}
@@ -0,0 +1,145 @@
+import json
+import queue
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+# Events buffered per subscriber before it is told to reload
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscriber:
+    """One open event stream"""
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.lagged = False  # events were dropped; the client must reload
+
+
+class ChangeBroker:
+    """In-process publish/subscribe of catalog change events.
+
+    With the 'memory' backend, events are published by the worker that
+    reconciled the write, so only streams served by that worker see them.
+    With the 'database' backend, one thread per worker polls CatalogState
+    and publishes whatever any worker recorded, so every stream sees every
+    change (after up to CHANGE_EVENTS_POLL_SECONDS).
+    """
+
+    def __init__(self):
+        self.backend = 'memory'
+        self.poll_seconds = 2.0
+        self._app = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._poller = None
+        self._last_revision = None
+
+    def init_app(self, app) -> None:
+        """Read CHANGE_EVENTS_* settings; the poller starts with the first subscriber"""
+        self._app = app
+        self.backend = app.config.get('CHANGE_EVENTS_BACKEND', 'memory')
+        self.poll_seconds = app.config.get('CHANGE_EVENTS_POLL_SECONDS', 2.0)
+        if self.backend not in ('memory', 'database'):
+            raise ValueError(f"Unknown CHANGE_EVENTS_BACKEND: {self.backend}")
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber()
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self.backend == 'database' and self._poller is None:
+                self._poller = threading.Thread(target=self._poll_loop, name='change-events-poller', daemon=True)
+                self._poller.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """Deliver an event to every local subscriber without blocking the writer"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(event)
+            except queue.Full:
+                subscriber.lagged = True
+
+    def record_changes(self, revision: int, changes: List[Dict[str, Any]], data: Dict[str, Any],
+                       user: Optional[str] = None, reset: bool = False) -> None:
+        """Publish the changes reconciled in this worker (memory backend only)"""
+        if self.backend != 'memory' or not (changes or reset):
+            return
+        self.publish(build_event(revision, changes, data, user, reset))
+
+    def _poll_loop(self) -> None:
+        """Publish revisions recorded by any worker (database backend)"""
+        from models import CatalogEntity, CatalogState
+        from services.json_handler import JSONHandler
+
+        while True:
+            try:
+                with self._app.app_context():
+                    state = CatalogState.query.get(1)
+                    revision = state.revision if state else None
+                    if self._last_revision is None or revision is None:
+                        self._last_revision = revision
+                    elif revision < self._last_revision:
+                        # Catalog history was reset; clients must reload
+                        self._last_revision = revision
+                        self.publish(build_event(revision, [], {}, reset=True))
+                    elif revision > self._last_revision:
+                        rows = CatalogEntity.query.filter(
+                            CatalogEntity.revision > self._last_revision,
+                            CatalogEntity.revision <= revision
+                        ).all()
+                        changes = [{
+                            'type': row.entity_type,
+                            'id': row.entity_id,
+                            'action': 'delete' if row.deleted else 'upsert'
+                        } for row in rows]
+                        self._last_revision = revision
+                        if changes:
+                            self.publish(build_event(revision, changes, JSONHandler().read_cached()))
+            except Exception as e:
+                print(f"Warning: change event poll failed: {e}")
+            time.sleep(self.poll_seconds)
+
+
+def build_event(revision: int, changes: List[Dict[str, Any]], data: Dict[str, Any],
+                user: Optional[str] = None, reset: bool = False) -> Dict[str, Any]:
+    """Change event with the current body of each upserted entity.
+
+    A reset event means the catalog history was replaced and clients should
+    reload instead of applying the changes.
+    """
+    from services.catalog_sync import ENTITY_COLLECTIONS
+
+    lookup = {}
+    for entity_type, collection in ENTITY_COLLECTIONS.items():
+        for entity in data.get(collection, []):
+            lookup[(entity_type, str(entity.get('id')))] = entity
+
+    event_changes = []
+    for change in changes:
+        change = dict(change)
+        entity = lookup.get((change['type'], change['id']))
+        if change['action'] == 'upsert' and entity is not None:
+            change['entity'] = entity
+        elif change['action'] == 'upsert':
+            change['action'] = 'delete'  # Removed again since it was recorded
+        event_changes.append(change)
+    return {'revision': revision, 'user': user, 'reset': reset, 'changes': event_changes}
+
+
+def format_sse(event: Dict[str, Any], name: str = 'catalog') -> str:
+    """Encode an event for a text/event-stream response (id is the catalog revision)"""
+    return f"id: {event['revision']}\nevent: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+change_broker = ChangeBroker()
@@ -0,0 +1,97 @@
+import math
+from typing import Optional, Tuple
+
+EARTH_RADIUS_METERS = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    """Encode a coordinate as a geohash string of the given length"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits = bits * 2 + 1
+                lng_lo = mid
+            else:
+                bits = bits * 2
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits = bits * 2 + 1
+                lat_lo = mid
+            else:
+                bits = bits * 2
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Return (height, width) in degrees of a geohash cell at the given precision"""
+    lat_bits = (5 * precision) // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def haversine_meters(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two coordinates in meters"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def cell_min_extent_meters(precision: int, lat: float) -> float:
+    """Smaller side of a geohash cell near the given latitude, in meters"""
+    height, width = geohash_cell_size(precision)
+    return min(height * METERS_PER_DEGREE_LAT,
+               width * METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """Parse a "west,south,east,north" bounding box (Leaflet's toBBoxString order).
+
+    Returns (south, west, north, east) and raises ValueError when malformed.
+    """
+    parts = value.split(',')
+    if len(parts) != 4:
+        raise ValueError("bbox must be 'west,south,east,north'")
+    west, south, east, north = (float(p) for p in parts)
+    if not (-90 <= south <= north <= 90):
+        raise ValueError("bbox latitudes must satisfy -90 <= south <= north <= 90")
+    if not (-180 <= west <= east <= 180):
+        raise ValueError("bbox longitudes must satisfy -180 <= west <= east <= 180")
+    return south, west, north, east
+
+
+def location_of(item) -> Optional[Tuple[float, float]]:
+    """Return (lat, lng) for an item, or None if it has no usable location"""
+    location = item.get('location')
+    if not isinstance(location, dict):
+        return None
+    lat = location.get('lat')
+    lng = location.get('lng')
+    if isinstance(lat, bool) or isinstance(lng, bool):
+        return None
+    if not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return float(lat), float(lng)
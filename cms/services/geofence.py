@@ -0,0 +1,144 @@
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from services.geo import EARTH_RADIUS_METERS, haversine_meters, location_of
+from services.json_handler import JSONHandler
+
+# NumPy is optional; without it distances are computed item by item
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_COOLDOWN_MINUTES = 3
+
+# Positions evaluated per NumPy block, bounding the size of the distance matrix
+POSITION_CHUNK = 256
+
+
+class GeofenceIndex:
+    """Precomputed coordinate arrays for "which geofences contain this point" queries"""
+
+    def __init__(self, items: List[Dict[str, Any]], revision: int = 0, source: Any = None):
+        self.revision = revision
+        self.source = source
+        self.items = []
+        coords = []
+        radii = []
+        for item in items:
+            location = location_of(item)
+            radius = item.get('radiusMeters')
+            if location is None or not isinstance(radius, (int, float)) or radius <= 0:
+                continue
+            self.items.append(item)
+            coords.append(location)
+            radii.append(float(radius))
+
+        self.coords = coords
+        self.radii = radii
+        if np is not None and coords:
+            lat_lng = np.radians(np.array(coords, dtype=np.float64))
+            self.lat_rad = lat_lng[:, 0]
+            self.lng_rad = lat_lng[:, 1]
+            self.cos_lat = np.cos(self.lat_rad)
+            self.radius_arr = np.array(radii, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def containing(self, positions: List[Tuple[float, float]]) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        """For each (lat, lng), the (distance_meters, item) pairs whose geofence contains it, nearest first"""
+        if not self.items:
+            return [[] for _ in positions]
+        if np is None:
+            return [self._containing_scalar(lat, lng) for lat, lng in positions]
+
+        results = []
+        for start in range(0, len(positions), POSITION_CHUNK):
+            block = np.radians(np.array(positions[start:start + POSITION_CHUNK], dtype=np.float64))
+            p_lat = block[:, 0:1]
+            p_lng = block[:, 1:2]
+            # Haversine over a (positions x items) matrix
+            a = (np.sin((self.lat_rad - p_lat) / 2) ** 2
+                 + np.cos(p_lat) * self.cos_lat * np.sin((self.lng_rad - p_lng) / 2) ** 2)
+            distances = 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+            inside = distances <= self.radius_arr
+            for row in range(distances.shape[0]):
+                hits = np.nonzero(inside[row])[0]
+                order = hits[np.argsort(distances[row, hits], kind='stable')]
+                results.append([(float(distances[row, i]), self.items[i]) for i in order])
+        return results
+
+    def _containing_scalar(self, lat: float, lng: float) -> List[Tuple[float, Dict[str, Any]]]:
+        """Pure-Python fallback for containing()"""
+        hits = []
+        for (item_lat, item_lng), radius, item in zip(self.coords, self.radii, self.items):
+            distance = haversine_meters(lat, lng, item_lat, item_lng)
+            if distance <= radius:
+                hits.append((distance, item))
+        hits.sort(key=lambda h: h[0])
+        return hits
+
+
+class PingCooldowns:
+    """Tracks the last ping per (device, item) so cooldownMinutes is enforced server-side.
+
+    State is per process; with several workers a device may occasionally be
+    pinged once per worker within a cooldown window.
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._last_ping = {}
+        self._lock = threading.Lock()
+
+    def check(self, device_id: str, item: Dict[str, Any], now: Optional[float] = None) -> float:
+        """Record a ping if allowed; return 0 when pinged, else seconds of cooldown remaining"""
+        now = time.monotonic() if now is None else now
+        cooldown = cooldown_seconds(item)
+        key = (device_id, item.get('id'))
+        with self._lock:
+            last = self._last_ping.get(key)
+            if last is not None and now - last < cooldown:
+                return cooldown - (now - last)
+            self._last_ping[key] = now
+            if len(self._last_ping) > self.max_entries:
+                self._prune(now)
+        return 0.0
+
+    def _prune(self, now: float) -> None:
+        """Drop entries older than the longest plausible cooldown (call with lock held)"""
+        horizon = 24 * 3600
+        stale = [key for key, last in self._last_ping.items() if now - last > horizon]
+        for key in stale:
+            del self._last_ping[key]
+        # Still too many: forget the oldest half
+        if len(self._last_ping) > self.max_entries:
+            by_age = sorted(self._last_ping.items(), key=lambda kv: kv[1])
+            for key, _ in by_age[:len(by_age) // 2]:
+                del self._last_ping[key]
+
+
+def cooldown_seconds(item: Dict[str, Any]) -> float:
+    """Ping cooldown for an item in seconds (ping.cooldownMinutes, default 3)"""
+    ping = item.get('ping') if isinstance(item.get('ping'), dict) else {}
+    minutes = ping.get('cooldownMinutes', DEFAULT_COOLDOWN_MINUTES)
+    if isinstance(minutes, bool) or not isinstance(minutes, (int, float)) or minutes < 0:
+        minutes = DEFAULT_COOLDOWN_MINUTES
+    return minutes * 60.0
+
+
+_index = None
+_index_lock = threading.Lock()
+ping_cooldowns = PingCooldowns()
+
+
+def get_geofence_index() -> GeofenceIndex:
+    """Geofence arrays for the current catalog, rebuilt only when the catalog changes"""
+    global _index
+    data = JSONHandler().read_cached()
+    with _index_lock:
+        if _index is None or _index.source is not data:
+            _index = GeofenceIndex(data.get('items', []), data.get('revision', 0), source=data)
+        return _index
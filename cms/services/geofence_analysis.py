@@ -0,0 +1,259 @@
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from config import Config
+from services.geo import METERS_PER_DEGREE_LAT, haversine_meters, location_of
+from services.json_handler import JSONHandler
+
+# Side of a grid cell (cells are square in degrees, this many meters tall)
+GRID_CELL_METERS = 25.0
+CELL_DEGREES = GRID_CELL_METERS / METERS_PER_DEGREE_LAT
+
+# Circles whose bounding box spans more cells than this are not put in the
+# grid; they are compared with every item instead (a mistyped radius of 20 km
+# would otherwise fill millions of cells)
+MAX_CELLS_PER_CIRCLE = 400
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return int(math.floor(lat / CELL_DEGREES)), int(math.floor(lng / CELL_DEGREES))
+
+
+def _cell_range(lat: float, lng: float, meters: float) -> Tuple[int, int, int, int]:
+    """(south, west, north, east) cells of the bounding box of a circle"""
+    d_lat = meters / METERS_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(min(89.0, abs(lat) + d_lat))), 1e-6)
+    d_lng = meters / (METERS_PER_DEGREE_LAT * cos_lat)
+    south, west = _cell(lat - d_lat, lng - d_lng)
+    north, east = _cell(lat + d_lat, lng + d_lng)
+    return south, west, north, east
+
+
+def _cell_count(lat: float, lng: float, meters: float) -> int:
+    south, west, north, east = _cell_range(lat, lng, meters)
+    return (north - south + 1) * (east - west + 1)
+
+
+def _cells_around(lat: float, lng: float, meters: float) -> Iterable[Tuple[int, int]]:
+    """Grid cells covering the bounding box of a circle"""
+    south, west, north, east = _cell_range(lat, lng, meters)
+    for row in range(south, north + 1):
+        for col in range(west, east + 1):
+            yield row, col
+
+
+def _finding(kind: str, a: Dict[str, Any], b: Dict[str, Any], distance: float,
+             overlap: Optional[float] = None) -> Dict[str, Any]:
+    names = f"'{a.get('name', a['id'])}' and '{b.get('name', b['id'])}'"
+    if kind == 'overlap':
+        message = f"Geofences of {names} overlap by {overlap:.1f}m (centres {distance:.1f}m apart)"
+    else:
+        message = f"{names} are only {distance:.1f}m apart"
+    finding = {'kind': kind, 'items': [a['id'], b['id']], 'distance_m': round(distance, 2), 'message': message}
+    if overlap is not None:
+        finding['overlap_m'] = round(overlap, 2)
+    return finding
+
+
+class GeofenceAnalysis:
+    """Overlap, proximity and density checks over a grid of item locations.
+
+    Items are bucketed into fixed-size grid cells (geofence circles into every
+    cell their bounding box touches), so each check only compares items that
+    share or neighbour a cell instead of every pair in the catalog. Circles
+    and searches too large for the grid fall back to a scan of every item,
+    so an oversized radius costs O(n) rather than millions of cells.
+    """
+
+    def __init__(self, items: List[Dict[str, Any]], revision: int = 0, source: Any = None):
+        self.revision = revision
+        self.source = source
+        self.entries = []
+        self.point_cells = defaultdict(list)
+        self.circle_cells = defaultdict(list)
+        self.large_circles = []
+        self._report = None
+        for item in items:
+            self._add(item)
+
+    def _add(self, item: Dict[str, Any]) -> None:
+        location = location_of(item)
+        if location is None:
+            return
+        radius = item.get('radiusMeters')
+        if isinstance(radius, bool) or not isinstance(radius, (int, float)) or radius <= 0:
+            radius = None
+        pos = len(self.entries)
+        self.entries.append((item, location[0], location[1], radius))
+        self.point_cells[_cell(*location)].append(pos)
+        if radius is not None:
+            if _cell_count(location[0], location[1], radius) > MAX_CELLS_PER_CIRCLE:
+                self.large_circles.append(pos)
+                return
+            for cell in _cells_around(location[0], location[1], radius):
+                self.circle_cells[cell].append(pos)
+
+    def _within(self, lat: float, lng: float, meters: float,
+                exclude: Iterable[str] = ()) -> List[Tuple[float, int]]:
+        """(distance, position) of the items within `meters` of a point"""
+        exclude = set(exclude)
+        found = []
+        for pos in self._positions_near(lat, lng, meters):
+            item, item_lat, item_lng, _ = self.entries[pos]
+            if item['id'] in exclude:
+                continue
+            distance = haversine_meters(lat, lng, item_lat, item_lng)
+            if distance <= meters:
+                found.append((distance, pos))
+        return found
+
+    def _positions_near(self, lat: float, lng: float, meters: float) -> Iterable[int]:
+        """Positions of the items in the grid cells around a point (every item
+        when that is fewer than the cells)"""
+        if _cell_count(lat, lng, meters) > len(self.entries):
+            return range(len(self.entries))
+        return (pos for cell in _cells_around(lat, lng, meters) for pos in self.point_cells.get(cell, ()))
+
+    def overlaps(self) -> List[Dict[str, Any]]:
+        """Pairs of items whose geofence circles overlap"""
+        findings = []
+        seen = set()
+        for positions in self.circle_cells.values():
+            for i, a in enumerate(positions):
+                for b in positions[i + 1:]:
+                    pair = (min(a, b), max(a, b))
+                    if pair in seen:
+                        continue
+                    seen.add(pair)
+                    finding = self._overlap(self.entries[pair[0]], self.entries[pair[1]])
+                    if finding:
+                        findings.append(finding)
+        for a in self.large_circles:
+            for b in range(len(self.entries)):
+                pair = (min(a, b), max(a, b))
+                if a == b or pair in seen:
+                    continue
+                seen.add(pair)
+                finding = self._overlap(self.entries[pair[0]], self.entries[pair[1]])
+                if finding:
+                    findings.append(finding)
+        return sorted(findings, key=lambda f: -f['overlap_m'])
+
+    def _overlap(self, a, b) -> Optional[Dict[str, Any]]:
+        item_a, lat_a, lng_a, radius_a = a
+        item_b, lat_b, lng_b, radius_b = b
+        if radius_a is None or radius_b is None:
+            return None
+        distance = haversine_meters(lat_a, lng_a, lat_b, lng_b)
+        if distance >= radius_a + radius_b:
+            return None
+        return _finding('overlap', item_a, item_b, distance, radius_a + radius_b - distance)
+
+    def too_close(self, min_separation: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Pairs of items whose centres are closer than min_separation meters"""
+        min_separation = Config.GEOFENCE_MIN_SEPARATION_METERS if min_separation is None else min_separation
+        findings = []
+        for pos, (item, lat, lng, _) in enumerate(self.entries):
+            for distance, other in self._within(lat, lng, min_separation):
+                if other > pos and distance < min_separation:
+                    findings.append(_finding('too_close', item, self.entries[other][0], distance))
+        return sorted(findings, key=lambda f: f['distance_m'])
+
+    def hotspots(self, radius: Optional[float] = None, min_items: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Areas where at least min_items items lie within radius meters of one item.
+
+        Greedy: the densest item becomes a hot spot centre and its neighbours
+        are not reported again.
+        """
+        radius = Config.GEOFENCE_HOTSPOT_RADIUS_METERS if radius is None else radius
+        min_items = Config.GEOFENCE_HOTSPOT_MIN_ITEMS if min_items is None else min_items
+        neighbours = []
+        for pos, (_, lat, lng, _) in enumerate(self.entries):
+            nearby = [other for _, other in self._within(lat, lng, radius)]
+            if len(nearby) >= min_items:
+                neighbours.append((len(nearby), pos, nearby))
+        neighbours.sort(key=lambda n: (-n[0], n[1]))
+
+        hotspots = []
+        covered = set()
+        for count, pos, nearby in neighbours:
+            if pos in covered:
+                continue
+            covered.update(nearby)
+            item, lat, lng, _ = self.entries[pos]
+            hotspots.append({
+                'kind': 'hotspot',
+                'lat': lat,
+                'lng': lng,
+                'count': count,
+                'items': [self.entries[other][0]['id'] for other in nearby],
+                'message': f"{count} items within {radius:g}m of '{item.get('name', item['id'])}'"
+            })
+        return hotspots
+
+    def report(self) -> Dict[str, Any]:
+        """Full-catalog findings (computed once per catalog revision)"""
+        if self._report is None:
+            self._report = {
+                'revision': self.revision,
+                'items_checked': len(self.entries),
+                'overlaps': self.overlaps(),
+                'too_close': self.too_close(),
+                'hotspots': self.hotspots()
+            }
+        return self._report
+
+    def check_items(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Findings for items at new positions, without rebuilding the grid.
+
+        The items' stored entries are ignored; they are compared with the rest
+        of the catalog and with each other at their new locations.
+        """
+        moved = GeofenceAnalysis(items)
+        moved_ids = {entry[0]['id'] for entry in moved.entries}
+        min_separation = Config.GEOFENCE_MIN_SEPARATION_METERS
+        hotspot_radius = Config.GEOFENCE_HOTSPOT_RADIUS_METERS
+        max_radius = max((entry[3] or 0 for entry in self.entries + moved.entries), default=0)
+
+        findings = []
+        for pos, entry in enumerate(moved.entries):
+            item, lat, lng, radius = entry
+            reach = max(min_separation, (radius or 0) + max_radius)
+            candidates = [(d, self.entries[p]) for d, p in self._within(lat, lng, reach, moved_ids)]
+            candidates += [(d, moved.entries[p]) for d, p in moved._within(lat, lng, reach) if p > pos]
+            for distance, other in candidates:
+                overlap = self._overlap(entry, other)
+                if overlap:
+                    findings.append(overlap)
+                if distance < min_separation:
+                    findings.append(_finding('too_close', item, other[0], distance))
+
+            nearby = len(self._within(lat, lng, hotspot_radius, moved_ids)) \
+                + len(moved._within(lat, lng, hotspot_radius))
+            if nearby >= Config.GEOFENCE_HOTSPOT_MIN_ITEMS:
+                findings.append({
+                    'kind': 'hotspot',
+                    'items': [item['id']],
+                    'lat': lat,
+                    'lng': lng,
+                    'count': nearby,
+                    'message': f"'{item.get('name', item['id'])}' is in a dense area "
+                               f"({nearby} items within {hotspot_radius:g}m)"
+                })
+        return findings
+
+
+_analysis = None
+_analysis_lock = threading.Lock()
+
+
+def get_geofence_analysis() -> GeofenceAnalysis:
+    """Analysis grid for the current catalog, rebuilt only when the catalog changes"""
+    global _analysis
+    data = JSONHandler().read_cached()
+    with _analysis_lock:
+        if _analysis is None or _analysis.source is not data:
+            _analysis = GeofenceAnalysis(data.get('items', []), data.get('revision', 0), source=data)
+        return _analysis
@@ -1,5 +1,6 @@
 import json
 import shutil
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any, Optional
@@ -17,6 +18,7 @@ except ImportError:
                 pass
 
 from config import Config
+from services.projections import write_projections
 
 # Use filelock if available, otherwise no-op
 try:
@@ -33,6 +35,11 @@ except ImportError:
 class JSONHandler:
     """Handles reading and writing to the assets JSON file (see Config.ASSETS_JSON) with backup and validation."""
     
+    # Parsed catalog shared by read-only callers, keyed by file mtime and size
+    _cache_key = None
+    _cache_data = None
+    _cache_lock = threading.Lock()
+    
     def __init__(self):
         self.json_path = Config.ASSETS_JSON
         self.backup_dir = Config.BACKUP_DIR
@@ -50,6 +57,30 @@ class JSONHandler:
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in {self.json_path}: {e}")
     
+    def read_cached(self) -> Dict[str, Any]:
+        """Read the catalog through a process-wide cache.
+        
+        The file is re-parsed only when its mtime or size changes, so the
+        returned object is shared between callers and MUST NOT be mutated.
+        Use read() for anything that edits and writes the catalog.
+        """
+        try:
+            stat = self.json_path.stat()
+            key = (str(self.json_path), stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            key = (str(self.json_path), None, None)
+        
+        cls = JSONHandler
+        with cls._cache_lock:
+            if cls._cache_key == key:
+                return cls._cache_data
+        
+        data = self.read()
+        with cls._cache_lock:
+            cls._cache_key = key
+            cls._cache_data = data
+        return data
+    
     def write(self, data: Dict[str, Any], validate: bool = True) -> bool:
         """Write data to JSON file with backup and validation"""
         if validate:
@@ -61,6 +92,9 @@ class JSONHandler:
         try:
             # Use file lock to prevent concurrent writes
             with FileLock(str(self.lock_file)):
+                # Every successful write advances the catalog revision
+                data['revision'] = self._read_revision() + 1
+                
                 # Write to temporary file first
                 temp_path = self.json_path.with_suffix('.json.tmp')
                 with open(temp_path, 'w', encoding='utf-8') as f:
@@ -72,19 +106,41 @@ class JSONHandler:
                 
                 # Replace original file
                 temp_path.replace(self.json_path)
-                return True
         except Exception as e:
             # Restore from backup on error
-            if backup_path.exists():
+            if backup_path and backup_path.exists():
                 shutil.copy(backup_path, self.json_path)
             raise Exception(f"Failed to write JSON: {e}")
+        
+        # Per-page projections are derived data; a failure here must not undo the write
+        try:
+            write_projections(data)
+        except Exception as e:
+            print(f"Warning: could not write catalog views: {e}")
+        
+        # Record per-entity revisions for delta sync (also done lazily on read)
+        try:
+            from services.catalog_sync import reconcile_catalog
+            reconcile_catalog()
+        except Exception as e:
+            print(f"Warning: could not record catalog changes: {e}")
+        return True
+    
+    def _read_revision(self) -> int:
+        """Read the revision of the catalog currently on disk"""
+        try:
+            with open(self.json_path, 'r', encoding='utf-8') as f:
+                return int(json.load(f).get('revision', 0))
+        except (FileNotFoundError, ValueError, TypeError, AttributeError):
+            return 0
     
     def _create_backup(self) -> Path:
         """Create timestamped backup of current JSON file"""
         if not self.json_path.exists():
             return None
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # Microseconds so that writes within the same second keep separate backups
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
         backup_path = self.backup_dir / f'assets_{timestamp}.json'
         shutil.copy(self.json_path, backup_path)
         
@@ -157,10 +213,10 @@ class JSONHandler:
         if not backup_path.exists():
             raise FileNotFoundError(f"Backup {backup_name} not found")
         
-        # Create backup of current before restoring
-        self._create_backup()
+        with open(backup_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
         
-        # Restore
-        shutil.copy(backup_path, self.json_path)
-        return True
+        # Restore through write() so the current file is backed up, the
+        # revision moves forward and the page views are regenerated
+        return self.write(data, validate=False)
 
@@ -0,0 +1,228 @@
+import base64
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from config import Config
+from models import db, Player
+from services.rank_index import IndexableSkipList
+
+
+def rank_key(player: Player) -> Tuple[int, float, int]:
+    """Sort key: higher score first, then whoever reached it first, then row id"""
+    return (-player.score, player.reached_at.timestamp(), player.id)
+
+
+class Leaderboard:
+    """In-memory ranking of the players table for O(log n) rank queries.
+
+    The database is the source of truth. Each worker keeps its own indexable
+    skip list, applies its own writes immediately and picks up other
+    workers' writes by reading players whose updated_at is newer than its
+    watermark (minus an overlap, since concurrent transactions can commit
+    out of timestamp order; re-applying a row is harmless).
+    """
+
+    def __init__(self):
+        self.ranks = IndexableSkipList()
+        self.keys = {}      # player_id -> rank key
+        self.entries = {}   # rank key -> (player_id, nickname, score, reached_at)
+        self.watermark = None
+        self.loaded = False
+        self._last_refresh = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.ranks)
+
+    def apply(self, player: Player) -> None:
+        """Bring one player's position in line with its database row"""
+        with self._lock:
+            old_key = self.keys.pop(player.player_id, None)
+            if old_key is not None:
+                self.ranks.remove(old_key)
+                del self.entries[old_key]
+            if not player.hidden:
+                key = rank_key(player)
+                self.ranks.insert(key)
+                self.keys[player.player_id] = key
+                self.entries[key] = (player.player_id, player.nickname, player.score, player.reached_at)
+            if self.watermark is None or player.updated_at > self.watermark:
+                self.watermark = player.updated_at
+
+    def _load(self) -> None:
+        players = Player.query.filter_by(hidden=False).all()
+        keyed = sorted((rank_key(p), p) for p in players)
+        self.ranks.load(key for key, _ in keyed)
+        self.keys = {p.player_id: key for key, p in keyed}
+        self.entries = {key: (p.player_id, p.nickname, p.score, p.reached_at) for key, p in keyed}
+        self.watermark = db.session.query(db.func.max(Player.updated_at)).scalar()
+        self.loaded = True
+
+    def refresh(self, force: bool = False) -> None:
+        """Load the table on first use, then apply rows changed by any worker"""
+        with self._lock:
+            if not self.loaded:
+                self._load()
+                self._last_refresh = time.monotonic()
+                return
+            if not force and time.monotonic() - self._last_refresh < Config.LEADERBOARD_REFRESH_SECONDS:
+                return
+            self._last_refresh = time.monotonic()
+            if self.watermark is None:
+                changed = Player.query.all()
+            else:
+                since = self.watermark - timedelta(seconds=Config.LEADERBOARD_REFRESH_OVERLAP_SECONDS)
+                changed = Player.query.filter(Player.updated_at >= since).all()
+            for player in changed:
+                self.apply(player)
+
+    def _entry(self, position: int, key) -> Dict[str, Any]:
+        player_id, nickname, score, reached_at = self.entries[key]
+        return {
+            'rank': position + 1,
+            'player_id': player_id,
+            'nickname': nickname,
+            'score': score,
+            'reached_at': reached_at.isoformat()
+        }
+
+    def top(self, n: int, offset: int = 0) -> List[Dict[str, Any]]:
+        """Players ranked offset+1 .. offset+n"""
+        self.refresh()
+        with self._lock:
+            return [self._entry(offset + i, key) for i, key in enumerate(self.ranks.slice(offset, offset + n))]
+
+    def rank_of(self, player_id: str) -> Optional[Dict[str, Any]]:
+        """A player's current entry, or None if they are not on the board"""
+        self.refresh()
+        with self._lock:
+            key = self.keys.get(player_id)
+            if key is None:
+                return None
+            return self._entry(self.ranks.rank(key), key)
+
+    def around(self, player_id: str, radius: int) -> List[Dict[str, Any]]:
+        """Up to radius players either side of a player, the player included"""
+        self.refresh()
+        with self._lock:
+            key = self.keys.get(player_id)
+            if key is None:
+                return []
+            start = max(self.ranks.rank(key) - radius, 0)
+            keys = self.ranks.slice(start, start + 2 * radius + 1)
+            return [self._entry(start + i, k) for i, k in enumerate(keys)]
+
+    def ranks_of(self, player_ids: List[str]) -> Dict[str, int]:
+        """1-based ranks of the given players that are on the board"""
+        self.refresh()
+        with self._lock:
+            return {player_id: self.ranks.rank(self.keys[player_id]) + 1
+                    for player_id in player_ids if player_id in self.keys}
+
+
+def public_entry(entry: Dict[str, Any], player_id: Optional[str] = None) -> Dict[str, Any]:
+    """An entry as served to the app: no player ids, which are the players'
+    only credential, and the row of player_id (the caller) marked 'you'"""
+    public = {'rank': entry['rank'], 'nickname': entry['nickname'], 'score': entry['score']}
+    if player_id is not None and entry['player_id'] == player_id:
+        public['you'] = True
+    return public
+
+
+def validate_player_id(player_id: Any) -> str:
+    """A client-supplied player id, stripped (raises ValueError)"""
+    if not isinstance(player_id, str) or not player_id.strip():
+        raise ValueError('player_id is required')
+    player_id = player_id.strip()
+    if len(player_id) > 100:
+        raise ValueError('player_id is too long (max 100 characters)')
+    return player_id
+
+
+def encode_cursor(score: int, reached_at: datetime, row_id: int) -> str:
+    """Opaque page cursor for a position in leaderboard order"""
+    raw = json.dumps([score, reached_at.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[int, datetime, int]:
+    """(score, reached_at, id) from encode_cursor (raises ValueError)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        score, reached_at, row_id = json.loads(raw)
+        return int(score), datetime.fromisoformat(reached_at), int(row_id)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+def _beyond(position: Tuple[int, datetime, int], backwards: bool):
+    """Rows after a position in leaderboard order (before it if backwards)"""
+    score, reached_at, row_id = position
+    if backwards:
+        return or_(Player.score > score, and_(Player.score == score, or_(
+            Player.reached_at < reached_at, and_(Player.reached_at == reached_at, Player.id < row_id))))
+    return or_(Player.score < score, and_(Player.score == score, or_(
+        Player.reached_at > reached_at, and_(Player.reached_at == reached_at, Player.id > row_id))))
+
+
+def player_page(after: Optional[str] = None, before: Optional[str] = None, limit: int = 50,
+                show: str = 'visible') -> Dict[str, Any]:
+    """One page of players in leaderboard order, addressed by cursor.
+
+    Pages are found by seeking ix_player_rank to the cursor position instead
+    of skipping rows with OFFSET, so a deep page costs the same as the first.
+    Only the index is read to pick the page; the rows themselves are then
+    fetched by primary key. show is 'visible', 'hidden' or 'all'. Returns
+    the players plus 'next' and 'prev' cursors (None at either end).
+    Raises ValueError for a malformed cursor.
+    """
+    backwards = before is not None
+    position = decode_cursor(before if backwards else after) if (before or after) else None
+
+    query = db.session.query(Player.id, Player.score, Player.reached_at)
+    if show != 'all':
+        query = query.filter(Player.hidden == (show == 'hidden'))
+    if position is not None:
+        query = query.filter(_beyond(position, backwards))
+    if backwards:
+        query = query.order_by(Player.score, Player.reached_at.desc(), Player.id.desc())
+    else:
+        query = query.order_by(Player.score.desc(), Player.reached_at, Player.id)
+    keys = query.limit(limit + 1).all()
+
+    more = len(keys) > limit
+    keys = keys[:limit]
+    if backwards and not keys:
+        return player_page(limit=limit, show=show)  # Nothing before the cursor any more
+    if backwards:
+        keys.reverse()
+    rows = {p.id: p for p in Player.query.filter(Player.id.in_([k.id for k in keys]))} if keys else {}
+    players = [rows[k.id] for k in keys if k.id in rows]
+
+    first = encode_cursor(*keys[0][1:], keys[0][0]) if keys else None
+    last = encode_cursor(*keys[-1][1:], keys[-1][0]) if keys else None
+    if backwards:
+        return {'players': players, 'prev': first if more else None, 'next': last}
+    return {'players': players, 'prev': first if position is not None else None, 'next': last if more else None}
+
+
+def player_summary(player: Player, rank: Optional[int] = None) -> Dict[str, Any]:
+    """JSON view of a player row for the admin API"""
+    return {
+        'player_id': player.player_id,
+        'nickname': player.nickname,
+        'score': player.score,
+        'rank': rank,
+        'reached_at': player.reached_at.isoformat(),
+        'created_at': player.created_at.isoformat() if player.created_at else None,
+        'updated_at': player.updated_at.isoformat(),
+        'hidden': player.hidden
+    }
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, LeaderboardSnapshot, Player, ScoreEvent
+from services.leaderboard import public_entry
+
+PERIODS = ('daily', 'weekly', 'alltime')
+
+# '' is the snapshot across every venue
+ALL_VENUES = ''
+
+
+def window_start(period: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Start of the current period in UTC (today, this Monday; None for alltime)"""
+    now = now or datetime.utcnow()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == 'daily':
+        return midnight
+    if period == 'weekly':
+        return midnight - timedelta(days=midnight.weekday())
+    return None
+
+
+def _entries(rows) -> List[Dict[str, Any]]:
+    return [{
+        'rank': rank,
+        'player_id': player_id,
+        'nickname': nickname,
+        'score': score,
+        'reached_at': reached_at.isoformat() if isinstance(reached_at, datetime) else reached_at
+    } for rank, (player_id, nickname, score, reached_at) in enumerate(rows, start=1)]
+
+
+def compute_top(period: str, venue: str, size: int, start: Optional[datetime]) -> List[Dict[str, Any]]:
+    """Top players for a period and venue, in leaderboard order.
+
+    All-time across venues is the players table itself (read along
+    ix_player_rank); anything narrower sums the points of the matching
+    score events. Ties go to whoever reached the score first.
+    """
+    if start is None and venue == ALL_VENUES:
+        rows = (db.session.query(Player.player_id, Player.nickname, Player.score, Player.reached_at)
+                .filter(Player.hidden.is_(False), Player.score > 0)
+                .order_by(Player.score.desc(), Player.reached_at, Player.id)
+                .limit(size).all())
+        return _entries(rows)
+
+    total = db.func.sum(ScoreEvent.points)
+    reached = db.func.max(ScoreEvent.created_at)
+    query = (db.session.query(ScoreEvent.player_id, Player.nickname, total, reached)
+             .join(Player, Player.player_id == ScoreEvent.player_id)
+             .filter(Player.hidden.is_(False)))
+    if start is not None:
+        query = query.filter(ScoreEvent.created_at >= start)
+    if venue != ALL_VENUES:
+        query = query.filter(ScoreEvent.venue == venue)
+    rows = (query.group_by(ScoreEvent.player_id, Player.nickname)
+            .having(total > 0)
+            .order_by(total.desc(), reached, ScoreEvent.player_id)
+            .limit(size).all())
+    return _entries(rows)
+
+
+def active_venues(start: Optional[datetime], limit: int) -> List[str]:
+    """Venues with events in the period, busiest first (venues are client-supplied, so capped)"""
+    query = db.session.query(ScoreEvent.venue).filter(ScoreEvent.venue.isnot(None))
+    if start is not None:
+        query = query.filter(ScoreEvent.created_at >= start)
+    rows = query.group_by(ScoreEvent.venue).order_by(db.func.count(ScoreEvent.id).desc()).limit(limit)
+    return [venue for (venue,) in rows]
+
+
+def store_snapshot(period: str, venue: str, start: Optional[datetime],
+                   players: List[Dict[str, Any]]) -> LeaderboardSnapshot:
+    """Replace the stored snapshot for a period and venue"""
+    for attempt in range(2):
+        snapshot = LeaderboardSnapshot.query.filter_by(period=period, venue=venue).first()
+        if snapshot is None:
+            snapshot = LeaderboardSnapshot(period=period, venue=venue)
+            db.session.add(snapshot)
+        snapshot.window_start = start
+        snapshot.computed_at = datetime.utcnow()
+        snapshot.players = json.dumps(players, separators=(',', ':'))
+        try:
+            db.session.commit()
+            return snapshot
+        except IntegrityError:
+            # Another worker stored the first snapshot at the same moment; overwrite theirs
+            db.session.rollback()
+            if attempt:
+                raise
+
+
+def refresh_snapshots(size: int, max_venues: int, max_age: float = 0) -> Dict[str, int]:
+    """Recompute every period's snapshots, overall and per venue.
+
+    Snapshots computed less than max_age seconds ago (by any worker) are
+    left alone. Snapshots for venues no longer among the active ones are
+    removed. Returns {'computed': n, 'skipped': n, 'removed': n}.
+    """
+    summary = {'computed': 0, 'skipped': 0, 'removed': 0}
+    now = datetime.utcnow()
+    fresh_since = now - timedelta(seconds=max_age)
+    for period in PERIODS:
+        start = window_start(period, now)
+        venues = [ALL_VENUES] + active_venues(start, max_venues)
+        stored = {s.venue: s for s in LeaderboardSnapshot.query.filter_by(period=period)}
+        for venue in venues:
+            snapshot = stored.get(venue)
+            if max_age and snapshot is not None and snapshot.computed_at >= fresh_since \
+                    and snapshot.window_start == start:
+                summary['skipped'] += 1
+                continue
+            store_snapshot(period, venue, start, compute_top(period, venue, size, start))
+            summary['computed'] += 1
+        for venue, snapshot in stored.items():
+            if venue not in venues:
+                db.session.delete(snapshot)
+                summary['removed'] += 1
+        db.session.commit()
+    return summary
+
+
+def snapshot_body(snapshot: LeaderboardSnapshot) -> Dict[str, Any]:
+    return {
+        'period': snapshot.period,
+        'venue': snapshot.venue or None,
+        'window_start': snapshot.window_start.isoformat() if snapshot.window_start else None,
+        'computed_at': snapshot.computed_at.isoformat(),
+        'players': [public_entry(entry) for entry in json.loads(snapshot.players)]
+    }
+
+
+class SnapshotScheduler:
+    """Background thread that keeps leaderboard snapshots fresh.
+
+    Every worker runs one, started by the first snapshot read; a worker
+    skips snapshots another worker refreshed within the interval, so the
+    work is done roughly once per interval overall. With an interval of 0
+    the thread never starts and `flask leaderboard-snapshots` is expected
+    to run from cron instead.
+    """
+
+    def __init__(self):
+        self.interval = 300.0
+        self.size = 100
+        self.max_venues = 50
+        self._app = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        """Read LEADERBOARD_SNAPSHOT_* settings"""
+        self._app = app
+        self.interval = app.config['LEADERBOARD_SNAPSHOT_SECONDS']
+        self.size = app.config['LEADERBOARD_SNAPSHOT_SIZE']
+        self.max_venues = app.config['LEADERBOARD_SNAPSHOT_MAX_VENUES']
+
+    def ensure_running(self) -> None:
+        if self.interval <= 0 or self._app is None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='leaderboard-snapshots', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                with self._app.app_context():
+                    refresh_snapshots(self.size, self.max_venues, max_age=self.interval)
+            except Exception as e:
+                print(f"Warning: leaderboard snapshot refresh failed: {e}")
+            time.sleep(self.interval)
+
+    def get(self, period: str, venue: str = ALL_VENUES) -> Optional[LeaderboardSnapshot]:
+        """The stored snapshot; an all-venue one missing on a fresh install is computed on the spot"""
+        self.ensure_running()
+        snapshot = LeaderboardSnapshot.query.filter_by(period=period, venue=venue).first()
+        if snapshot is None and venue == ALL_VENUES:
+            start = window_start(period)
+            snapshot = store_snapshot(period, venue, start, compute_top(period, venue, self.size, start))
+        return snapshot
+
+
+snapshot_scheduler = SnapshotScheduler()
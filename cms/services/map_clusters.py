@@ -0,0 +1,97 @@
+import threading
+from typing import Dict, Any, List, Optional
+
+from services.geo import geohash_cell_size, haversine_meters
+from services.spatial_index import INDEX_PRECISION, SpatialIndex, get_spatial_index
+
+# Target on-screen cluster cell width in pixels (Leaflet tiles are 256px)
+CLUSTER_CELL_PIXELS = 64
+
+
+def cluster_precision_for_zoom(zoom: int) -> int:
+    """Coarsest geohash precision whose cells are at most ~CLUSTER_CELL_PIXELS wide at a zoom"""
+    target_width = 360.0 / (2 ** zoom) * CLUSTER_CELL_PIXELS / 256
+    for precision in range(1, INDEX_PRECISION + 1):
+        if geohash_cell_size(precision)[1] <= target_width:
+            return precision
+    return INDEX_PRECISION
+
+
+class MapClusters:
+    """Grid clusters of the spatial index, computed once per precision and reused"""
+
+    def __init__(self, index: SpatialIndex):
+        self.index = index
+        self._by_precision = {}
+        self._lock = threading.Lock()
+
+    def for_zoom(self, zoom: int) -> List[Dict[str, Any]]:
+        """All clusters at a zoom level"""
+        precision = cluster_precision_for_zoom(zoom)
+        with self._lock:
+            clusters = self._by_precision.get(precision)
+            if clusters is None:
+                clusters = self._build(precision)
+                self._by_precision[precision] = clusters
+            return clusters
+
+    def query(self, zoom: int, south: Optional[float] = None, west: Optional[float] = None,
+              north: Optional[float] = None, east: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Clusters at a zoom level whose bounds intersect an optional bounding box"""
+        clusters = self.for_zoom(zoom)
+        if south is None:
+            return clusters
+        return [
+            c for c in clusters
+            if c['bounds'][0] <= north and c['bounds'][2] >= south
+            and c['bounds'][1] <= east and c['bounds'][3] >= west
+        ]
+
+    def _build(self, precision: int) -> List[Dict[str, Any]]:
+        """Group index entries by geohash prefix (entries are sorted, so groups are runs)"""
+        clusters = []
+        keys = self.index.keys
+        start = 0
+        while start < len(keys):
+            prefix = keys[start][:precision]
+            end = start
+            while end < len(keys) and keys[end].startswith(prefix):
+                end += 1
+            clusters.append(self._summarise(prefix, start, end))
+            start = end
+        return clusters
+
+    def _summarise(self, cell: str, start: int, end: int) -> Dict[str, Any]:
+        """Count, centroid, bounds and representative item for one cluster"""
+        coords = self.index.coords[start:end]
+        lat = sum(c[0] for c in coords) / len(coords)
+        lng = sum(c[1] for c in coords) / len(coords)
+        # Representative: the item nearest the centroid
+        nearest = min(range(start, end),
+                      key=lambda pos: haversine_meters(lat, lng, *self.index.coords[pos]))
+        item = self.index.items[nearest]
+        return {
+            'cell': cell,
+            'count': end - start,
+            'lat': lat,
+            'lng': lng,
+            'bounds': [
+                min(c[0] for c in coords), min(c[1] for c in coords),
+                max(c[0] for c in coords), max(c[1] for c in coords)
+            ],
+            'item': {'id': item.get('id'), 'name': item.get('name', '')}
+        }
+
+
+_clusters = None
+_clusters_lock = threading.Lock()
+
+
+def get_map_clusters() -> MapClusters:
+    """Clusters for the current catalog, discarded when the spatial index is rebuilt"""
+    global _clusters
+    index = get_spatial_index()
+    with _clusters_lock:
+        if _clusters is None or _clusters.index is not index:
+            _clusters = MapClusters(index)
+        return _clusters
@@ -0,0 +1,120 @@
+from typing import Dict, Any, Iterable, List, Set, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from config import Config
+from models import db, PlayerProgress
+from services.leaderboard import validate_player_id
+
+# Field in the sync payload -> PlayerProgress.kind
+PROGRESS_KINDS = {'badges': 'badge', 'games': 'game'}
+
+# Values per IN (...) lookup
+QUERY_CHUNK = 500
+
+
+def parse_token(token: Any) -> int:
+    """Row-id watermark from a sync token; no token means nothing synced yet (raises ValueError)"""
+    if token is None or token == '':
+        return 0
+    if isinstance(token, int) and not isinstance(token, bool) and token >= 0:
+        return token
+    if isinstance(token, str) and token.isdigit():
+        return int(token)
+    raise ValueError('Invalid sync token')
+
+
+def parse_delta(raw: Any) -> Set[Tuple[str, str]]:
+    """(kind, value) pairs from {"badges": [...], "games": [...]} (raises ValueError)"""
+    if raw is None:
+        return set()
+    if not isinstance(raw, dict):
+        raise ValueError('add must be an object')
+    entries = set()
+    for field, kind in PROGRESS_KINDS.items():
+        values = raw.get(field) or []
+        if not isinstance(values, list):
+            raise ValueError(f'add.{field} must be a list')
+        for value in values:
+            if not isinstance(value, str) or not value.strip() or len(value) > 200:
+                raise ValueError(f'add.{field} must hold ids of up to 200 characters')
+            entries.add((kind, value.strip()))
+    if len(entries) > Config.PROGRESS_MAX_ENTRIES:
+        raise ValueError(f'Too many entries (max {Config.PROGRESS_MAX_ENTRIES})')
+    return entries
+
+
+def _known(player_id: str, entries: Set[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+    """Entries the player already has"""
+    known = set()
+    for kind in {k for k, _ in entries}:
+        values = sorted(v for k, v in entries if k == kind)
+        for start in range(0, len(values), QUERY_CHUNK):
+            rows = db.session.query(PlayerProgress.value).filter(
+                PlayerProgress.player_id == player_id,
+                PlayerProgress.kind == kind,
+                PlayerProgress.value.in_(values[start:start + QUERY_CHUNK]))
+            known.update((kind, value) for (value,) in rows)
+    return known
+
+
+def merge_progress(player_id: str, entries: Iterable[Tuple[str, str]]) -> int:
+    """Add entries to a player's collection (a set union, so order and repeats
+    do not matter) and commit; returns how many were new"""
+    entries = set(entries)
+    for attempt in range(2):
+        new = entries - _known(player_id, entries)
+        db.session.add_all(PlayerProgress(player_id=player_id, kind=kind, value=value)
+                           for kind, value in sorted(new))
+        try:
+            db.session.commit()
+            return len(new)
+        except IntegrityError:
+            # The same entry arrived from another device at the same moment
+            db.session.rollback()
+            if attempt:
+                raise
+
+
+def sync_progress(player_id: Any, token: Any, delta: Any) -> Dict[str, Any]:
+    """Merge a client's additions and return what it is missing.
+
+    The client sends the entries it gained since its last sync and the token
+    that sync returned. The response holds the entries added from elsewhere
+    since that token (other devices, or awarded by the server) and a new
+    token; a token the server does not know, such as one from before a
+    database reset, gets the full collection with "full": true. Raises
+    ValueError for invalid input.
+    """
+    player_id = validate_player_id(player_id)
+    since = parse_token(token)
+    sent = parse_delta(delta)
+    if sent:
+        merge_progress(player_id, sent)
+
+    latest = db.session.query(db.func.max(PlayerProgress.id)).filter(
+        PlayerProgress.player_id == player_id).scalar() or 0
+    full = since > latest
+    if full:
+        since = 0
+
+    rows = (db.session.query(PlayerProgress.kind, PlayerProgress.value)
+            .filter(PlayerProgress.player_id == player_id, PlayerProgress.id > since)
+            .order_by(PlayerProgress.id))
+    missing = {field: [] for field in PROGRESS_KINDS}
+    fields = {kind: field for field, kind in PROGRESS_KINDS.items()}
+    for kind, value in rows:
+        if full or (kind, value) not in sent:
+            missing[fields[kind]].append(value)
+    return {'token': str(latest), 'add': missing, 'full': full}
+
+
+def player_collection(player_id: str) -> Dict[str, List[str]]:
+    """Everything a player has collected, by field"""
+    collection = {field: [] for field in PROGRESS_KINDS}
+    fields = {kind: field for field, kind in PROGRESS_KINDS.items()}
+    rows = (db.session.query(PlayerProgress.kind, PlayerProgress.value)
+            .filter(PlayerProgress.player_id == player_id).order_by(PlayerProgress.id))
+    for kind, value in rows:
+        collection[fields[kind]].append(value)
+    return collection
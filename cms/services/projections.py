@@ -0,0 +1,64 @@
+import json
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from config import Config
+
+# Fields each public page reads from the catalog. Dotted paths select nested
+# fields; a bare key copies the whole value.
+VIEW_FIELDS = {
+    'map': {
+        'items': ['id', 'name', 'location', 'radiusMeters', 'icon', 'ping',
+                  'mapHotspot', 'model.url', 'model.usdz'],
+    },
+    'animals': {
+        'items': ['id', 'name', 'description', 'place', 'cardImage', 'icon.found',
+                  'badge.id', 'badge.icon', 'model.url', 'model.usdz'],
+    },
+    'badges': {
+        'items': ['id', 'name', 'description', 'badgeDescription', 'place',
+                  'model.url', 'model.usdz', 'badge'],
+        'gameBadges': ['id', 'name', 'description', 'icon', 'gamePath'],
+    },
+}
+
+
+def project_entity(entity: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Copy only the listed (possibly dotted) fields of an entity"""
+    result = {}
+    for field in fields:
+        parts = field.split('.')
+        source = entity
+        for part in parts[:-1]:
+            source = source.get(part) if isinstance(source, dict) else None
+        if not isinstance(source, dict) or parts[-1] not in source:
+            continue
+        target = result
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = source[parts[-1]]
+    return result
+
+
+def build_projection(view: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the projection document for one view"""
+    projection = {'revision': data.get('revision', 0)}
+    for collection, fields in VIEW_FIELDS[view].items():
+        projection[collection] = [project_entity(e, fields) for e in data.get(collection, [])]
+    return projection
+
+
+def write_projections(data: Dict[str, Any], views_dir: Optional[Path] = None) -> List[Path]:
+    """Write every view projection for a catalog, returning the written paths"""
+    views_dir = Path(views_dir or Config.VIEWS_DIR)
+    views_dir.mkdir(parents=True, exist_ok=True)
+
+    written = []
+    for view in VIEW_FIELDS:
+        path = views_dir / f'{view}.json'
+        temp_path = path.with_suffix('.json.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(build_projection(view, data), f, separators=(',', ':'), ensure_ascii=False)
+        temp_path.replace(path)
+        written.append(path)
+    return written
@@ -0,0 +1,252 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import Config
+from services.json_handler import JSONHandler
+from services.projections import write_projections
+
+# Brotli is optional; without it only .gz variants are written
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Relative references to files in the published tree, e.g. "../assets/Badge.png",
+# "./scripts/settings.js" or "../../assets/models/Lion1K.glb" in the catalog.
+# Only quoted or url(...) references are rewritten.
+REFERENCE_PATTERN = re.compile(
+    r'''(?P<open>["'(])(?P<prefix>(?:\.\.?/)*)(?P<path>(?:assets|scripts|styles|data)/[^"'()?#\n]*?)(?=[?#"')])'''
+)
+
+CSS_TOKEN_PATTERN = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)''', re.S)
+CSS_SPACE_PATTERN = re.compile(r'\s*([{};,>])\s*')
+
+COMPRESSIBLE_SUFFIXES = {'.html', '.css', '.js', '.json', '.svg', '.txt'}
+HASH_LENGTH = 10
+STATE_FILE = '.publish-state.json'
+MANIFEST_FILE = 'manifest.json'
+
+
+def content_hash(data: bytes) -> str:
+    """Short content hash used in fingerprinted filenames"""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def fingerprinted_name(rel_path: str, digest: str) -> str:
+    """Insert a content hash before the extension: a/b.png -> a/b.<hash>.png"""
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest}{ext}"
+
+
+def _minify_css_code(code: str) -> str:
+    """Collapse whitespace in CSS outside strings and comments"""
+    code = re.sub(r'\s+', ' ', code)
+    code = CSS_SPACE_PATTERN.sub(r'\1', code)
+    # Whitespace before ':' is kept because it is significant in selectors
+    code = re.sub(r':\s+', ':', code)
+    return code.replace(';}', '}')
+
+
+def minify_css(text: str) -> str:
+    """Conservative CSS minifier: strips comments and insignificant whitespace, leaving strings intact"""
+    parts = []
+    last = 0
+    for match in CSS_TOKEN_PATTERN.finditer(text):
+        parts.append(_minify_css_code(text[last:match.start()]))
+        if match.group(1):
+            parts.append(match.group(1))
+        last = match.end()
+    parts.append(_minify_css_code(text[last:]))
+    return ''.join(parts).strip()
+
+
+def minify_json(text: str) -> str:
+    """Re-serialise JSON without whitespace"""
+    return json.dumps(json.loads(text), separators=(',', ':'), ensure_ascii=False)
+
+
+class Publisher:
+    """Builds a static, CDN-ready copy of the public site.
+
+    Assets, scripts, styles and catalog files are written under content-hashed
+    names (their original names are kept too, for paths built at runtime), and
+    references in HTML, CSS, JS and the catalog are rewritten to the hashed
+    names. Text outputs get .gz (and .br when brotli is installed) variants.
+    Builds are incremental: unchanged inputs are not re-read or re-written.
+    """
+
+    def __init__(self, output_dir: Optional[Path] = None):
+        self.base_dir = Config.BASE_DIR
+        self.output_dir = Path(output_dir or Config.PUBLISH_DIR)
+        self.state_path = self.output_dir / STATE_FILE
+        self.state = {'sources': {}, 'outputs': {}}
+        self.mapping = {}
+        self.written = []
+        self.skipped = 0
+
+    def publish(self, force: bool = False) -> Dict[str, Any]:
+        """Build the output directory and return a summary"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        previous = self._load_state() if not force else {'sources': {}, 'outputs': {}}
+        self.state = {'sources': {}, 'outputs': {}}
+        self.mapping = {}
+        self.written = []
+        self.skipped = 0
+
+        # Page views are derived from the catalog; refresh them so the build matches it
+        write_projections(JSONHandler().read())
+
+        # Order matters: each group may reference files fingerprinted before it
+        for rel_path in self._collect('assets'):
+            self._publish_binary(rel_path, previous)
+        for rel_path in self._collect('styles', '.css'):
+            self._publish_text(rel_path, previous, minify_css, fingerprint=True)
+        for rel_path in self._collect('data', '.json'):
+            self._publish_text(rel_path, previous, minify_json, fingerprint=True)
+        for rel_path in self._collect('scripts', '.js'):
+            self._publish_text(rel_path, previous, None, fingerprint=True)
+        for rel_path in ['index.html'] + self._collect('pages', '.html'):
+            self._publish_text(rel_path, previous, None, fingerprint=False)
+
+        removed = self._remove_stale(previous)
+        self._write_manifest()
+        self._save_state()
+
+        return {
+            'output_dir': str(self.output_dir),
+            'files': len(self.state['outputs']),
+            'written': len(self.written),
+            'skipped': self.skipped,
+            'removed': removed
+        }
+
+    def _collect(self, directory: str, suffix: Optional[str] = None) -> List[str]:
+        """List files under a top-level directory as posix paths relative to BASE_DIR"""
+        root = self.base_dir / directory
+        if not root.exists():
+            return []
+        paths = []
+        for path in sorted(root.rglob('*')):
+            if not path.is_file() or path.name.startswith('.'):
+                continue
+            if suffix and path.suffix.lower() != suffix:
+                continue
+            paths.append(path.relative_to(self.base_dir).as_posix())
+        return paths
+
+    def _source_digest(self, rel_path: str, previous: Dict[str, Any]) -> Tuple[Optional[str], os.stat_result]:
+        """Return the cached digest for an unchanged source, or None if it must be re-read"""
+        stat = (self.base_dir / rel_path).stat()
+        cached = previous['sources'].get(rel_path)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['digest'], stat
+        return None, stat
+
+    def _publish_binary(self, rel_path: str, previous: Dict[str, Any]) -> None:
+        """Copy an asset under its original and fingerprinted names"""
+        digest, stat = self._source_digest(rel_path, previous)
+        data = None
+        if digest is None:
+            data = (self.base_dir / rel_path).read_bytes()
+            digest = content_hash(data)
+        self.state['sources'][rel_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest}
+
+        hashed = fingerprinted_name(rel_path, digest)
+        self.mapping[rel_path] = hashed
+        for out_path in (rel_path, hashed):
+            if previous['outputs'].get(out_path) == digest and (self.output_dir / out_path).exists():
+                self.state['outputs'][out_path] = digest
+                self.skipped += 1
+                continue
+            if data is None:
+                data = (self.base_dir / rel_path).read_bytes()
+            self._write_output(out_path, data, digest)
+
+    def _publish_text(self, rel_path: str, previous: Dict[str, Any], minify, fingerprint: bool) -> None:
+        """Rewrite references in a text file, minify it and write it out"""
+        text = (self.base_dir / rel_path).read_text(encoding='utf-8')
+        text = self.rewrite_references(text)
+        if minify:
+            text = minify(text)
+        data = text.encode('utf-8')
+        digest = content_hash(data)
+
+        out_paths = [rel_path]
+        if fingerprint:
+            hashed = fingerprinted_name(rel_path, digest)
+            self.mapping[rel_path] = hashed
+            out_paths.append(hashed)
+
+        for out_path in out_paths:
+            if previous['outputs'].get(out_path) == digest and (self.output_dir / out_path).exists():
+                self.state['outputs'][out_path] = digest
+                self.skipped += 1
+                continue
+            self._write_output(out_path, data, digest)
+
+    def rewrite_references(self, text: str) -> str:
+        """Point relative references at fingerprinted filenames"""
+        def replace(match):
+            hashed = self.mapping.get(match.group('path'))
+            if hashed is None:
+                return match.group(0)
+            return f"{match.group('open')}{match.group('prefix')}{hashed}"
+        return REFERENCE_PATTERN.sub(replace, text)
+
+    def _write_output(self, out_path: str, data: bytes, digest: str) -> None:
+        """Write one output file plus its precompressed variants"""
+        target = self.output_dir / out_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = target.with_name(target.name + '.tmp')
+        temp_path.write_bytes(data)
+        temp_path.replace(target)
+
+        if target.suffix.lower() in COMPRESSIBLE_SUFFIXES:
+            target.with_name(target.name + '.gz').write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                target.with_name(target.name + '.br').write_bytes(brotli.compress(data))
+
+        self.state['outputs'][out_path] = digest
+        self.written.append(out_path)
+
+    def _remove_stale(self, previous: Dict[str, Any]) -> int:
+        """Delete outputs (and their compressed variants) from earlier builds that no longer exist"""
+        removed = 0
+        for out_path in previous['outputs']:
+            if out_path in self.state['outputs']:
+                continue
+            target = self.output_dir / out_path
+            for path in (target, target.with_name(target.name + '.gz'), target.with_name(target.name + '.br')):
+                if path.exists():
+                    path.unlink()
+            removed += 1
+        return removed
+
+    def _write_manifest(self) -> None:
+        """Write the original -> fingerprinted filename manifest"""
+        manifest = {
+            'generated': datetime.utcnow().isoformat() + 'Z',
+            'files': dict(sorted(self.mapping.items()))
+        }
+        with open(self.output_dir / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    def _load_state(self) -> Dict[str, Any]:
+        """Load the previous build's source and output digests"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return {'sources': state.get('sources', {}), 'outputs': state.get('outputs', {})}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'sources': {}, 'outputs': {}}
+
+    def _save_state(self) -> None:
+        """Persist digests for the next incremental build"""
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
@@ -0,0 +1,160 @@
+import random
+from typing import Any, Iterator, List
+
+# Enough levels for tens of millions of keys at p=1/2
+MAX_LEVELS = 24
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key: Any, levels: int):
+        self.key = key
+        self.next = [None] * levels
+        self.width = [1] * levels  # bottom-level steps to next[level]
+
+
+class IndexableSkipList:
+    """Sorted collection of unique keys with O(log n) insert, remove, rank and
+    positional lookup.
+
+    Every forward link also stores how many elements it skips, so a search
+    that counts the widths it crosses knows the position it reached.
+    """
+
+    def __init__(self):
+        self._tail = _Node(None, 0)
+        self._head = _Node(None, MAX_LEVELS)
+        self._head.next = [self._tail] * MAX_LEVELS
+        self._size = 0
+        self._levels = 1  # levels in use; the ones above only link head to tail
+
+    def __len__(self) -> int:
+        return self._size
+
+    def load(self, keys) -> None:
+        """Replace the contents with already sorted, unique keys in O(n)"""
+        self.__init__()
+        last = [self._head] * MAX_LEVELS
+        last_position = [0] * MAX_LEVELS
+        position = 0
+        for key in keys:
+            position += 1
+            levels = self._random_levels()
+            node = _Node(key, levels)
+            for level in range(levels):
+                last[level].next[level] = node
+                last[level].width[level] = position - last_position[level]
+                last[level], last_position[level] = node, position
+            self._levels = max(self._levels, levels)
+        for level in range(MAX_LEVELS):
+            last[level].next[level] = self._tail
+            last[level].width[level] = position + 1 - last_position[level]
+        self._size = position
+
+    def _random_levels(self) -> int:
+        levels = 1
+        while levels < MAX_LEVELS and random.random() < 0.5:
+            levels += 1
+        return levels
+
+    def _predecessors(self, key: Any):
+        """Last node before key on every level, and the position of each"""
+        chain = [self._head] * MAX_LEVELS
+        positions = [0] * MAX_LEVELS
+        node, position = self._head, 0
+        for level in reversed(range(self._levels)):
+            following = node.next[level]
+            while following is not self._tail and following.key < key:
+                position += node.width[level]
+                node, following = following, following.next[level]
+            chain[level] = node
+            positions[level] = position
+        return chain, positions
+
+    def insert(self, key: Any) -> None:
+        """Add a key (keys must be unique)"""
+        chain, positions = self._predecessors(key)
+        following = chain[0].next[0]
+        if following is not self._tail and following.key == key:
+            raise KeyError(f'{key!r} is already present')
+
+        levels = self._random_levels()
+        self._levels = max(self._levels, levels)
+        node = _Node(key, levels)
+        new_position = positions[0] + 1
+        for level in range(levels):
+            previous = chain[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            # previous -> node spans (new_position - positions[level]) steps
+            node.width[level] = previous.width[level] - (new_position - positions[level]) + 1
+            previous.width[level] = new_position - positions[level]
+        for level in range(levels, MAX_LEVELS):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, key: Any) -> None:
+        """Remove a key (KeyError if absent)"""
+        chain, _ = self._predecessors(key)
+        node = chain[0].next[0]
+        if node is self._tail or node.key != key:
+            raise KeyError(key)
+        for level in range(len(node.next)):
+            previous = chain[level]
+            previous.width[level] += node.width[level] - 1
+            previous.next[level] = node.next[level]
+        for level in range(len(node.next), MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+    def __contains__(self, key: Any) -> bool:
+        chain, _ = self._predecessors(key)
+        node = chain[0].next[0]
+        return node is not self._tail and node.key == key
+
+    def rank(self, key: Any) -> int:
+        """0-based position of a key (ValueError if absent)"""
+        chain, positions = self._predecessors(key)
+        node = chain[0].next[0]
+        if node is self._tail or node.key != key:
+            raise ValueError(f'{key!r} is not present')
+        return positions[0]
+
+    def _node_at(self, index: int) -> _Node:
+        if not 0 <= index < self._size:
+            raise IndexError('index out of range')
+        node, remaining = self._head, index + 1
+        for level in reversed(range(self._levels)):
+            while node.width[level] <= remaining and node.next[level] is not self._tail:
+                remaining -= node.width[level]
+                node = node.next[level]
+            if remaining == 0:
+                break
+        return node
+
+    def __getitem__(self, index: int) -> Any:
+        if index < 0:
+            index += self._size
+        return self._node_at(index).key
+
+    def iter_from(self, start: int) -> Iterator[Any]:
+        """Keys from position start onwards"""
+        if start >= self._size:
+            return
+        node = self._node_at(max(start, 0))
+        while node is not self._tail:
+            yield node.key
+            node = node.next[0]
+
+    def slice(self, start: int, stop: int) -> List[Any]:
+        """Keys at positions start..stop-1"""
+        keys = []
+        for key in self.iter_from(start):
+            if len(keys) >= stop - start:
+                break
+            keys.append(key)
+        return keys
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.iter_from(0)
@@ -0,0 +1,254 @@
+import math
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from flask import g, jsonify, request
+from flask_login import current_user
+
+CLIENT_KEYS = ('ip', 'user', 'device')
+
+# Clients whose limited-request counts are kept for the metrics
+MAX_TRACKED_CLIENTS = 1000
+
+# Seconds between removals of buckets that have refilled (and so equal a new one)
+PRUNE_SECONDS = 60
+
+
+class Limit:
+    """Token bucket settings for one endpoint or blueprint"""
+
+    def __init__(self, name: str, per_minute: float, burst: int, key: str):
+        if key not in CLIENT_KEYS:
+            raise ValueError(f"Unknown client key for rate limit {name}: {key}")
+        if per_minute <= 0 or burst < 1:
+            raise ValueError(f"Rate limit {name} needs a positive rate and a burst of at least 1")
+        self.name = name
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.key = key
+
+
+def take_token(tokens: Optional[float], updated: float, now: float, limit: Limit) -> Tuple[bool, float, float]:
+    """Refill a bucket up to now and take one token.
+
+    A missing bucket (tokens None) is full. Returns (allowed, tokens left,
+    seconds until the next token if refused).
+    """
+    if tokens is None:
+        tokens = float(limit.burst)
+    else:
+        tokens = min(float(limit.burst), tokens + max(0.0, now - updated) * limit.rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / limit.rate
+
+
+class MemoryBuckets:
+    """Buckets in this worker's memory (each worker limits on its own)"""
+
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, updated, full_at)
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def take(self, key: str, limit: Limit) -> Tuple[bool, float, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (None, now, now))
+            allowed, tokens, retry_after = take_token(tokens, updated, now, limit)
+            self._buckets[key] = (tokens, now, now + (limit.burst - tokens) / limit.rate)
+            if now - self._last_prune > PRUNE_SECONDS:
+                self._last_prune = now
+                self._buckets = {k: v for k, v in self._buckets.items() if v[2] > now}
+        return allowed, tokens, retry_after
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._buckets)
+
+
+class SQLiteBuckets:
+    """Buckets in a SQLite file shared by the workers on one host.
+
+    Each take is one short IMMEDIATE transaction on a WAL database, so
+    workers see each other's requests; it is kept apart from the CMS
+    database so limiting never waits on catalog or score writes.
+    """
+
+    def __init__(self, path: Path, timeout: float = 0.25):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._last_prune = time.monotonic()
+        connection = self._connection()
+        connection.execute('CREATE TABLE IF NOT EXISTS buckets '
+                           '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS ix_buckets_full_at ON buckets (full_at)')
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+        return connection
+
+    def take(self, key: str, limit: Limit) -> Tuple[bool, float, float]:
+        # Wall-clock time: monotonic clocks are not comparable across processes
+        now = time.time()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            allowed, tokens, retry_after = take_token(row[0] if row else None, row[1] if row else now, now, limit)
+            connection.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)',
+                               (key, tokens, now, now + (limit.burst - tokens) / limit.rate))
+            if time.monotonic() - self._last_prune > PRUNE_SECONDS:
+                self._last_prune = time.monotonic()
+                connection.execute('DELETE FROM buckets WHERE full_at <= ?', (now,))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return allowed, tokens, retry_after
+
+    def __len__(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM buckets').fetchone()[0]
+
+
+class RateLimiter:
+    """Per-client token buckets in front of hot endpoints.
+
+    RATE_LIMITS maps an endpoint ('public.ingest_scores') or a blueprint
+    ('public') to (requests per minute, burst, client key); an endpoint's
+    rule applies on top of its blueprint's, so a client inventing device ids
+    is still held to the per-IP limit. A client over its limit gets a 429
+    with Retry-After instead of a worker. If the bucket store fails (a
+    locked SQLite file), requests are let through and counted as errors:
+    the limiter must never be what takes the service down.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.limits = {}
+        self.backend = None
+        self.backend_name = 'memory'
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._limited_clients = Counter()
+        self._errors = 0
+        self._last_warning = 0.0
+        self._since = datetime.utcnow()
+
+    def init_app(self, app) -> None:
+        """Read RATE_LIMIT_* settings and check every request against them"""
+        self.enabled = app.config['RATE_LIMIT_ENABLED']
+        self.limits = {name: Limit(name, *rule) for name, rule in app.config['RATE_LIMITS'].items()}
+        self.backend_name = app.config['RATE_LIMIT_BACKEND']
+        if self.backend_name == 'memory':
+            self.backend = MemoryBuckets()
+        elif self.backend_name == 'sqlite':
+            self.backend = SQLiteBuckets(app.config['RATE_LIMIT_SQLITE_PATH'])
+        else:
+            raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {self.backend_name}")
+        self._counts = {name: {'allowed': 0, 'limited': 0} for name in self.limits}
+        app.before_request(self.check)
+        app.after_request(self.add_headers)
+
+    def limits_for(self, endpoint: Optional[str], blueprint: Optional[str]) -> List[Limit]:
+        """The endpoint's rule, then its blueprint's (both apply)"""
+        return [self.limits[name] for name in (endpoint, blueprint) if name in self.limits]
+
+    def client_key(self, limit: Limit) -> str:
+        """Who a request counts against: the user or device when known, else the IP"""
+        if limit.key == 'user' and current_user.is_authenticated:
+            return f'user:{current_user.get_id()}'
+        if limit.key == 'device':
+            device_id = request.args.get('device_id') or request.args.get('player_id')
+            payload = request.get_json(silent=True) if request.is_json else None
+            if isinstance(payload, dict):
+                events = payload.get('events')
+                first = events[0] if isinstance(events, list) and events and isinstance(events[0], dict) else {}
+                device_id = device_id or payload.get('device_id') or payload.get('player_id') or first.get('player_id')
+            if isinstance(device_id, str) and 0 < len(device_id) <= 100:
+                return f'device:{device_id}'
+        return f'ip:{request.remote_addr}'
+
+    def check(self):
+        """before_request hook: a 429 response when one of the client's buckets is empty"""
+        if not self.enabled or request.method == 'OPTIONS':
+            return None
+        for limit in self.limits_for(request.endpoint, request.blueprint):
+            client = self.client_key(limit)
+            try:
+                allowed, tokens, retry_after = self.backend.take(f'{limit.name}|{client}', limit)
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                    warn = time.monotonic() - self._last_warning > 60
+                    if warn:
+                        self._last_warning = time.monotonic()
+                if warn:
+                    print(f"Warning: rate limit check failed, letting requests through: {e}")
+                return None
+
+            with self._lock:
+                self._counts[limit.name]['allowed' if allowed else 'limited'] += 1
+                if not allowed:
+                    self._limited_clients[f'{limit.name} {client}'] += 1
+                    if len(self._limited_clients) > MAX_TRACKED_CLIENTS:
+                        self._limited_clients = Counter(dict(self._limited_clients.most_common(MAX_TRACKED_CLIENTS // 2)))
+            if not allowed:
+                return self.too_many_requests(retry_after)
+            if 'rate_limit' not in g or tokens < g.rate_limit[1]:
+                g.rate_limit = (limit, tokens)
+        return None
+
+    def too_many_requests(self, retry_after: float):
+        retry_after = max(1, math.ceil(retry_after))
+        response = jsonify({'error': 'Too many requests', 'retry_after': retry_after})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    def add_headers(self, response):
+        """after_request hook: the client's remaining allowance on limited endpoints"""
+        rate_limit = g.pop('rate_limit', None)
+        if rate_limit is not None:
+            limit, tokens = rate_limit
+            response.headers['X-RateLimit-Limit'] = f'{limit.per_minute:g}/minute'
+            response.headers['X-RateLimit-Remaining'] = str(int(tokens))
+        return response
+
+    def metrics(self, top: int = 20) -> Dict[str, Any]:
+        """Counts since this worker started (each worker keeps its own)"""
+        with self._lock:
+            counts = {name: dict(value) for name, value in self._counts.items()}
+            limited_clients = self._limited_clients.most_common(top)
+            errors = self._errors
+        try:
+            buckets = len(self.backend) if self.backend is not None else 0
+        except Exception:
+            buckets = None
+        return {
+            'enabled': self.enabled,
+            'backend': self.backend_name,
+            'since': self._since.isoformat(),
+            'buckets': buckets,
+            'errors': errors,
+            'limits': {name: {'per_minute': limit.per_minute, 'burst': limit.burst, 'key': limit.key,
+                              **counts.get(name, {})}
+                       for name, limit in self.limits.items()},
+            'limited_clients': [{'client': client, 'count': count} for client, count in limited_clients]
+        }
+
+
+rate_limiter = RateLimiter()
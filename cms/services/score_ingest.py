@@ -0,0 +1,379 @@
+import atexit
+import json
+import os
+import secrets
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from config import Config
+from models import db, Player, ScoreEvent
+from services.analytics import analytics
+from services.badge_awards import award_badges
+from services.badge_view import BadgeView, get_badge_view, normalize_game_path
+from services.leaderboard import leaderboard, validate_player_id
+
+# filelock tells live workers' logs from orphaned ones; without it only
+# logs whose process is gone are replayed
+try:
+    import filelock
+except ImportError:
+    filelock = None
+
+EVENT_KINDS = ('collect', 'score')
+
+# Rows per IN (...) lookup
+QUERY_CHUNK = 500
+
+
+class ScoreConflict(Exception):
+    """Another worker changed a best score between our read and our update"""
+
+
+def _text(raw: Dict[str, Any], field: str, max_length: int, required: bool = False) -> Optional[str]:
+    value = raw.get(field)
+    if value is None or value == '':
+        if required:
+            raise ValueError(f'{field} is required')
+        return None
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f'{field} must be a non-empty string')
+    if len(value.strip()) > max_length:
+        raise ValueError(f'{field} is too long (max {max_length} characters)')
+    return value.strip()
+
+
+def parse_event(raw: Any, view: Optional[BadgeView] = None) -> Dict[str, Any]:
+    """A validated, normalised score event (raises ValueError).
+
+    collect: {"player_id", "kind": "collect", "target": <item id>} scores
+    SCORE_POINTS_PER_COLLECT once per player and item.
+    score: {"player_id", "kind": "score", "target": <game path>, "points"}
+    counts the player's best score in each game: playing again adds only
+    the improvement. Targets must be an item id or a game path in the
+    current catalog (pass the badge view when parsing a batch).
+    """
+    if not isinstance(raw, dict):
+        raise ValueError('Event must be an object')
+    player_id = validate_player_id(raw.get('player_id'))
+    kind = raw.get('kind', 'collect')
+    if kind not in EVENT_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(EVENT_KINDS)}")
+    target = _text(raw, 'target', 200, required=True)
+    view = view or get_badge_view()
+
+    if kind == 'collect':
+        if target not in view.item_ids:
+            raise ValueError(f'Unknown item: {target}')
+        points = Config.SCORE_POINTS_PER_COLLECT
+        key = f'collect:{player_id}:{target}'
+    else:
+        if not view.is_game(target):
+            raise ValueError(f'Unknown game: {target}')
+        points = raw.get('points')
+        if isinstance(points, bool) or not isinstance(points, int) or not 0 <= points <= Config.SCORE_MAX_POINTS:
+            raise ValueError(f'points must be an integer between 0 and {Config.SCORE_MAX_POINTS}')
+        target = normalize_game_path(target)
+        key = f'score:{player_id}:{target}'
+
+    return {
+        'key': key,
+        'player_id': player_id,
+        'kind': kind,
+        'target': target,
+        'points': points,
+        'venue': _text(raw, 'venue', 100),
+        'nickname': _text(raw, 'nickname', 50),
+        'at': datetime.utcnow().isoformat()
+    }
+
+
+def write_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Store events in one transaction, add their points to the players and
+    award the badges they earn.
+
+    Finds already stored and game scores no better than the stored best
+    are skipped, so writing the same events again (a replayed log, a client
+    retry) changes nothing. Returns the events that changed something.
+    """
+    for attempt in range(2):
+        try:
+            fresh = _write_events(events)
+            db.session.commit()
+            break
+        except (IntegrityError, ScoreConflict):
+            # Another worker stored some of these keys or players first
+            db.session.rollback()
+            if attempt:
+                raise
+        except Exception:
+            db.session.rollback()
+            raise
+
+    for event in fresh:
+        if event['kind'] == 'collect':
+            analytics.record('find', event['target'], datetime.fromisoformat(event['at']))
+
+    player_ids = sorted({e['player_id'] for e in fresh})
+    for start in range(0, len(player_ids), QUERY_CHUNK):
+        for player in Player.query.filter(Player.player_id.in_(player_ids[start:start + QUERY_CHUNK])):
+            leaderboard.apply(player)
+    return fresh
+
+
+def _write_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # The best score per game in this batch; one event per key from here on
+    best = {}
+    for event in events:
+        current = best.get(event['key'])
+        if current is None or event['points'] > current['points']:
+            best[event['key']] = event
+    events = [e for e in events if best[e['key']] is e]
+
+    keys = sorted(best)
+    stored = {}
+    for start in range(0, len(keys), QUERY_CHUNK):
+        chunk = keys[start:start + QUERY_CHUNK]
+        stored.update(db.session.query(ScoreEvent.event_key, ScoreEvent.points).filter(ScoreEvent.event_key.in_(chunk)))
+
+    fresh, new_rows, gains = [], [], {}
+    for event in events:
+        if event['key'] not in stored:
+            gains[event['key']] = event['points']
+            new_rows.append(event)
+        elif event['kind'] == 'score' and event['points'] > stored[event['key']]:
+            old = stored[event['key']]
+            # Compare-and-set, so a concurrent improvement is not added twice
+            updated = ScoreEvent.query.filter_by(event_key=event['key'], points=old).update(
+                {'points': event['points'], 'venue': event['venue'],
+                 'created_at': datetime.fromisoformat(event['at'])},
+                synchronize_session=False)
+            if not updated:
+                raise ScoreConflict(event['key'])
+            gains[event['key']] = event['points'] - old
+        else:
+            continue
+        fresh.append(event)
+    if not fresh:
+        return fresh
+
+    db.session.bulk_insert_mappings(ScoreEvent, [{
+        'event_key': e['key'],
+        'player_id': e['player_id'],
+        'kind': e['kind'],
+        'target': e['target'],
+        'points': e['points'],
+        'venue': e['venue'],
+        'created_at': datetime.fromisoformat(e['at'])
+    } for e in new_rows])
+
+    totals = {}
+    for event in fresh:
+        points, nickname, at = totals.get(event['player_id'], (0, None, None))
+        totals[event['player_id']] = (points + gains[event['key']], event['nickname'] or nickname,
+                                      max(at or event['at'], event['at']))
+
+    player_ids = sorted(totals)
+    players = {}
+    for start in range(0, len(player_ids), QUERY_CHUNK):
+        for player in Player.query.filter(Player.player_id.in_(player_ids[start:start + QUERY_CHUNK])):
+            players[player.player_id] = player
+
+    now = datetime.utcnow()
+    for player_id, (points, nickname, at) in totals.items():
+        player = players.get(player_id)
+        if player is None:
+            db.session.add(Player(player_id=player_id, nickname=nickname or '', score=points,
+                                  reached_at=datetime.fromisoformat(at), updated_at=now))
+            continue
+        if points:
+            # Added in SQL so concurrent flushes from other workers are not lost
+            player.score = Player.score + points
+            player.reached_at = datetime.fromisoformat(at)
+        if nickname:
+            player.nickname = nickname
+        player.updated_at = now
+
+    # Earned badges commit with the events, so a replayed log cannot award twice
+    award_badges(fresh)
+    return fresh
+
+
+class ScoreBuffer:
+    """Write-behind buffer for score events.
+
+    Accepted events are appended (and fsynced) to this worker's log file,
+    then held in memory until SCORE_BUFFER_MAX_EVENTS are waiting or
+    SCORE_BUFFER_FLUSH_SECONDS pass, and written in one transaction. The log
+    is rotated at each flush and deleted once the flush commits. On start,
+    logs left by workers that died are replayed; replays are harmless
+    because events are idempotent by key.
+    """
+
+    def __init__(self):
+        self._app = None
+        self.max_events = 500
+        self.flush_seconds = 1.0
+        self.fsync = True
+        self.log_dir = None
+        self._events = []
+        self._keys = {}   # key -> points of the waiting event
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._log = None
+        self._log_path = None
+        self._owner_lock = None
+        self._sealed_logs = []   # rotated logs whose events are not committed yet
+
+    def init_app(self, app) -> None:
+        """Read SCORE_* settings and replay logs orphaned by dead workers"""
+        self._app = app
+        self.max_events = app.config['SCORE_BUFFER_MAX_EVENTS']
+        self.flush_seconds = app.config['SCORE_BUFFER_FLUSH_SECONDS']
+        self.fsync = app.config['SCORE_LOG_FSYNC']
+        self.log_dir = Path(app.config['SCORE_LOG_DIR'])
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        with app.app_context():
+            try:
+                self.replay_orphans()
+            except Exception as e:
+                print(f"Warning: could not replay score logs: {e}")
+        atexit.register(self._flush_at_exit)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._events)
+
+    def _open_log(self) -> None:
+        """Start this worker's log (called with _lock held)"""
+        if self._log_path is None:
+            self._log_path = self.log_dir / f'scores-{os.getpid()}-{secrets.token_hex(4)}.log'
+            if filelock is not None:
+                self._owner_lock = filelock.FileLock(str(self._log_path) + '.lock')
+                self._owner_lock.acquire()
+        self._log = open(self._log_path, 'a', encoding='utf-8')
+
+    def add(self, events: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """Queue parsed events; returns (accepted, duplicates already waiting)"""
+        with self._lock:
+            fresh = []
+            for event in events:
+                # A better score for a waiting game is queued too; the flush keeps the best
+                if event['points'] > self._keys.get(event['key'], -1):
+                    self._keys[event['key']] = event['points']
+                    fresh.append(event)
+            if fresh:
+                if self._log is None:
+                    self._open_log()
+                self._log.write(''.join(json.dumps(e, separators=(',', ':')) + '\n' for e in fresh))
+                self._log.flush()
+                if self.fsync:
+                    os.fsync(self._log.fileno())
+                self._events.extend(fresh)
+            full = len(self._events) >= self.max_events
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, name='score-flusher', daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+        return len(fresh), len(events) - len(fresh)
+
+    def flush(self) -> int:
+        """Write waiting events now (needs an app context); returns how many were new"""
+        with self._flush_lock:
+            with self._lock:
+                events, self._events, self._keys = self._events, [], {}
+                if self._log is not None:
+                    self._log.close()
+                    self._log = None
+                    sealed = self._log_path.with_name(f'{self._log_path.stem}-{secrets.token_hex(4)}.flushing')
+                    os.replace(self._log_path, sealed)
+                    self._sealed_logs.append(sealed)
+            if not events:
+                return 0
+            try:
+                fresh = write_events(events)
+            except Exception:
+                # Keep them for the next flush; the sealed log still holds them
+                with self._lock:
+                    self._events[:0] = events
+                    for event in events:
+                        self._keys[event['key']] = max(event['points'], self._keys.get(event['key'], -1))
+                raise
+            for sealed in self._sealed_logs:
+                sealed.unlink(missing_ok=True)
+            self._sealed_logs = []
+            return len(fresh)
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                with self._app.app_context():
+                    self.flush()
+            except Exception as e:
+                print(f"Warning: score flush failed: {e}")
+
+    def _flush_at_exit(self) -> None:
+        if self._app is None or not len(self):
+            return
+        try:
+            with self._app.app_context():
+                self.flush()
+        except Exception as e:
+            print(f"Warning: score flush at exit failed (the log will be replayed): {e}")
+
+    def _owner_lock_path(self, path: Path) -> Path:
+        """Lock file held by the worker that wrote a log (scores-<pid>-<id>...)"""
+        return path.with_name('-'.join(path.name.split('.')[0].split('-')[:3]) + '.log.lock')
+
+    def _is_orphan(self, path: Path) -> bool:
+        if path == self._log_path or path in self._sealed_logs:
+            return False
+        if filelock is not None:
+            owner = filelock.FileLock(str(self._owner_lock_path(path)))
+            try:
+                owner.acquire(timeout=0)
+            except filelock.Timeout:
+                return False
+            owner.release()
+            return True
+        try:
+            os.kill(int(path.name.split('-')[1]), 0)
+            return False
+        except (ValueError, IndexError, ProcessLookupError):
+            return True
+        except PermissionError:
+            return False
+
+    def replay_orphans(self) -> int:
+        """Write the events in logs left by dead workers; returns how many were new"""
+        replayed = 0
+        for path in sorted(self.log_dir.glob('scores-*')):
+            if path.suffix not in ('.log', '.flushing') or not self._is_orphan(path):
+                continue
+            events = []
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # Torn last line from a crash
+            for start in range(0, len(events), self.max_events):
+                replayed += len(write_events(events[start:start + self.max_events]))
+            path.unlink()
+
+        live = {self._owner_lock_path(p) for p in self.log_dir.glob('scores-*') if p.suffix in ('.log', '.flushing')}
+        for lock in self.log_dir.glob('scores-*.lock'):
+            if lock not in live and (self._owner_lock is None or str(lock) != self._owner_lock.lock_file):
+                lock.unlink(missing_ok=True)
+        return replayed
+
+
+score_buffer = ScoreBuffer()
@@ -0,0 +1,312 @@
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+from flask import has_app_context
+
+from models import db, CatalogEntity, CatalogState
+from services.catalog_sync import ENTITY_COLLECTIONS, entity_fingerprint
+from services.json_handler import JSONHandler
+
+# Searchable fields per document type and their weights
+ITEM_FIELDS = {
+    'id': 3.0,
+    'name': 4.0,
+    'scientificName': 3.0,
+    'place': 1.5,
+    'description': 1.0,
+    'badgeDescription': 1.0,
+    'badge.id': 2.0,
+    'badge.name': 3.0,
+    'badge.description': 1.0,
+}
+GAME_BADGE_FIELDS = {
+    'id': 3.0,
+    'name': 4.0,
+    'description': 1.0,
+}
+
+# Score multipliers by how a query token matched an indexed token
+EXACT_BOOST = 2.0
+PREFIX_BOOST = 1.0
+FUZZY_BOOST = 0.5
+
+# Shortest query tokens matched as prefixes / fuzzily (shorter ones match too much)
+PREFIX_MIN_LENGTH = 2
+FUZZY_MIN_LENGTH = 4
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, accent-stripped word tokens"""
+    if not isinstance(text, str):
+        return []
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    stripped = ''.join(c for c in normalized if not unicodedata.combining(c))
+    return TOKEN_PATTERN.findall(stripped.replace('_', ' '))
+
+
+def _deletions(token: str) -> List[str]:
+    """Every variant of a token with one character removed"""
+    return [token[:i] + token[i + 1:] for i in range(len(token))]
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True when a and b differ by at most one insertion, deletion or substitution"""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = j = edits = 0
+    while i < len(a) and j < len(b):
+        if a[i] != b[j]:
+            edits += 1
+            if edits > 1:
+                return False
+            if len(a) == len(b):
+                i += 1
+        else:
+            i += 1
+        j += 1
+    return edits + (len(b) - j) <= 1
+
+
+def _field_values(entity: Dict[str, Any], fields: Dict[str, float]):
+    for field, weight in fields.items():
+        value = entity
+        for part in field.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        if isinstance(value, str) and value:
+            yield value, weight
+
+
+class SearchIndex:
+    """Inverted index over items and game badges with prefix and fuzzy matching.
+
+    Documents are keyed by (type, id). update() re-indexes only the entities
+    the catalog sync tables record as changed since the indexed revision, so
+    tokenizing and posting-list work is proportional to the edit; finding
+    those entities is one id comparison per catalog entry. Without that
+    history (first build, compacted or reset history, no app context) it
+    falls back to comparing every entity's fingerprint.
+    """
+
+    def __init__(self):
+        self.revision = None
+        self.source = None
+        self.postings = defaultdict(dict)   # token -> {doc_key: weight}
+        self.tokens = []                    # sorted, for prefix lookups
+        self.deletes = defaultdict(set)     # one-deletion variant -> tokens (fuzzy lookups)
+        self.documents = {}                 # doc_key -> (fingerprint, {token: weight}, summary)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def update(self, data: Dict[str, Any]) -> Dict[str, int]:
+        """Bring the index in line with a catalog; returns counts of added/updated/removed docs"""
+        with self._lock:
+            changed = self._recorded_changes(int(data.get('revision', 0)))
+            if changed is None:
+                counts = self._update_all(data)
+            else:
+                counts = self._update_changed(data, changed)
+            self.revision = data.get('revision', 0)
+            self.source = data
+        return counts
+
+    def _recorded_changes(self, revision: int) -> Optional[set]:
+        """(type, id) of the entities changed between the indexed revision and
+        this one, from the catalog sync tables; None when they cannot say"""
+        if self.revision is None or revision < self.revision or not has_app_context():
+            return None
+        try:
+            state = CatalogState.query.get(1)
+            if state is None or state.revision != revision or self.revision < state.compacted_revision:
+                return None
+            rows = db.session.query(CatalogEntity.entity_type, CatalogEntity.entity_id).filter(
+                CatalogEntity.revision > self.revision,
+                CatalogEntity.revision <= revision)
+            return set(rows)
+        except Exception as e:
+            print(f"Warning: search index falling back to a full update: {e}")
+            return None
+
+    def _update_changed(self, data: Dict[str, Any], changed: set) -> Dict[str, int]:
+        counts = {'added': 0, 'updated': 0, 'removed': 0}
+        sources = (('item', ITEM_FIELDS), ('game_badge', GAME_BADGE_FIELDS))
+        for doc_type, fields in sources:
+            ids = {entity_id for entity_type, entity_id in changed if entity_type == doc_type}
+            if not ids:
+                continue
+            found = {}
+            for entity in data.get(ENTITY_COLLECTIONS[doc_type], []):
+                entity_id = str(entity.get('id'))
+                if entity_id in ids:
+                    found[entity_id] = entity
+            for entity_id in ids:
+                key = (doc_type, entity_id)
+                existing = key in self.documents
+                if existing:
+                    self._remove(key)
+                entity = found.get(entity_id)
+                if entity is not None:
+                    self._add(key, entity_fingerprint(entity), entity, fields)
+                    counts['updated' if existing else 'added'] += 1
+                elif existing:
+                    counts['removed'] += 1
+        return counts
+
+    def _update_all(self, data: Dict[str, Any]) -> Dict[str, int]:
+        """Re-index every entity whose fingerprint changed"""
+        counts = {'added': 0, 'updated': 0, 'removed': 0}
+        seen = set()
+        sources = (('item', data.get('items', []), ITEM_FIELDS),
+                   ('game_badge', data.get('gameBadges', []), GAME_BADGE_FIELDS))
+        for doc_type, entities, fields in sources:
+            for entity in entities:
+                key = (doc_type, str(entity.get('id')))
+                seen.add(key)
+                fingerprint = entity_fingerprint(entity)
+                existing = self.documents.get(key)
+                if existing and existing[0] == fingerprint:
+                    continue
+                if existing:
+                    self._remove(key)
+                    counts['updated'] += 1
+                else:
+                    counts['added'] += 1
+                self._add(key, fingerprint, entity, fields)
+
+        for key in [k for k in self.documents if k not in seen]:
+            self._remove(key)
+            counts['removed'] += 1
+        return counts
+
+    def _add(self, key: Tuple[str, str], fingerprint: str, entity: Dict[str, Any],
+             fields: Dict[str, float]) -> None:
+        weights = {}
+        for value, weight in _field_values(entity, fields):
+            for token in tokenize(value):
+                weights[token] = max(weights.get(token, 0), weight)
+
+        for token, weight in weights.items():
+            postings = self.postings[token]
+            if not postings:
+                insort(self.tokens, token)
+                for variant in _deletions(token):
+                    self.deletes[variant].add(token)
+            postings[key] = weight
+
+        summary = {'type': key[0], 'id': key[1], 'name': entity.get('name', '')}
+        if key[0] == 'item' and isinstance(entity.get('badge'), dict):
+            summary['badge_name'] = entity['badge'].get('name', '')
+        self.documents[key] = (fingerprint, weights, summary)
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        _, weights, _ = self.documents.pop(key)
+        for token in weights:
+            postings = self.postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self.postings[token]
+                index = bisect_left(self.tokens, token)
+                if index < len(self.tokens) and self.tokens[index] == token:
+                    del self.tokens[index]
+                for variant in _deletions(token):
+                    variants = self.deletes.get(variant)
+                    if variants is not None:
+                        variants.discard(token)
+                        if not variants:
+                            del self.deletes[variant]
+
+    def _expand(self, query_token: str, fuzzy: bool) -> Dict[str, float]:
+        """Indexed tokens a query token matches, with their match boost"""
+        matches = {}
+        if len(query_token) < PREFIX_MIN_LENGTH:
+            if query_token in self.postings:
+                matches[query_token] = EXACT_BOOST
+        else:
+            position = bisect_left(self.tokens, query_token)
+            while position < len(self.tokens) and self.tokens[position].startswith(query_token):
+                token = self.tokens[position]
+                matches[token] = EXACT_BOOST if token == query_token else PREFIX_BOOST
+                position += 1
+
+        if fuzzy and len(query_token) >= FUZZY_MIN_LENGTH:
+            candidates = set(self.deletes.get(query_token, ()))
+            for variant in _deletions(query_token):
+                if variant in self.postings:
+                    candidates.add(variant)
+                candidates.update(self.deletes.get(variant, ()))
+            for token in candidates:
+                if token not in matches and _within_one_edit(query_token, token):
+                    matches[token] = FUZZY_BOOST
+        return matches
+
+    def search(self, query: str, types: Optional[List[str]] = None, limit: int = 20,
+               fuzzy: bool = True) -> List[Dict[str, Any]]:
+        """Documents matching every query token (as a word prefix, or within one
+        edit when fuzzy), best first"""
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            scores = None
+            for query_token in query_tokens:
+                token_scores = defaultdict(float)
+                for token, boost in self._expand(query_token, fuzzy).items():
+                    for key, weight in self.postings[token].items():
+                        token_scores[key] = max(token_scores[key], weight * boost)
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {key: score + token_scores[key] for key, score in scores.items() if key in token_scores}
+                if not scores:
+                    return []
+
+            results = []
+            for key, score in scores.items():
+                if types and key[0] not in types:
+                    continue
+                result = dict(self.documents[key][2])
+                result['score'] = round(score, 3)
+                results.append(result)
+
+        results.sort(key=lambda r: (-r['score'], r['name'].lower(), r['id']))
+        return results[:limit] if limit else results
+
+
+def search_catalog(query: str, types: Optional[List[str]] = None, limit: int = 20,
+                   fuzzy: bool = True) -> Dict[str, Any]:
+    """Search response body: revision, query, took_ms and results"""
+    start = time.perf_counter()
+    index = get_search_index()
+    results = index.search(query, types=types, limit=limit, fuzzy=fuzzy)
+    return {
+        'revision': index.revision,
+        'query': query,
+        'took_ms': round((time.perf_counter() - start) * 1000, 2),
+        'results': results
+    }
+
+
+_index = SearchIndex()
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """Search index for the current catalog, updated incrementally when the catalog changes"""
+    data = JSONHandler().read_cached()
+    with _index_lock:
+        if _index.source is not data:
+            _index.update(data)
+        return _index
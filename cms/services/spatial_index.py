@@ -0,0 +1,156 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Tuple
+
+from services.geo import (
+    geohash_encode, geohash_cell_size, haversine_meters, cell_min_extent_meters, location_of
+)
+from services.json_handler import JSONHandler
+
+# Geohash length stored per item (~5m cells)
+INDEX_PRECISION = 9
+
+# Upper bound on cells scanned for one bounding-box query
+MAX_QUERY_CELLS = 64
+
+# Starting geohash precision for a Leaflet zoom level (coarser when zoomed out)
+ZOOM_PRECISION = [(5, 2), (8, 3), (11, 4), (13, 5), (15, 6), (17, 7), (19, 8)]
+
+
+def precision_for_zoom(zoom: Optional[int]) -> int:
+    """Geohash precision to start a bounding-box query at for a map zoom level"""
+    if zoom is None:
+        return INDEX_PRECISION
+    for max_zoom, precision in ZOOM_PRECISION:
+        if zoom <= max_zoom:
+            return precision
+    return INDEX_PRECISION
+
+
+class SpatialIndex:
+    """Geohash grid over item locations.
+
+    Items are kept sorted by geohash, so every geohash cell (at any precision)
+    is a contiguous range found with a binary search.
+    """
+
+    def __init__(self, items: List[Dict[str, Any]], revision: int = 0, source: Any = None):
+        self.revision = revision
+        self.source = source
+        entries = []
+        for item in items:
+            coords = location_of(item)
+            if coords is None:
+                continue
+            entries.append((geohash_encode(coords[0], coords[1], INDEX_PRECISION), coords, item))
+        entries.sort(key=lambda e: e[0])
+        self.keys = [e[0] for e in entries]
+        self.coords = [e[1] for e in entries]
+        self.items = [e[2] for e in entries]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _cell_range(self, prefix: str) -> range:
+        """Positions of the entries whose geohash starts with prefix"""
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '~')  # '~' sorts after every base32 character
+        return range(start, end)
+
+    def _covering_cells(self, south: float, west: float, north: float, east: float,
+                        precision: int) -> List[str]:
+        """Geohash cells at the given precision that cover a bounding box"""
+        height, width = geohash_cell_size(precision)
+        cells = set()
+        lat = (int((south + 90) // height) + 0.5) * height - 90
+        while lat - height / 2 <= north:
+            lng = (int((west + 180) // width) + 0.5) * width - 180
+            while lng - width / 2 <= east:
+                cells.add(geohash_encode(min(lat, 90.0), min(lng, 180.0), precision))
+                lng += width
+            lat += height
+        return sorted(cells)
+
+    def _cell_count(self, south, west, north, east, precision) -> int:
+        """Number of cells a bounding-box query would scan at a precision"""
+        height, width = geohash_cell_size(precision)
+        rows = int((north + 90) // height) - int((south + 90) // height) + 1
+        cols = int((east + 180) // width) - int((west + 180) // width) + 1
+        return rows * cols
+
+    def query_bbox(self, south: float, west: float, north: float, east: float,
+                   zoom: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Items inside a bounding box"""
+        precision = precision_for_zoom(zoom)
+        while precision > 1 and self._cell_count(south, west, north, east, precision) > MAX_QUERY_CELLS:
+            precision -= 1
+
+        positions = set()
+        for cell in self._covering_cells(south, west, north, east, precision):
+            for pos in self._cell_range(cell):
+                lat, lng = self.coords[pos]
+                if south <= lat <= north and west <= lng <= east:
+                    positions.add(pos)
+
+        results = [self.items[pos] for pos in sorted(positions)]
+        return results[:limit] if limit else results
+
+    def nearest(self, lat: float, lng: float, n: int = 5,
+                max_distance: Optional[float] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """The n items closest to a point as (distance_meters, item), nearest first.
+
+        Searches the 3x3 block of cells around the point, widening to coarser
+        cells until the n-th candidate is provably closer than any item
+        outside the block.
+        """
+        if n <= 0 or not self.items:
+            return []
+
+        for precision in range(INDEX_PRECISION, 0, -1):
+            height, width = geohash_cell_size(precision)
+            prefixes = set()
+            for d_lat in (-height, 0, height):
+                for d_lng in (-width, 0, width):
+                    p_lat = max(-90.0, min(90.0, lat + d_lat))
+                    p_lng = ((lng + d_lng + 180) % 360) - 180
+                    prefixes.add(geohash_encode(p_lat, p_lng, precision))
+
+            positions = set()
+            for prefix in prefixes:
+                positions.update(self._cell_range(prefix))
+
+            # Anything outside the block is at least one cell-side away
+            guaranteed = cell_min_extent_meters(precision, lat)
+            ranked = self._rank(positions, lat, lng, max_distance)
+            if len(ranked) >= n and ranked[n - 1][0] <= guaranteed:
+                return ranked[:n]
+            if max_distance is not None and guaranteed >= max_distance:
+                return ranked[:n]
+
+        return self._rank(range(len(self.items)), lat, lng, max_distance)[:n]
+
+    def _rank(self, positions, lat: float, lng: float,
+              max_distance: Optional[float]) -> List[Tuple[float, Dict[str, Any]]]:
+        """Distances from a point to the given entries, nearest first"""
+        ranked = []
+        for pos in positions:
+            item_lat, item_lng = self.coords[pos]
+            distance = haversine_meters(lat, lng, item_lat, item_lng)
+            if max_distance is None or distance <= max_distance:
+                ranked.append((distance, pos))
+        ranked.sort()
+        return [(distance, self.items[pos]) for distance, pos in ranked]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_spatial_index() -> SpatialIndex:
+    """Spatial index for the current catalog, rebuilt only when the catalog changes"""
+    global _index
+    data = JSONHandler().read_cached()
+    with _index_lock:
+        if _index is None or _index.source is not data:
+            _index = SpatialIndex(data.get('items', []), data.get('revision', 0), source=data)
+        return _index
@@ -0,0 +1,216 @@
+import difflib
+import re
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+# Rule modes accepted by ReplaceEngine
+MODES = ('literal', 'ignore_case', 'regex')
+
+# Text fields find/replace may touch, per entity type
+ITEM_FIELDS = ['name', 'scientificName', 'description', 'badgeDescription']
+ITEM_BADGE_FIELDS = ['name', 'description']
+GAME_BADGE_FIELDS = ['name', 'description']
+
+# Words and the whitespace/punctuation between them, for readable diffs
+DIFF_TOKEN = re.compile(r'\w+|\s+|[^\w\s]')
+
+
+def _fold(text: str) -> str:
+    """Lowercase without changing the length, so match offsets stay valid"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class AhoCorasick:
+    """Automaton matching many literal patterns in one scan of the text"""
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = patterns
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]  # pattern indexes ending at each state
+
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append(index)
+
+        # Breadth-first from the root's children (whose failure link is the root):
+        # each failure link points at the state of the longest proper suffix
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        """Every (start, end, pattern_index) occurrence, overlapping ones included"""
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for index in self.output[state]:
+                matches.append((position + 1 - len(self.patterns[index]), position + 1, index))
+        return matches
+
+
+class ReplaceEngine:
+    """Applies many find/replace rules to a text in a single pass.
+
+    Every rule is matched against the original text (literals through one
+    Aho-Corasick automaton per case mode, regexes individually). Where matches
+    overlap, the leftmost wins, then the longest, then the earliest rule, so
+    a replacement is never matched again by a later rule.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.rules = []
+        literal, folded = [], []
+        self.regexes = []
+        for number, rule in enumerate(rules, 1):
+            if not isinstance(rule, dict):
+                raise ValueError(f"Rule {number} must be an object")
+            find = rule.get('find')
+            replace = rule.get('replace', '')
+            mode = rule.get('mode', 'literal')
+            if not isinstance(find, str) or not find:
+                raise ValueError(f"Rule {number}: find text is required")
+            if not isinstance(replace, str):
+                raise ValueError(f"Rule {number}: replace must be a string")
+            if mode not in MODES:
+                raise ValueError(f"Rule {number}: mode must be one of {', '.join(MODES)}")
+
+            index = len(self.rules)
+            self.rules.append({'find': find, 'replace': replace, 'mode': mode})
+            if mode == 'literal':
+                literal.append((find, index))
+            elif mode == 'ignore_case':
+                folded.append((_fold(find), index))
+            else:
+                try:
+                    self.regexes.append((re.compile(find), index))
+                except re.error as e:
+                    raise ValueError(f"Rule {number}: invalid regular expression: {e}")
+
+        self._literal = (AhoCorasick([p for p, _ in literal]), [i for _, i in literal]) if literal else None
+        self._folded = (AhoCorasick([p for p, _ in folded]), [i for _, i in folded]) if folded else None
+
+    def _matches(self, text: str) -> List[Tuple[int, int, int, Optional[re.Match]]]:
+        """All candidate matches as (start, end, rule_index, regex_match)"""
+        candidates = []
+        for automaton, source in ((self._literal, text), (self._folded, None)):
+            if automaton is None:
+                continue
+            machine, rule_indexes = automaton
+            for start, end, pattern in machine.find_all(source if source is not None else _fold(text)):
+                candidates.append((start, end, rule_indexes[pattern], None))
+        for regex, rule_index in self.regexes:
+            for match in regex.finditer(text):
+                if match.end() > match.start():  # Empty matches would replace nothing sensible
+                    candidates.append((match.start(), match.end(), rule_index, match))
+        return candidates
+
+    def apply(self, text: str) -> Tuple[str, int]:
+        """Return (new_text, replacements)"""
+        candidates = self._matches(text)
+        if not candidates:
+            return text, 0
+        candidates.sort(key=lambda m: (m[0], -(m[1] - m[0]), m[2]))
+
+        parts = []
+        position = 0
+        count = 0
+        for start, end, rule_index, match in candidates:
+            if start < position:
+                continue
+            rule = self.rules[rule_index]
+            parts.append(text[position:start])
+            if match is None:
+                parts.append(rule['replace'])
+            else:
+                try:
+                    parts.append(match.expand(rule['replace']))
+                except (re.error, IndexError) as e:
+                    raise ValueError(f"Rule {rule_index + 1}: invalid replacement: {e}")
+            position = end
+            count += 1
+        parts.append(text[position:])
+        return ''.join(parts), count
+
+
+def text_diff(before: str, after: str) -> List[List[str]]:
+    """Word-level diff as [op, text] pairs (op: '=', '-', '+')"""
+    old = DIFF_TOKEN.findall(before)
+    new = DIFF_TOKEN.findall(after)
+    diff = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            diff.append(['=', ''.join(old[i1:i2])])
+            continue
+        if i2 > i1:
+            diff.append(['-', ''.join(old[i1:i2])])
+        if j2 > j1:
+            diff.append(['+', ''.join(new[j1:j2])])
+    return diff
+
+
+def _targets(data: Dict[str, Any], scope: str):
+    """(entity_type, entity_id, field label, container, key) for every text field in scope"""
+    if scope in ('all', 'items'):
+        for item in data.get('items', []):
+            for field in ITEM_FIELDS:
+                yield 'item', item['id'], field, item, field
+            if isinstance(item.get('badge'), dict):
+                for field in ITEM_BADGE_FIELDS:
+                    yield 'item', item['id'], f'badge.{field}', item['badge'], field
+    if scope in ('all', 'badges'):
+        for badge in data.get('gameBadges', []):
+            for field in GAME_BADGE_FIELDS:
+                yield 'game_badge', badge['id'], field, badge, field
+
+
+def find_replace(data: Dict[str, Any], rules: List[Dict[str, Any]], scope: str = 'all',
+                 apply: bool = False) -> List[Dict[str, Any]]:
+    """Run rules over the catalog's text fields.
+
+    Returns one entry per changed field ({type, id, field, before, after,
+    count}). With apply=True the catalog dict is updated in place; otherwise
+    it is left untouched (dry run).
+    """
+    if scope not in ('all', 'items', 'badges'):
+        raise ValueError("scope must be 'all', 'items' or 'badges'")
+    engine = ReplaceEngine(rules)
+    changes = []
+    for entity_type, entity_id, field, container, key in _targets(data, scope):
+        value = container.get(key)
+        if not isinstance(value, str) or not value:
+            continue
+        new_value, count = engine.apply(value)
+        if count == 0 or new_value == value:
+            continue
+        changes.append({
+            'type': entity_type,
+            'id': entity_id,
+            'field': field,
+            'before': value,
+            'after': new_value,
+            'count': count
+        })
+        if apply:
+            container[key] = new_value
+    return changes
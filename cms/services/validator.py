@@ -139,6 +139,13 @@ class Validator:
         
         return errors
     
+    @staticmethod
+    def check_geofences(items: List[Dict[str, Any]]) -> List[str]:
+        """Warnings (not errors) for items whose geofence overlaps another, sits
+        too close to another item, or lies in a dense hot spot"""
+        from services.geofence_analysis import get_geofence_analysis
+        return [f['message'] for f in get_geofence_analysis().check_items(items)]
+    
     @staticmethod
     def validate_coordinates(lat: float, lng: float) -> bool:
         """Validate coordinate ranges"""
@@ -0,0 +1,428 @@
+// Inline editor for the Content Editor page
+//
+// Cells carry data-type, data-id and data-field. Edits are queued and sent
+// to /content/update together after a short pause, so a burst of typing
+// across many cells becomes one save (one write, one backup).
+//
+// The grid is virtual: rows are fetched a page at a time from
+// /content/api/rows and only the rows in view (plus a few either side) are
+// in the DOM, so the page stays light however large the catalog is.
+
+const EDIT_DEBOUNCE_MS = 800;
+let pendingEdits = {};
+let editTimer = null;
+let editInFlight = false;
+
+function editKey(cell) {
+    return `${cell.dataset.type}|${cell.dataset.id}|${cell.dataset.field}`;
+}
+
+function findCell(type, id, field) {
+    return document.querySelector(
+        `[data-type="${CSS.escape(type)}"][data-id="${CSS.escape(id)}"][data-field="${CSS.escape(field)}"]`);
+}
+
+function cellValue(cell) {
+    return cell.type === 'number' ? parseFloat(cell.value) : cell.value;
+}
+
+function queueEdit(cell) {
+    setCachedValue(cell.dataset.type, cell.dataset.id, cell.dataset.field, cellValue(cell));
+    cell.classList.remove('is-invalid');
+    cell.classList.add('border-warning');
+    pendingEdits[editKey(cell)] = {
+        type: cell.dataset.type,
+        id: cell.dataset.id,
+        field: cell.dataset.field,
+        value: cellValue(cell)
+    };
+    setEditStatus(`${Object.keys(pendingEdits).length} unsaved edit(s)...`);
+
+    clearTimeout(editTimer);
+    editTimer = setTimeout(flushEdits, EDIT_DEBOUNCE_MS);
+}
+
+function flushEdits() {
+    clearTimeout(editTimer);
+    const edits = Object.values(pendingEdits);
+    if (edits.length === 0) return;
+    if (editInFlight) {
+        editTimer = setTimeout(flushEdits, EDIT_DEBOUNCE_MS);
+        return;
+    }
+
+    pendingEdits = {};
+    editInFlight = true;
+    setEditStatus(`Saving ${edits.length} edit(s)...`);
+
+    fetch('/content/update', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ edits: edits })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            edits.forEach(edit => markSaved(edit));
+            setEditStatus(`Saved ${edits.length} edit(s)`);
+            return;
+        }
+        if (!data.results) {
+            throw new Error(data.error || 'Failed to save');
+        }
+
+        // Nothing was saved: flag the rejected cells and resend the rest
+        data.results.forEach(result => {
+            const edit = edits[result.index];
+            if (result.success) {
+                const key = `${edit.type}|${edit.id}|${edit.field}`;
+                if (!pendingEdits[key]) pendingEdits[key] = edit;
+                return;
+            }
+            const cell = findCell(edit.type, edit.id, edit.field);
+            if (cell) {
+                cell.classList.remove('border-warning');
+                cell.classList.add('is-invalid');
+                cell.title = result.error;
+            }
+        });
+        setEditStatus('Some edits were rejected - see highlighted cells');
+        if (Object.keys(pendingEdits).length > 0) {
+            editTimer = setTimeout(flushEdits, 0);
+        }
+    })
+    .catch(error => {
+        console.error('Error saving edits:', error);
+        // Put the edits back so they are retried with the next save
+        edits.forEach(edit => {
+            const key = `${edit.type}|${edit.id}|${edit.field}`;
+            if (!pendingEdits[key]) pendingEdits[key] = edit;
+        });
+        setEditStatus('Error saving - will retry');
+        editTimer = setTimeout(flushEdits, EDIT_DEBOUNCE_MS * 2);
+    })
+    .finally(() => {
+        editInFlight = false;
+    });
+}
+
+function markSaved(edit) {
+    const cell = findCell(edit.type, edit.id, edit.field);
+    // Typing may have continued while the save was in flight
+    if (cell && !pendingEdits[editKey(cell)]) {
+        cell.classList.remove('border-warning', 'is-invalid');
+        cell.removeAttribute('title');
+    }
+}
+
+function setEditStatus(text) {
+    const status = document.getElementById('edit-status');
+    if (status) status.textContent = text;
+}
+
+// Value of a grid field in a catalog entity (badge_* fields live in item.badge)
+function entityValue(entity, field) {
+    if (field === 'badge_name') return entity.badge ? entity.badge.name : undefined;
+    if (field === 'badge_description') return entity.badge ? entity.badge.description : undefined;
+    return entity[field];
+}
+
+document.addEventListener('input', function(e) {
+    if (e.target.dataset && e.target.dataset.field) {
+        queueEdit(e.target);
+    }
+});
+
+// Apply edits saved by other editors, leaving cells being edited here alone
+document.addEventListener('catalog:change', function(e) {
+    let reload = false;
+    e.detail.changes.forEach(change => {
+        if (change.type !== grid.type) return;
+        const row = grid.rowsById[change.id];
+        if (change.action !== 'upsert' || !row) {
+            // Rows were added or removed: positions shift, so refetch
+            reload = true;
+            return;
+        }
+        grid.columns.forEach(column => {
+            const value = entityValue(change.entity, column.field);
+            if (column.editable && value !== undefined && !pendingEdits[`${change.type}|${change.id}|${column.field}`]) {
+                row[column.field] = value;
+            }
+        });
+        document.querySelectorAll(`[data-type="${CSS.escape(change.type)}"][data-id="${CSS.escape(change.id)}"]`).forEach(cell => {
+            if (cell === document.activeElement || pendingEdits[editKey(cell)]) return;
+            const value = entityValue(change.entity, cell.dataset.field);
+            if (value !== undefined && String(value) !== cell.value) {
+                cell.value = value;
+                cell.classList.add('border-info');
+                setTimeout(() => cell.classList.remove('border-info'), 2000);
+            }
+        });
+    });
+    if (reload) reloadGrid(false);
+});
+
+document.addEventListener('catalog:reset', function() {
+    reloadGrid(false);
+});
+
+// ---- Virtual grid ----
+
+const GRID_ROW_HEIGHT = 64;
+const GRID_OVERSCAN = 5;
+const GRID_SEARCH_DEBOUNCE_MS = 300;
+
+// width: bootstrap column span (12 per row)
+const GRID_COLUMNS = {
+    item: [
+        { field: 'id', label: 'ID', width: 1, sort: 'id' },
+        { field: 'name', label: 'Name', width: 2, sort: 'name', editable: 'input' },
+        { field: 'scientificName', label: 'Scientific Name', width: 2, sort: 'scientificName', editable: 'input' },
+        { field: 'description', label: 'Description', width: 3, editable: 'textarea' },
+        { field: 'badge_name', label: 'Badge Name', width: 2, sort: 'badge_name', editable: 'input' },
+        { field: 'badge_description', label: 'Badge Description', width: 2, editable: 'textarea' }
+    ],
+    game_badge: [
+        { field: 'id', label: 'ID', width: 2, sort: 'id' },
+        { field: 'name', label: 'Name', width: 4, sort: 'name', editable: 'input' },
+        { field: 'description', label: 'Description', width: 6, editable: 'textarea' }
+    ]
+};
+
+const grid = {
+    type: 'item',
+    columns: GRID_COLUMNS.item,
+    sort: 'name',
+    order: 'asc',
+    query: '',
+    filter: '',
+    pageSize: 100,
+    total: 0,
+    pages: {},          // page number -> rows
+    loading: {},        // page number -> true while fetching
+    rowsById: {},
+    rendered: new Map(), // row index -> element
+    generation: 0       // bumped on every reload so stale responses are dropped
+};
+
+function setCachedValue(type, id, field, value) {
+    const row = type === grid.type ? grid.rowsById[id] : null;
+    if (row) row[field] = value;
+}
+
+function gridQuery(page) {
+    const params = new URLSearchParams({
+        type: grid.type,
+        offset: page * grid.pageSize,
+        limit: grid.pageSize,
+        sort: grid.sort,
+        order: grid.order
+    });
+    if (grid.query) params.set('q', grid.query);
+    if (grid.filter && grid.type === 'item') {
+        const [name, value] = grid.filter.split('=');
+        params.set(name, value);
+    }
+    return params;
+}
+
+function loadPage(page) {
+    if (grid.pages[page] || grid.loading[page]) return;
+    grid.loading[page] = true;
+    const generation = grid.generation;
+
+    fetch(`/content/api/rows?${gridQuery(page)}`)
+    .then(response => response.json())
+    .then(data => {
+        if (generation !== grid.generation) return;
+        if (data.error) throw new Error(data.error);
+        data.rows.forEach(row => {
+            // Keep values typed here that have not been saved yet
+            grid.columns.forEach(column => {
+                const edit = pendingEdits[`${row.type}|${row.id}|${column.field}`];
+                if (edit) row[column.field] = edit.value;
+            });
+            grid.rowsById[row.id] = row;
+        });
+        grid.pages[page] = data.rows;
+        setGridTotal(data.total);
+        renderGrid(true);
+    })
+    .catch(error => {
+        console.error('Error loading rows:', error);
+        setEditStatus('Error loading rows');
+    })
+    .finally(() => {
+        if (generation === grid.generation) delete grid.loading[page];
+    });
+}
+
+function setGridTotal(total) {
+    grid.total = total;
+    document.getElementById('grid-spacer').style.height = `${total * GRID_ROW_HEIGHT}px`;
+    document.getElementById('grid-count').textContent = `${total} row(s)`;
+}
+
+function rowAt(index) {
+    const page = grid.pages[Math.floor(index / grid.pageSize)];
+    return page ? page[index % grid.pageSize] : undefined;
+}
+
+function buildRow(index, row) {
+    const element = document.createElement('div');
+    element.className = 'bulk-grid-row row g-1 align-items-center';
+    element.style.top = `${index * GRID_ROW_HEIGHT}px`;
+
+    if (!row) {
+        element.innerHTML = '<div class="col-12 text-muted small">Loading...</div>';
+        return element;
+    }
+    grid.columns.forEach(column => {
+        const col = document.createElement('div');
+        col.className = `col-${column.width}`;
+        element.appendChild(col);
+
+        if (!column.editable) {
+            col.className += ' text-muted small text-truncate';
+            col.textContent = row[column.field];
+            col.title = row[column.field];
+            return;
+        }
+        if (row[column.field] === null || row[column.field] === undefined) {
+            col.className += ' text-muted small';
+            col.textContent = 'No badge';
+            return;
+        }
+        const cell = document.createElement(column.editable);
+        if (column.editable === 'input') cell.type = 'text';
+        cell.className = 'form-control form-control-sm';
+        cell.dataset.type = row.type;
+        cell.dataset.id = row.id;
+        cell.dataset.field = column.field;
+        cell.value = row[column.field];
+        if (pendingEdits[editKey(cell)]) cell.classList.add('border-warning');
+        col.appendChild(cell);
+    });
+    return element;
+}
+
+function renderGrid(refreshPlaceholders) {
+    const viewport = document.getElementById('grid-viewport');
+    const spacer = document.getElementById('grid-spacer');
+    const first = Math.max(Math.floor(viewport.scrollTop / GRID_ROW_HEIGHT) - GRID_OVERSCAN, 0);
+    const last = Math.min(Math.ceil((viewport.scrollTop + viewport.clientHeight) / GRID_ROW_HEIGHT) + GRID_OVERSCAN,
+                          grid.total) - 1;
+
+    // Drop rows that scrolled out of view (never the one being edited)
+    grid.rendered.forEach((element, index) => {
+        const stale = refreshPlaceholders && element.dataset.placeholder;
+        if ((index < first || index > last || stale) && !element.contains(document.activeElement)) {
+            element.remove();
+            grid.rendered.delete(index);
+        }
+    });
+
+    for (let index = first; index <= last; index++) {
+        if (grid.rendered.has(index)) continue;
+        const row = rowAt(index);
+        if (!row) loadPage(Math.floor(index / grid.pageSize));
+        const element = buildRow(index, row);
+        if (!row) element.dataset.placeholder = '1';
+        spacer.appendChild(element);
+        grid.rendered.set(index, element);
+    }
+}
+
+function renderGridHeader() {
+    const header = document.getElementById('grid-header');
+    header.innerHTML = '';
+    grid.columns.forEach(column => {
+        const col = document.createElement('div');
+        col.className = `col-${column.width}`;
+        col.textContent = column.label;
+        if (column.sort) {
+            col.dataset.sort = column.sort;
+            if (grid.sort === column.sort) col.textContent += grid.order === 'asc' ? ' \u25B2' : ' \u25BC';
+        }
+        header.appendChild(col);
+    });
+}
+
+function reloadGrid(toTop) {
+    grid.generation += 1;
+    grid.pages = {};
+    grid.loading = {};
+    grid.rowsById = {};
+    grid.rendered.forEach(element => element.remove());
+    grid.rendered.clear();
+
+    const viewport = document.getElementById('grid-viewport');
+    if (toTop) viewport.scrollTop = 0;
+    // Load the page in view first; it sets the real total
+    const index = Math.floor(viewport.scrollTop / GRID_ROW_HEIGHT);
+    loadPage(Math.floor(index / grid.pageSize));
+}
+
+function initGrid() {
+    const viewport = document.getElementById('grid-viewport');
+    if (!viewport) return;
+    grid.pageSize = parseInt(viewport.dataset.pageSize, 10) || grid.pageSize;
+
+    let scrollFrame = null;
+    viewport.addEventListener('scroll', function() {
+        if (scrollFrame) return;
+        scrollFrame = requestAnimationFrame(() => {
+            scrollFrame = null;
+            renderGrid(false);
+        });
+    });
+
+    document.getElementById('grid-header').addEventListener('click', function(e) {
+        const sort = e.target.dataset.sort;
+        if (!sort) return;
+        grid.order = grid.sort === sort && grid.order === 'asc' ? 'desc' : 'asc';
+        grid.sort = sort;
+        renderGridHeader();
+        reloadGrid(true);
+    });
+
+    document.querySelectorAll('input[name="grid-type"]').forEach(radio => {
+        radio.addEventListener('change', function() {
+            grid.type = this.value;
+            grid.columns = GRID_COLUMNS[grid.type];
+            if (!grid.columns.some(column => column.sort === grid.sort)) grid.sort = 'name';
+            document.getElementById('grid-filter').disabled = grid.type !== 'item';
+            renderGridHeader();
+            reloadGrid(true);
+        });
+    });
+
+    let searchTimer = null;
+    document.getElementById('grid-search').addEventListener('input', function() {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(() => {
+            grid.query = this.value.trim();
+            reloadGrid(true);
+        }, GRID_SEARCH_DEBOUNCE_MS);
+    });
+
+    document.getElementById('grid-filter').addEventListener('change', function() {
+        grid.filter = this.value;
+        reloadGrid(true);
+    });
+
+    renderGridHeader();
+    reloadGrid(true);
+}
+
+document.addEventListener('DOMContentLoaded', initGrid);
+
+// Don't lose queued edits when leaving the page
+window.addEventListener('beforeunload', function() {
+    const edits = Object.values(pendingEdits);
+    if (edits.length > 0 && navigator.sendBeacon) {
+        navigator.sendBeacon('/content/update',
+            new Blob([JSON.stringify({ edits: edits })], { type: 'application/json' }));
+    }
+});
@@ -0,0 +1,32 @@
+// Live catalog changes from /content/api/events (Server-Sent Events)
+//
+// Dispatches on document:
+//   catalog:change  detail = { revision, user, changes: [{ type, id, action, entity? }] }
+//   catalog:reset   detail = { revision }  - reload everything, history was lost
+// EventSource reconnects by itself and resends the last revision seen, so
+// changes made while disconnected arrive as one catch-up event.
+
+(function() {
+    if (!window.EventSource) {
+        return;
+    }
+
+    let source = null;
+
+    function connect() {
+        source = new EventSource('/content/api/events');
+
+        source.addEventListener('catalog', function(e) {
+            const data = JSON.parse(e.data);
+            const name = data.reset ? 'catalog:reset' : 'catalog:change';
+            document.dispatchEvent(new CustomEvent(name, { detail: data }));
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', connect);
+    window.addEventListener('beforeunload', function() {
+        if (source) {
+            source.close();
+        }
+    });
+})();
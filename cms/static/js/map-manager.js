@@ -5,9 +5,11 @@ let markers = {};
 let circles = {};
 let currentMarker = null;
 let currentItem = null;
-let items = [];
+let items = [];       // every item (id, name, location), for the selector and table
+let mapItems = [];    // items in view, drawn as markers
 let selectedLat = null;
 let selectedLng = null;
+let clusterMarkers = [];
 
 // Map bounds: adjust for your map image and coordinate system
 const MAP_BOUNDS = {
@@ -27,6 +29,7 @@ const MAP_CENTER = [
 document.addEventListener('DOMContentLoaded', function() {
     initMap();
     loadItems();
+    loadGeofenceReport();
     setupEventListeners();
 });
 
@@ -48,6 +51,8 @@ function initMap() {
     
     L.imageOverlay(mapImageUrl, mapBounds).addTo(map);
     
+    map.on('moveend', scheduleLoadMarkers);
+    
     // Add click handler for placing pins
     map.on('click', function(e) {
         selectedLat = e.latlng.lat;
@@ -84,13 +89,43 @@ function initMap() {
     });
 }
 
+// Markers are fetched only for the visible bounds and reloaded when the view
+// changes; the selector and table always list every item
+let loadMarkersTimer = null;
+
+function currentBBox() {
+    const bounds = map.getBounds();
+    const clamp = (value, min, max) => Math.min(max, Math.max(min, value));
+    return [
+        clamp(bounds.getWest(), -180, 180),
+        clamp(bounds.getSouth(), -90, 90),
+        clamp(bounds.getEast(), -180, 180),
+        clamp(bounds.getNorth(), -90, 90)
+    ].join(',');
+}
+
+function scheduleLoadMarkers() {
+    clearTimeout(loadMarkersTimer);
+    loadMarkersTimer = setTimeout(loadMarkers, 250);
+}
+
+// Zoomed out: show server-side clusters instead of one marker per item
+function clusterMaxZoom() {
+    const value = parseInt(document.getElementById('map-container').dataset.clusterMaxZoom);
+    return isNaN(value) ? -1 : value;
+}
+
 function loadItems() {
-    fetch('/map/api/items')
+    loadItemList();
+    loadMarkers();
+}
+
+function loadItemList() {
+    fetch('/map/api/items?fields=list')
         .then(response => response.json())
         .then(data => {
             items = data;
             populateItemSelect();
-            addItemsToMap();
             updateItemsTable();
         })
         .catch(error => {
@@ -100,6 +135,28 @@ function loadItems() {
         });
 }
 
+function loadMarkers() {
+    if (map.getZoom() <= clusterMaxZoom()) {
+        loadClusters();
+        return;
+    }
+    
+    const params = new URLSearchParams({ bbox: currentBBox(), zoom: map.getZoom() });
+    fetch(`/map/api/items?${params}`)
+        .then(response => response.json())
+        .then(data => {
+            mapItems = data;
+            // Keep the selected item's marker even when it is out of view
+            if (currentItem && currentItem.location && !mapItems.some(a => a.id === currentItem.id)) {
+                mapItems.unshift(currentItem);
+            }
+            addItemsToMap();
+        })
+        .catch(error => {
+            console.error('Error loading markers:', error);
+        });
+}
+
 function populateItemSelect() {
     const select = document.getElementById('item-select');
     select.innerHTML = '<option value="">-- Create New Item --</option>';
@@ -110,9 +167,63 @@ function populateItemSelect() {
         option.textContent = `${item.name} (${item.id})`;
         select.appendChild(option);
     });
+    
+    if (currentItem) {
+        select.value = currentItem.id;
+    }
+}
+
+function loadClusters() {
+    const params = new URLSearchParams({ bbox: currentBBox(), zoom: map.getZoom() });
+    fetch(`/map/api/clusters?${params}`)
+        .then(response => response.json())
+        .then(data => {
+            mapItems = currentItem && currentItem.location ? [currentItem] : [];
+            addItemsToMap();
+            addClustersToMap(data.clusters || []);
+        })
+        .catch(error => {
+            console.error('Error loading clusters:', error);
+        });
+}
+
+function clearClusters() {
+    clusterMarkers.forEach(marker => map.removeLayer(marker));
+    clusterMarkers = [];
+}
+
+function addClustersToMap(clusters) {
+    clearClusters();
+    
+    clusters.forEach(cluster => {
+        const size = cluster.count < 10 ? 30 : cluster.count < 100 ? 38 : 46;
+        const marker = L.marker([cluster.lat, cluster.lng], {
+            title: cluster.count === 1 ? cluster.item.name : `${cluster.count} items (e.g. ${cluster.item.name})`,
+            icon: L.divIcon({
+                className: '',
+                html: `<div class="map-cluster" style="width:${size}px;height:${size}px">${cluster.count}</div>`,
+                iconSize: [size, size],
+                iconAnchor: [size / 2, size / 2]
+            })
+        }).addTo(map);
+        
+        // Zoom into the cluster's extent
+        marker.on('click', function() {
+            const [south, west, north, east] = cluster.bounds;
+            if (south === north && west === east) {
+                map.setView([cluster.lat, cluster.lng], clusterMaxZoom() + 1);
+            } else {
+                map.fitBounds([[south, west], [north, east]], { maxZoom: clusterMaxZoom() + 1, padding: [20, 20] });
+            }
+        });
+        
+        clusterMarkers.push(marker);
+    });
 }
 
 function addItemsToMap() {
+    clearClusters();
+    
     // Clear existing markers
     Object.values(markers).forEach(marker => map.removeLayer(marker));
     markers = {};
@@ -121,7 +232,7 @@ function addItemsToMap() {
     Object.values(circles).forEach(circle => map.removeLayer(circle));
     circles = {};
     
-    items.forEach(item => {
+    mapItems.forEach(item => {
         if (item.location && item.location.lat && item.location.lng) {
             const marker = L.marker([item.location.lat, item.location.lng], {
                 draggable: true,
@@ -156,35 +267,189 @@ function addItemsToMap() {
             markers[item.id] = marker;
         }
     });
+    
+    styleCircles();
 }
 
+// Pin moves are queued and saved together after a short pause
+const SAVE_DEBOUNCE_MS = 1500;
+let pendingMoves = {};
+let saveTimer = null;
+let saveInFlight = false;
+
 function updateItemLocation(itemId, lat, lng) {
     const radius = parseInt(document.getElementById('radius-input').value) || 10;
     
-    fetch('/map/api/update-location', {
+    // Later moves of the same pin replace earlier ones
+    pendingMoves[itemId] = { item_id: itemId, lat: lat, lng: lng, radius: radius };
+    setSaveStatus(`${Object.keys(pendingMoves).length} unsaved move(s)...`);
+    
+    clearTimeout(saveTimer);
+    saveTimer = setTimeout(flushMoves, SAVE_DEBOUNCE_MS);
+}
+
+function flushMoves() {
+    clearTimeout(saveTimer);
+    const moves = Object.values(pendingMoves);
+    if (moves.length === 0) return;
+    if (saveInFlight) {
+        saveTimer = setTimeout(flushMoves, SAVE_DEBOUNCE_MS);
+        return;
+    }
+    
+    pendingMoves = {};
+    saveInFlight = true;
+    setSaveStatus(`Saving ${moves.length} move(s)...`);
+    
+    fetch('/map/api/update-locations', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
         },
-        body: JSON.stringify({
-            item_id: itemId,
-            lat: lat,
-            lng: lng,
-            radius: radius
-        })
+        body: JSON.stringify({ moves: moves })
     })
     .then(response => response.json())
     .then(data => {
         if (data.success) {
+            const warnings = data.warnings || [];
+            setSaveStatus(`Saved ${data.items.length} location(s)` +
+                (warnings.length ? ` - ${warnings.map(w => w.message).join('; ')}` : ''));
             loadItems();
-            alert('Location updated successfully!');
+            scheduleGeofenceReport();
         } else {
-            alert('Error: ' + (data.error || 'Failed to update location'));
+            const details = (data.errors || []).map(e => `${e.item_id || '#' + e.index}: ${e.error}`).join('\n');
+            alert('Error: ' + (data.error || 'Failed to update locations') + (details ? '\n' + details : ''));
+            setSaveStatus('Save failed');
+            loadItems();
         }
     })
     .catch(error => {
-        console.error('Error updating location:', error);
-        alert('Error updating location');
+        console.error('Error updating locations:', error);
+        // Put the moves back so they are retried with the next save
+        moves.forEach(move => {
+            if (!pendingMoves[move.item_id]) pendingMoves[move.item_id] = move;
+        });
+        setSaveStatus('Error saving - will retry');
+        saveTimer = setTimeout(flushMoves, SAVE_DEBOUNCE_MS * 2);
+    })
+    .finally(() => {
+        saveInFlight = false;
+    });
+}
+
+function setSaveStatus(text) {
+    const status = document.getElementById('save-status');
+    if (status) status.textContent = text;
+}
+
+// Don't lose queued moves when leaving the page
+window.addEventListener('beforeunload', function() {
+    const moves = Object.values(pendingMoves);
+    if (moves.length > 0 && navigator.sendBeacon) {
+        navigator.sendBeacon('/map/api/update-locations',
+            new Blob([JSON.stringify({ moves: moves })], { type: 'application/json' }));
+    }
+});
+
+// Apply items saved by other editors without refetching (see catalog-events.js)
+document.addEventListener('catalog:change', function(e) {
+    const clustered = map.getZoom() <= clusterMaxZoom();
+    let listChanged = false;
+    let markersChanged = false;
+    e.detail.changes.forEach(change => {
+        // Unsaved local moves win until they are flushed
+        if (change.type !== 'item' || pendingMoves[change.id]) return;
+        
+        const index = items.findIndex(item => item.id === change.id);
+        const mapIndex = mapItems.findIndex(item => item.id === change.id);
+        if (change.action === 'delete') {
+            if (index !== -1) {
+                items.splice(index, 1);
+                listChanged = true;
+            }
+            if (mapIndex !== -1) {
+                mapItems.splice(mapIndex, 1);
+                markersChanged = true;
+            }
+            if (currentItem && currentItem.id === change.id) currentItem = null;
+            return;
+        }
+        
+        const item = change.entity;
+        if (currentItem && currentItem.id === item.id) currentItem = item;
+        if (index !== -1) {
+            items[index] = item;
+        } else {
+            items.push(item);
+        }
+        listChanged = true;
+        
+        if (clustered) return;
+        if (mapIndex !== -1) {
+            mapItems[mapIndex] = item;
+            markersChanged = true;
+        } else if (item.location && map.getBounds().contains([item.location.lat, item.location.lng])) {
+            mapItems.push(item);
+            markersChanged = true;
+        }
+    });
+    
+    if (listChanged) {
+        populateItemSelect();
+        updateItemsTable();
+    }
+    if (clustered) {
+        scheduleLoadMarkers();
+    } else if (markersChanged) {
+        addItemsToMap();
+    }
+    scheduleGeofenceReport();
+});
+
+document.addEventListener('catalog:reset', loadItems);
+
+// Geofence analysis: items with overlapping or crowded geofences are drawn red
+let flaggedItems = new Set();
+let geofenceReportTimer = null;
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function loadGeofenceReport() {
+    fetch('/map/api/geofence-report')
+        .then(response => response.json())
+        .then(report => {
+            const findings = [...report.overlaps, ...report.too_close, ...report.hotspots];
+            flaggedItems = new Set();
+            [...report.overlaps, ...report.too_close].forEach(f => f.items.forEach(id => flaggedItems.add(id)));
+            
+            document.getElementById('geofence-summary').textContent = findings.length === 0
+                ? `No problems in ${report.items_checked} items`
+                : `${findings.length} finding(s) in ${report.items_checked} items`;
+            document.getElementById('geofence-findings').innerHTML = findings.map(f => {
+                const level = f.kind === 'hotspot' ? 'text-warning' : 'text-danger';
+                return `<li class="${level}">${escapeHtml(f.message)}</li>`;
+            }).join('');
+            styleCircles();
+        })
+        .catch(error => {
+            console.error('Error loading geofence report:', error);
+            document.getElementById('geofence-summary').textContent = 'Check failed';
+        });
+}
+
+function scheduleGeofenceReport() {
+    clearTimeout(geofenceReportTimer);
+    geofenceReportTimer = setTimeout(loadGeofenceReport, 1000);
+}
+
+function styleCircles() {
+    Object.entries(circles).forEach(([itemId, circle]) => {
+        const color = flaggedItems.has(itemId) ? '#dc3545' : '#3388ff';
+        circle.setStyle({ color: color, fillColor: color });
     });
 }
 
@@ -228,6 +493,7 @@ function setupEventListeners() {
     document.getElementById('save-location-btn').addEventListener('click', function() {
         if (currentItem && selectedLat !== null && selectedLng !== null) {
             updateItemLocation(currentItem.id, selectedLat, selectedLng);
+            flushMoves();
         }
     });
     
@@ -258,8 +524,10 @@ function setupEventListeners() {
         .then(response => response.json())
         .then(data => {
             if (data.success) {
-                alert('Item created successfully!');
+                const warnings = (data.warnings || []).map(w => w.message);
+                alert('Item created successfully!' + (warnings.length ? '\n\nWarning:\n' + warnings.join('\n') : ''));
                 loadItems();
+                scheduleGeofenceReport();
                 document.getElementById('item-select').value = data.item.id;
                 document.getElementById('item-select').dispatchEvent(new Event('change'));
             } else {
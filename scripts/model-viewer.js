@@ -221,6 +221,7 @@ class SmartifyModelViewer {
       } catch (e) {
         // ignore
       }
+      this.reportAssetLoad(this.viewer.src);
     });
 
     // AR event listeners – start animation when AR session starts so it plays in AR
@@ -255,6 +256,19 @@ class SmartifyModelViewer {
     });
   }
 
+  /**
+   * Count an asset download in the CMS analytics (window.ANALYTICS_URL when the API is on another origin)
+   */
+  reportAssetLoad(src) {
+    try {
+      if (src && navigator.sendBeacon) {
+        navigator.sendBeacon(window.ANALYTICS_URL || '/api/analytics', JSON.stringify({ kind: 'asset', path: src }));
+      }
+    } catch (e) {
+      // ignore
+    }
+  }
+
   /**
    * Apply current settings to the viewer
    */
@@ -0,0 +1,155 @@
+// Progress sync: merges collected badges and completed games (localStorage userData / collectedBadges) with the CMS through /api/progress/sync, so they survive a change of device. Only entries gained since the last sync are sent. Set window.PROGRESS_SYNC_URL before loading this script when the API is on another origin.
+
+(function() {
+    'use strict';
+
+    const STATE_KEY = 'progressSync';
+    const DEFAULT_SYNC_URL = '/api/progress/sync';
+    // With nothing to send, pull other devices' additions at most this often
+    const MIN_PULL_INTERVAL_MS = 60 * 1000;
+
+    let inFlight = null;
+
+    function readJSON(key, fallback) {
+        try {
+            const value = JSON.parse(localStorage.getItem(key) || 'null');
+            return value === null ? fallback : value;
+        } catch (e) {
+            return fallback;
+        }
+    }
+
+    /**
+     * Badges and completed games recorded on this device
+     * @returns {{userData: Object|null, badges: string[], games: string[]}}
+     */
+    function localProgress() {
+        const userData = readJSON('userData', null);
+        const badges = new Set(readJSON('collectedBadges', []));
+        const games = new Set();
+        if (userData && userData.progress) {
+            (userData.progress.badges || []).forEach(badgeId => badges.add(badgeId));
+            (userData.progress.gamesCompleted || []).forEach(gameId => games.add(gameId));
+        }
+        return { userData: userData, badges: Array.from(badges), games: Array.from(games) };
+    }
+
+    /**
+     * Add entries collected on other devices to localStorage
+     * @param {{badges: string[], games: string[]}} add - Entries from the server
+     */
+    function applyRemote(add) {
+        if (!add || (!add.badges.length && !add.games.length)) {
+            return;
+        }
+
+        const collectedBadges = readJSON('collectedBadges', []);
+        add.badges.forEach(badgeId => {
+            if (!collectedBadges.includes(badgeId)) {
+                collectedBadges.push(badgeId);
+            }
+        });
+        localStorage.setItem('collectedBadges', JSON.stringify(collectedBadges));
+
+        const userData = readJSON('userData', null);
+        if (userData) {
+            if (!userData.progress) {
+                userData.progress = { gamesCompleted: [], badges: [], badgeDates: {}, highScores: {} };
+            }
+            userData.progress.badges = userData.progress.badges || [];
+            userData.progress.gamesCompleted = userData.progress.gamesCompleted || [];
+            add.badges.forEach(badgeId => {
+                if (!userData.progress.badges.includes(badgeId)) {
+                    userData.progress.badges.push(badgeId);
+                }
+            });
+            add.games.forEach(gameId => {
+                if (!userData.progress.gamesCompleted.includes(gameId)) {
+                    userData.progress.gamesCompleted.push(gameId);
+                }
+            });
+            localStorage.setItem('userData', JSON.stringify(userData));
+        }
+
+        // Let the page redraw its collection
+        window.dispatchEvent(new CustomEvent('progresssync', { detail: add }));
+    }
+
+    /**
+     * Send this device's new entries and merge in the ones it is missing.
+     * Failures are silent: unsent entries are sent again next time.
+     * @param {boolean} [force=false] - Pull even if the last sync was recent
+     * @returns {Promise<Object|null>} The server's response, or null if nothing was exchanged
+     */
+    function syncProgress(force) {
+        if (inFlight) {
+            return inFlight;
+        }
+        if (typeof navigator !== 'undefined' && navigator.onLine === false) {
+            return Promise.resolve(null);
+        }
+
+        const local = localProgress();
+        if (!local.userData || !local.userData.userId) {
+            return Promise.resolve(null);
+        }
+
+        let state = readJSON(STATE_KEY, {});
+        if (state.userId !== local.userData.userId) {
+            // New or changed player on this device: start a full sync
+            state = { userId: local.userData.userId, token: null, badges: [], games: [], at: 0 };
+        }
+        const syncedBadges = new Set(state.badges);
+        const syncedGames = new Set(state.games);
+        const add = {
+            badges: local.badges.filter(badgeId => !syncedBadges.has(badgeId)),
+            games: local.games.filter(gameId => !syncedGames.has(gameId))
+        };
+        const nothingToSend = !add.badges.length && !add.games.length;
+        if (state.token && nothingToSend && !force && Date.now() - state.at < MIN_PULL_INTERVAL_MS) {
+            return Promise.resolve(null);
+        }
+
+        inFlight = fetch(window.PROGRESS_SYNC_URL || DEFAULT_SYNC_URL, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ player_id: local.userData.userId, token: state.token, add: add }),
+            keepalive: true
+        })
+            .then(response => response.ok ? response.json() : null)
+            .then(result => {
+                if (!result) {
+                    return null;
+                }
+                applyRemote(result.add);
+                localStorage.setItem(STATE_KEY, JSON.stringify({
+                    userId: local.userData.userId,
+                    token: result.token,
+                    badges: Array.from(new Set(state.badges.concat(add.badges, result.add.badges))),
+                    games: Array.from(new Set(state.games.concat(add.games, result.add.games))),
+                    at: Date.now()
+                }));
+                return result;
+            })
+            .catch(error => {
+                console.debug('Progress sync: server unreachable, will retry', error);
+                return null;
+            })
+            .finally(() => {
+                inFlight = null;
+            });
+        return inFlight;
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', () => syncProgress());
+    } else {
+        syncProgress();
+    }
+    // Venue connectivity comes and goes; catch up as soon as it is back
+    window.addEventListener('online', () => syncProgress(true));
+
+    // Export functions to global scope
+    window.syncProgress = syncProgress;
+
+})();